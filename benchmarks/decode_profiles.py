@@ -0,0 +1,87 @@
+"""Measure CPU per camera for each decode profile on a local clip.
+
+Usage::
+
+    python benchmarks/decode_profiles.py clip.mp4
+    python benchmarks/decode_profiles.py clip.mp4 --backend gstreamer --seconds 20
+
+The clip is opened through the same ``open_stream`` call and worker-side
+profile logic the camera workers use, and every frame the profile keeps is
+JPEG-encoded with the configured encoder.  Because a live camera has to be
+consumed at its native rate, the report gives process CPU time per second of
+footage, i.e. the cost of one camera at real time.
+"""
+
+from __future__ import annotations
+
+import argparse
+import time
+
+import cv2
+
+from rtsp2jpg.backends import open_stream
+from rtsp2jpg.config import get_settings
+from rtsp2jpg.encoders import get_encoder
+from rtsp2jpg.pipelines import DECODE_PROFILES, CaptureOptions
+from rtsp2jpg.worker import _DecodeProfile, _pixel_format
+
+BACKENDS = {"ffmpeg": cv2.CAP_FFMPEG, "gstreamer": cv2.CAP_GSTREAMER}
+
+
+def _run(path: str, backend_flag: int, profile_name: str, seconds: float):
+    cap, note = open_stream(path, backend_flag, CaptureOptions(decode_profile=profile_name))
+    if cap is None:
+        raise SystemExit(f"could not open {path}: {note}")
+    fps = cap.get(cv2.CAP_PROP_FPS) or 25.0
+    settings = get_settings()
+    encoder = get_encoder()
+    decoded = 0
+    clip_time = [0.0]
+    profile = _DecodeProfile(profile_name, settings, clock=lambda: clip_time[0])
+    stored = []
+
+    started = time.process_time()
+    while clip_time[0] < seconds:
+        clip_time[0] = decoded / fps
+        if profile.skip_next():
+            ok, frame = cap.grab(), None
+        else:
+            ok, frame = cap.read()
+        if not ok:
+            break
+        decoded += 1
+        if frame is None:
+            continue
+        frame, pixel_format = profile.accept(frame, _pixel_format(frame))
+        if pixel_format == "i420":
+            payload = encoder.encode_i420(frame, settings.jpeg_quality)
+        else:
+            payload = encoder.encode(frame, settings.jpeg_quality)
+        stored.append((frame.shape[1], len(payload or b"")))
+    cpu = time.process_time() - started
+    cap.release()
+    return decoded / fps, decoded, stored, cpu
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("clip", help="Local video file")
+    parser.add_argument("--backend", choices=sorted(BACKENDS), default="ffmpeg")
+    parser.add_argument("--seconds", type=float, default=10.0, help="Footage to process per profile")
+    args = parser.parse_args()
+
+    print(f"{'profile':<9} {'decoded':>8} {'stored':>7} {'width':>6} {'CPU ms/s':>9} {'CPU %':>6}")
+    for name in DECODE_PROFILES:
+        footage, decoded, stored, cpu = _run(args.clip, BACKENDS[args.backend], name, args.seconds)
+        if not footage:
+            raise SystemExit("clip produced no frames")
+        width = stored[0][0] if stored else 0
+        per_second = cpu / footage
+        print(
+            f"{name:<9} {decoded:>8} {len(stored):>7} {width:>6} "
+            f"{per_second * 1000:>9.1f} {per_second * 100:>6.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
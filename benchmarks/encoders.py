@@ -0,0 +1,122 @@
+"""Compare JPEG encoder backends by encode time and output size.
+
+Usage::
+
+    python benchmarks/encoders.py
+    python benchmarks/encoders.py --source clip.mp4 --frames 20 --quality 70 85
+    python benchmarks/encoders.py --image snapshot.jpg --width 1920 --height 1080
+
+Frames come from a local video/image when given, otherwise from a synthetic
+1080p scene with gradients, edges and sensor-like noise.  Every installed
+backend is run with each option set and the median encode time and mean size
+are printed, so ``RTSP2JPG_JPEG_ENCODER`` and the ``RTSP2JPG_JPEG_*`` options
+can be chosen from data.  The ``i420`` rows encode the same frames from planar
+YUV, as with ``RTSP2JPG_CAPTURE_PIXEL_FORMAT=yuv``.
+"""
+
+from __future__ import annotations
+
+import argparse
+import statistics
+import time
+from typing import Callable, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from rtsp2jpg.encoders import ENCODERS, EncoderOptions, available_encoders, create_encoder
+
+# label -> (option the set exercises, options)
+OPTION_SETS = {
+    "default": (None, EncoderOptions()),
+    "444": ("subsampling", EncoderOptions(subsampling="444")),
+    "optimize": ("optimize", EncoderOptions(optimize=True)),
+    "progressive": ("progressive", EncoderOptions(progressive=True)),
+    "restart": ("restart_interval", EncoderOptions(restart_interval=4)),
+}
+
+
+def _synthetic_frames(count: int, width: int, height: int) -> List[np.ndarray]:
+    rng = np.random.default_rng(0)
+    x = np.linspace(0, 1, width, dtype=np.float32)
+    y = np.linspace(0, 1, height, dtype=np.float32)[:, None]
+    frames = []
+    for index in range(count):
+        base = np.stack([x * 255 + 0 * y, y * 255 + 0 * x, ((x + y + index / count) % 1) * 255], axis=-1)
+        frame = base.astype(np.uint8)
+        cv2.rectangle(frame, (width // 4, height // 4), (width // 2, height // 2), (255, 255, 255), 4)
+        cv2.putText(frame, f"CAM {index:03d}", (40, 80), cv2.FONT_HERSHEY_SIMPLEX, 2, (0, 0, 0), 3)
+        noise = rng.integers(-8, 8, size=frame.shape, dtype=np.int16)
+        frames.append(np.clip(frame.astype(np.int16) + noise, 0, 255).astype(np.uint8))
+    return frames
+
+
+def _video_frames(path: str, count: int) -> List[np.ndarray]:
+    cap = cv2.VideoCapture(path)
+    frames = []
+    while len(frames) < count:
+        ok, frame = cap.read()
+        if not ok:
+            break
+        frames.append(frame)
+    cap.release()
+    if not frames:
+        raise SystemExit(f"could not read frames from {path}")
+    return frames
+
+
+def _measure(
+    encode: Callable[[np.ndarray, int], Optional[bytes]], frames: List[np.ndarray], quality: int, repeat: int
+) -> Tuple[float, float]:
+    timings = []
+    sizes = []
+    for frame in frames:
+        for _ in range(repeat):
+            started = time.perf_counter()
+            payload = encode(frame, quality)
+            timings.append(time.perf_counter() - started)
+        sizes.append(len(payload or b""))
+    return statistics.median(timings) * 1000, statistics.mean(sizes) / 1024
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--source", help="Local video file to sample frames from")
+    parser.add_argument("--image", help="Local image file to use as the frame")
+    parser.add_argument("--frames", type=int, default=10)
+    parser.add_argument("--width", type=int, default=1920)
+    parser.add_argument("--height", type=int, default=1080)
+    parser.add_argument("--quality", type=int, nargs="+", default=[85])
+    parser.add_argument("--repeat", type=int, default=3, help="Encodes per frame per configuration")
+    args = parser.parse_args()
+
+    if args.image:
+        image = cv2.imread(args.image, cv2.IMREAD_COLOR)
+        if image is None:
+            raise SystemExit(f"could not read {args.image}")
+        frames = [image]
+    elif args.source:
+        frames = _video_frames(args.source, args.frames)
+    else:
+        frames = _synthetic_frames(args.frames, args.width, args.height)
+
+    i420_frames = [cv2.cvtColor(frame, cv2.COLOR_BGR2YUV_I420) for frame in frames]
+    height, width = frames[0].shape[:2]
+    print(f"{len(frames)} frame(s) at {width}x{height}; backends: {', '.join(available_encoders())}")
+    print(f"{'backend':<11} {'options':<12} {'q':>3} {'median ms':>10} {'mean KiB':>9}")
+    for name in available_encoders():
+        for label, (option, options) in OPTION_SETS.items():
+            if option is not None and option not in ENCODERS[name].supported_options:
+                continue
+            encoder = create_encoder(name, options)
+            for quality in args.quality:
+                median_ms, mean_kib = _measure(encoder.encode, frames, quality, args.repeat)
+                print(f"{name:<11} {label:<12} {quality:>3} {median_ms:>10.2f} {mean_kib:>9.1f}")
+        encoder = create_encoder(name, EncoderOptions())
+        for quality in args.quality:
+            median_ms, mean_kib = _measure(encoder.encode_i420, i420_frames, quality, args.repeat)
+            print(f"{name:<11} {'i420':<12} {quality:>3} {median_ms:>10.2f} {mean_kib:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
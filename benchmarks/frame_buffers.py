@@ -0,0 +1,128 @@
+"""Compare allocation churn and RSS of fresh vs pooled capture buffers.
+
+Usage::
+
+    python benchmarks/frame_buffers.py --frames 5000 --width 1920 --height 1080
+    python benchmarks/frame_buffers.py --source clip.mp4 --frames 2000
+
+Without ``--source`` a synthetic capture fills frames in place, which isolates
+allocator behaviour from decode cost.  Each mode runs the same loop the worker
+uses (read, publish into ``cache.FRAME_CACHE``) and reports the number of new
+arrays, total bytes allocated for frames, traced peak and resident set size.
+"""
+
+from __future__ import annotations
+
+import argparse
+import gc
+import os
+import resource
+import time
+import tracemalloc
+from typing import Optional
+
+import cv2
+import numpy as np
+
+from rtsp2jpg import cache
+from rtsp2jpg.buffers import FrameBufferPool
+
+
+class _SyntheticCapture:
+    def __init__(self, width: int, height: int) -> None:
+        self._shape = (height, width, 3)
+        self._tick = 0
+
+    def read(self, image: Optional[np.ndarray] = None):
+        if image is None or image.shape != self._shape:
+            image = np.empty(self._shape, dtype=np.uint8)
+        self._tick = (self._tick + 1) % 255
+        image[...] = self._tick
+        return True, image
+
+    def release(self) -> None:
+        return None
+
+
+class _LoopingCapture:
+    def __init__(self, path: str) -> None:
+        self._path = path
+        self._cap = cv2.VideoCapture(path)
+
+    def read(self, image: Optional[np.ndarray] = None):
+        ok, frame = self._cap.read(image) if image is not None else self._cap.read()
+        if not ok:
+            self._cap.release()
+            self._cap = cv2.VideoCapture(self._path)
+            ok, frame = self._cap.read(image) if image is not None else self._cap.read()
+        return ok, frame
+
+    def release(self) -> None:
+        self._cap.release()
+
+
+def _current_rss_bytes() -> int:
+    try:
+        with open("/proc/self/statm") as handle:
+            return int(handle.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:  # pragma: no cover - non-Linux fallback
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def _run(cap, frames: int, pooled: bool) -> dict:
+    pool = FrameBufferPool(3) if pooled else None
+    allocated_bytes = 0
+    gc.collect()
+    tracemalloc.start()
+    rss_start = _current_rss_bytes()
+    started = time.perf_counter()
+    for _ in range(frames):
+        buffer = pool.acquire() if pool is not None else None
+        ok, frame = cap.read(buffer) if buffer is not None else cap.read()
+        if not ok:
+            continue
+        if pool is not None:
+            pool.adopt(frame, buffer)
+        if frame is not buffer:
+            allocated_bytes += frame.nbytes
+        with cache.CACHE_LOCK:
+            cache.FRAME_CACHE["bench"] = frame
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    rss_end = _current_rss_bytes()
+    with cache.CACHE_LOCK:
+        cache.FRAME_CACHE.pop("bench", None)
+    return {
+        "mode": "pooled" if pooled else "fresh",
+        "fps": frames / elapsed if elapsed else float("inf"),
+        "allocations": pool.allocations if pool is not None else frames,
+        "allocated_mb": allocated_bytes / 1e6,
+        "traced_peak_mb": peak / 1e6,
+        "rss_delta_mb": (rss_end - rss_start) / 1e6,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--frames", type=int, default=3000)
+    parser.add_argument("--width", type=int, default=1920)
+    parser.add_argument("--height", type=int, default=1080)
+    parser.add_argument("--source", help="Optional local video file to decode in a loop")
+    args = parser.parse_args()
+
+    for pooled in (False, True):
+        if args.source:
+            cap = _LoopingCapture(args.source)
+        else:
+            cap = _SyntheticCapture(args.width, args.height)
+        result = _run(cap, args.frames, pooled)
+        cap.release()
+        print(
+            "{mode:>6}: {fps:8.1f} fps  new arrays={allocations:<6d} allocated={allocated_mb:9.1f} MB "
+            "traced peak={traced_peak_mb:7.1f} MB  rss delta={rss_delta_mb:7.1f} MB".format(**result)
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -4,11 +4,14 @@ from __future__ import annotations
 
 from fastapi import APIRouter
 
-from . import cameras, snapshot, status
+from . import cameras, frame, snapshot, status, stream, views
 
 api_router = APIRouter()
 api_router.include_router(cameras.router)
 api_router.include_router(snapshot.router)
+api_router.include_router(frame.router)
 api_router.include_router(status.router)
+api_router.include_router(stream.router)
+api_router.include_router(views.router)
 
 __all__ = ["api_router"]
@@ -1,30 +1,57 @@
-"""Camera registration endpoints."""
+"""Camera registration and per-camera profile endpoints."""
 
 from __future__ import annotations
 
+import dataclasses
 import uuid
-from typing import Optional
+from typing import Any, Dict, List, Literal, Optional
 
 from fastapi import APIRouter, Body, HTTPException
 from pydantic import BaseModel, Field
 
 from .. import cache, db, worker
-from ..backends import choose_backend
+from ..backends import backend_name, choose_backend
+from ..config import get_settings
+from ..export import EXPORTER
+from ..pipelines import CaptureOptions, validate_options
+from ..profiles import CameraProfile
+from .views import refresh_views
 
 router = APIRouter(tags=["cameras"])
 
 
 class RegisterRequest(BaseModel):
     rtsp_url: str = Field(..., description="RTSP URL to register")
+    substream_url: Optional[str] = Field(
+        default=None,
+        description="Low-resolution substream decoded continuously; rtsp_url is then opened only on demand",
+    )
     prefer: Optional[str] = Field(
         default=None,
         description="Preferred backend (ffmpeg|gstreamer|default)",
     )
+    decode_profile: Literal["full", "keyframe", "lowres"] = Field(
+        default="full",
+        description="Decode profile (full|keyframe|lowres); keyframe/lowres save CPU on snapshot-rate cameras",
+    )
+    transport: Optional[Literal["tcp", "udp", "auto"]] = Field(
+        default=None,
+        description="GStreamer RTSP transport override",
+    )
+    latency_ms: Optional[int] = Field(default=None, ge=0, description="GStreamer rtspsrc latency override")
+    decoder: Optional[str] = Field(
+        default=None,
+        description="GStreamer decoder element(s) override, e.g. 'rtph264depay ! h264parse ! avdec_h264'",
+    )
+
+    def capture_options(self) -> CaptureOptions:
+        return CaptureOptions(self.decode_profile, self.transport, self.latency_ms, self.decoder)
 
 
 class RegisterResponse(BaseModel):
     token: str
     backend: str
+    shared_capture: bool = False
 
 
 class UnregisterResponse(BaseModel):
@@ -34,10 +61,29 @@ class UnregisterResponse(BaseModel):
 
 @router.post("/register", response_model=RegisterResponse)
 def register_camera(payload: RegisterRequest = Body(...)) -> RegisterResponse:
+    options = payload.capture_options()
+    substream_url = payload.substream_url or None
     try:
-        backend_flag, backend_label = choose_backend(payload.rtsp_url, payload.prefer)
+        validate_options(payload.rtsp_url, options)
+        if substream_url:
+            validate_options(substream_url, options)
     except ValueError as exc:
         raise HTTPException(status_code=400, detail=str(exc)) from exc
+    # A stream that is already being captured is not probed again: the new
+    # token joins the running capture.
+    shared = None
+    if payload.prefer is None:
+        shared = worker.find_shared_capture(payload.rtsp_url, options, substream_url=substream_url)
+    if shared is not None:
+        backend_flag = worker.backend_flag_for(shared)
+        backend_label = backend_name(backend_flag)
+    else:
+        try:
+            # The continuously decoded stream is the one that has to open now.
+            probe_url = substream_url or payload.rtsp_url
+            backend_flag, backend_label = choose_backend(probe_url, payload.prefer, options=options)
+        except ValueError as exc:
+            raise HTTPException(status_code=400, detail=str(exc)) from exc
 
     # Generate a unique token for the camera registration.  While UUID4 collisions
     # are already extremely unlikely, we still check existing entries to avoid
@@ -47,11 +93,11 @@ def register_camera(payload: RegisterRequest = Body(...)) -> RegisterResponse:
         if not db.get_camera(token):
             break
 
-    cache.set_status(token, "connecting")
-    db.add_camera(token, payload.rtsp_url, status="connecting")
-    worker.start_worker(token, payload.rtsp_url, backend_flag)
+    cache.set_status(token, "connecting", backend=backend_label)
+    db.add_camera(token, payload.rtsp_url, status="connecting", options=options, substream_url=substream_url)
+    worker.start_worker(token, payload.rtsp_url, backend_flag, capture=options, substream_url=substream_url)
 
-    return RegisterResponse(token=token, backend=backend_label)
+    return RegisterResponse(token=token, backend=backend_label, shared_capture=shared is not None)
 
 
 @router.post("/unregister/{token}", response_model=UnregisterResponse)
@@ -62,5 +108,106 @@ def unregister_camera(token: str) -> UnregisterResponse:
 
     worker.stop_worker(token)
     cache.clear(token)
+    EXPORTER.remove(token)
     db.delete_camera(token)
     return UnregisterResponse(ok=True)
+
+
+class RestartRequest(BaseModel):
+    tokens: Optional[List[str]] = Field(default=None, description="Cameras to reconnect; omit for all")
+    batch_size: Optional[int] = Field(default=None, ge=1, description="Captures reconnected per batch")
+    interval_sec: Optional[float] = Field(default=None, ge=0, description="Pause between batches")
+
+
+class RestartStatus(BaseModel):
+    state: Literal["idle", "running", "done", "cancelled", "failed"]
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    pending: Optional[int] = Field(default=None, description="Captures not yet restarted")
+    restarted: List[str] = Field(default_factory=list)
+    stuck: List[str] = Field(default_factory=list)
+    not_running: List[str] = Field(default_factory=list)
+
+
+@router.post("/restart", response_model=RestartStatus, status_code=202)
+def restart_cameras(payload: RestartRequest = Body(default_factory=RestartRequest)) -> RestartStatus:
+    """Start reconnecting cameras in rolling batches; progress is reported by ``GET /restart``."""
+
+    progress = worker.start_restart(payload.tokens, payload.batch_size, payload.interval_sec)
+    if progress is None:
+        raise HTTPException(status_code=409, detail="A restart is already running")
+    return RestartStatus(**progress)
+
+
+@router.get("/restart", response_model=RestartStatus)
+def restart_progress() -> RestartStatus:
+    return RestartStatus(**worker.restart_status())
+
+
+class ProfileUpdate(BaseModel):
+    """Profile fields to change; omitted fields are kept, ``null`` restores the global default."""
+
+    read_throttle_sec: Optional[float] = Field(default=None, ge=0)
+    jpeg_quality: Optional[int] = Field(default=None, ge=1, le=100)
+    reconnect_delay_sec: Optional[float] = Field(default=None, ge=0)
+    decoder_warning_window_sec: Optional[float] = Field(default=None, ge=0)
+    priority_class: Optional[Literal["critical", "normal", "background"]] = None
+    decode_profile: Optional[Literal["full", "keyframe", "lowres"]] = None
+    transport: Optional[Literal["tcp", "udp", "auto"]] = None
+    latency_ms: Optional[int] = Field(default=None, ge=0)
+    decoder: Optional[str] = None
+
+
+class ProfileResponse(BaseModel):
+    token: str
+    overrides: Dict[str, Any]
+    effective: Dict[str, Any]
+
+
+def _profile_response(token: str, profile: CameraProfile, capture: CaptureOptions) -> ProfileResponse:
+    overrides = {**dataclasses.asdict(profile), **dataclasses.asdict(capture)}
+    effective = profile.resolve(get_settings())._asdict()
+    effective["decode_profile"] = capture.decode_profile
+    return ProfileResponse(token=token, overrides=overrides, effective=effective)
+
+
+@router.get("/profile/{token}", response_model=ProfileResponse)
+def get_profile(token: str) -> ProfileResponse:
+    camera = db.get_camera(token)
+    if not camera:
+        raise HTTPException(status_code=404, detail="Invalid token")
+    return _profile_response(token, camera.profile, camera.capture_options)
+
+
+@router.patch("/profile/{token}", response_model=ProfileResponse)
+def update_profile(token: str, payload: ProfileUpdate = Body(...)) -> ProfileResponse:
+    """Change a camera's profile; the running worker applies it without a restart."""
+
+    camera = db.get_camera(token)
+    if not camera:
+        raise HTTPException(status_code=404, detail="Invalid token")
+
+    changes = payload.model_dump(exclude_unset=True)
+    if "decode_profile" in changes and changes["decode_profile"] is None:
+        changes["decode_profile"] = "full"
+    profile_fields = {field.name for field in dataclasses.fields(CameraProfile)}
+    profile = dataclasses.replace(
+        camera.profile, **{name: value for name, value in changes.items() if name in profile_fields}
+    )
+    capture = dataclasses.replace(
+        camera.capture_options, **{name: value for name, value in changes.items() if name not in profile_fields}
+    )
+    try:
+        validate_options(camera.rtsp_url, capture)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+
+    db.update_camera(token, changes)
+    worker.update_profile(
+        token,
+        profile=profile,
+        capture=capture if capture != camera.capture_options else None,
+    )
+    if "jpeg_quality" in changes:
+        refresh_views(token)
+    return _profile_response(token, profile, capture)
@@ -0,0 +1,87 @@
+"""Raw (unencoded) frame endpoint for analytics consumers."""
+
+from __future__ import annotations
+
+import io
+from email.utils import formatdate
+from typing import Literal, Optional, Tuple
+
+import numpy as np
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import Response
+
+from .. import cache
+
+router = APIRouter(tags=["frame"])
+
+
+def _parse_crop(crop: Optional[str]) -> Optional[Tuple[int, int, int, int]]:
+    if crop is None:
+        return None
+    try:
+        x, y, width, height = (int(part) for part in crop.split(","))
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail="crop must be 'x,y,width,height'") from exc
+    if width <= 0 or height <= 0:
+        raise HTTPException(status_code=400, detail="crop width and height must be positive")
+    return x, y, width, height
+
+
+def _body(*parts) -> bytes:
+    """Join ``parts`` into one ``bytes`` body, copying each buffer exactly once.
+
+    Starlette before 0.38 only accepts ``bytes`` (or ``str``) bodies, so the
+    array cannot be sent as a buffer.
+    """
+
+    return b"".join(parts)
+
+
+def _npy_header(array: np.ndarray) -> bytes:
+    header = io.BytesIO()
+    np.lib.format.write_array_header_1_0(header, np.lib.format.header_data_from_array_1_0(array))
+    return header.getvalue()
+
+
+@router.get("/frame/{token}")
+def frame(
+    token: str,
+    format: Literal["npy", "raw"] = Query(default="npy", description="npy file or bare array bytes"),
+    width: Optional[int] = Query(default=None, ge=1, le=7680),
+    height: Optional[int] = Query(default=None, ge=1, le=4320),
+    fit: Literal["contain", "cover", "fill"] = Query(default="contain"),
+    crop: Optional[str] = Query(default=None, description="x,y,width,height in full-frame pixels"),
+    gray: bool = Query(default=False, description="Return a single-channel luma image"),
+) -> Response:
+    """Return the latest decoded frame as a NumPy array, without JPEG encoding."""
+
+    try:
+        result = cache.raw_frame(token, width, height, fit, _parse_crop(crop), gray)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+    if result is None:
+        raise HTTPException(status_code=503, detail="No frame available yet")
+
+    # Contiguous arrays (the common untransformed case) are read from their
+    # own buffer; only crops produce a strided view that needs a copy first.
+    array = np.ascontiguousarray(result.array)
+    buffer = memoryview(array).cast("B")
+    headers = {
+        "X-Frame-Shape": ",".join(str(dim) for dim in array.shape),
+        "X-Frame-Dtype": array.dtype.str,
+        "X-Frame-Pixel-Format": "gray" if gray else "bgr",
+        "X-Frame-Seq": str(result.seq),
+        "X-Frame-Source": "jpeg" if result.decoded else "frame",
+        "Cache-Control": "no-cache",
+    }
+    if result.last_seen is not None:
+        headers["Last-Modified"] = formatdate(result.last_seen, usegmt=True)
+    if cache.is_stale(token):
+        headers["X-Frame-Stale"] = "1"
+
+    if format == "raw":
+        return Response(content=_body(buffer), media_type="application/octet-stream", headers=headers)
+    headers["Content-Disposition"] = f'inline; filename="{token}.npy"'
+    return Response(
+        content=_body(_npy_header(array), buffer), media_type="application/octet-stream", headers=headers
+    )
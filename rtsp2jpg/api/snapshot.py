@@ -2,17 +2,299 @@
 
 from __future__ import annotations
 
-from fastapi import APIRouter, HTTPException, Query
+import asyncio
+import uuid
+from email.utils import formatdate
+from typing import List, Literal, Optional
+
+from fastapi import APIRouter, Body, Header, HTTPException, Query
+from fastapi.concurrency import run_in_threadpool
 from fastapi.responses import Response
+from pydantic import BaseModel, Field
 
-from .. import cache
+from .. import cache, worker
+from ..config import get_settings
+from ..executor import EncoderBusy, get_encode_executor
+from ..variants import Variant
 
 router = APIRouter(tags=["snapshot"])
 
+MAX_BATCH_TOKENS = 256
+
+
+class BatchSnapshotRequest(BaseModel):
+    tokens: List[str] = Field(..., min_length=1, max_length=MAX_BATCH_TOKENS)
+    q: Optional[int] = Field(
+        default=None, ge=1, le=100, description="JPEG quality (default: serve the cached JPEG as is)"
+    )
+    width: Optional[int] = Field(default=None, ge=1, le=7680)
+    height: Optional[int] = Field(default=None, ge=1, le=4320)
+    fit: Literal["contain", "cover", "fill"] = "contain"
+    preset: Optional[str] = Field(default=None, description="Named snapshot preset")
+
+
+def _resolve_variant(
+    token: str,
+    q: Optional[int],
+    width: Optional[int],
+    height: Optional[int],
+    fit: str,
+    preset: Optional[str],
+) -> Variant:
+    """Resolve the request's variant; without ``q`` the cached JPEG's quality applies."""
+
+    if preset is None:
+        return Variant(q if q is not None else cache.cached_quality(token), width, height, fit)
+    try:
+        return cache.preset_for(token, preset, q)
+    except KeyError as exc:
+        raise HTTPException(status_code=400, detail=f"Unknown preset '{preset}'") from exc
+
+
+def _etag(seq: int, variant: Variant) -> str:
+    size = f"{variant.width or 0}x{variant.height or 0}"
+    crop = "-c" + "_".join(str(value) for value in variant.crop) if variant.crop is not None else ""
+    return f'"{cache.INSTANCE_ID}-{seq}-q{variant.quality}-{size}-{variant.fit}{crop}"'
+
+
+def _etag_matches(header: Optional[str], etag: str) -> bool:
+    if not header:
+        return False
+    candidates = {candidate.strip() for candidate in header.split(",")}
+    return "*" in candidates or etag in candidates or f"W/{etag}" in candidates
+
+
+async def _wait_for_newer(token: str, after: int, timeout: float) -> Optional[cache.Snapshot]:
+    """Park until a frame newer than ``after`` is published or ``timeout`` expires.
+
+    Sequence numbers restart with the process: an ``after`` ahead of the
+    current frame was issued by an earlier run and returns the latest frame
+    at once.
+    """
+
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    # Subscribe before looking at the cache so a frame stored in between is not missed.
+    with cache.FRAME_BROADCASTER.subscribe(token) as subscription:
+        current = cache.latest_snapshot(token)
+        while current is None or current.seq == after:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            item = await subscription.next(timeout=remaining)
+            if item is not None:
+                current = item
+    return current
+
+
+async def request_full_resolution(token: str) -> Optional[bool]:
+    """``worker.request_full_resolution`` without blocking the event loop.
+
+    Opening a main stream takes the worker lifecycle lock, so that case runs
+    on the threadpool; every other case is a lock-free lookup.
+    """
+
+    if worker.has_main_stream(token) and not worker.main_stream_live(token):
+        return await run_in_threadpool(worker.request_full_resolution, token)
+    return worker.request_full_resolution(token)
+
+
+async def _await_full_resolution(token: str) -> None:
+    """Open a dual-stream camera's main stream and give it a moment to deliver.
+
+    Falls through to the substream frame when the main stream is not
+    delivering within ``main_stream_wait_sec``.
+    """
+
+    if await request_full_resolution(token) is not False:
+        return
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + get_settings().main_stream_wait_sec
+    with cache.FRAME_BROADCASTER.subscribe(token) as subscription:
+        while not worker.main_stream_live(token):
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                return
+            await subscription.next(timeout=min(remaining, 0.25))
+
+
+async def _encode_or_shed(token: str, variant: Variant) -> Optional[bytes]:
+    """Encode on the dedicated executor, applying the overload policy when it is full."""
+
+    try:
+        return await get_encode_executor().run(
+            cache.get_jpeg,
+            token,
+            quality=variant.quality,
+            width=variant.width,
+            height=variant.height,
+            fit=variant.fit,
+        )
+    except EncoderBusy:
+        settings = get_settings()
+        if settings.encode_overload_policy == "serve_default":
+            fallback = cache.peek_jpeg(token)
+            if fallback is not None:
+                return fallback
+        raise HTTPException(
+            status_code=503,
+            detail="Encoder busy",
+            headers={"Retry-After": str(settings.encode_retry_after_sec)},
+        )
+
 
 @router.get("/snapshot/{token}")
-def snapshot(token: str, q: int = Query(default=100, ge=1, le=100)) -> Response:
-    jpeg = cache.get_jpeg(token, quality=q)
+async def snapshot(
+    token: str,
+    q: Optional[int] = Query(default=None, ge=1, le=100, description="JPEG quality (default: the cached JPEG's)"),
+    width: Optional[int] = Query(default=None, ge=1, le=7680),
+    height: Optional[int] = Query(default=None, ge=1, le=4320),
+    fit: Literal["contain", "cover", "fill"] = Query(default="contain"),
+    preset: Optional[str] = Query(default=None),
+    after: Optional[int] = Query(default=None, ge=0, description="Wait for a frame newer than this sequence"),
+    timeout: float = Query(default=10.0, gt=0, description="Long-poll timeout in seconds"),
+    if_none_match: Optional[str] = Header(default=None),
+) -> Response:
+    variant = _resolve_variant(token, q, width, height, fit, preset)
+    if variant.width is None and variant.height is None:
+        await _await_full_resolution(token)
+
+    if after is not None:
+        timeout = min(timeout, get_settings().snapshot_long_poll_max_sec)
+        newest = await _wait_for_newer(token, after, timeout)
+        if newest is None:
+            raise HTTPException(status_code=503, detail="No frame available yet")
+        if newest.seq == after:
+            return Response(status_code=304, headers={"ETag": _etag(newest.seq, variant)})
+
+    # Read the sequence before fetching the payload: if a newer frame lands in
+    # between, the ETag under-reports and the client merely downloads it again.
+    seq, last_seen = cache.frame_info(token)
+    etag = _etag(seq, variant)
+    headers = {"ETag": etag, "X-Frame-Seq": str(seq), "Cache-Control": "no-cache"}
+    if last_seen is not None:
+        headers["Last-Modified"] = formatdate(last_seen, usegmt=True)
+    if seq and _etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+
+    jpeg = cache.peek_jpeg(token, variant.quality, variant.width, variant.height, variant.fit)
+    if jpeg is None:
+        jpeg = await _encode_or_shed(token, variant)
     if not jpeg:
         raise HTTPException(status_code=503, detail="No frame available yet")
-    return Response(content=jpeg, media_type="image/jpeg")
+    if cache.is_stale(token):
+        headers["X-Frame-Stale"] = "1"
+    return Response(content=jpeg, media_type="image/jpeg", headers=headers)
+
+
+@router.get("/snapshot/{token}/views/{name}")
+async def view_snapshot(
+    token: str,
+    name: str,
+    if_none_match: Optional[str] = Header(default=None),
+) -> Response:
+    """Return a named view; views read recently are rendered once per new frame."""
+
+    variant = cache.VIEWS.get(token, {}).get(name)
+    if variant is None:
+        raise HTTPException(status_code=404, detail="Unknown view")
+    # View crops are defined on the full-resolution frame.
+    await _await_full_resolution(token)
+
+    seq, last_seen = cache.frame_info(token)
+    etag = _etag(seq, variant)
+    headers = {"ETag": etag, "X-Frame-Seq": str(seq), "Cache-Control": "no-cache"}
+    if last_seen is not None:
+        headers["Last-Modified"] = formatdate(last_seen, usegmt=True)
+    try:
+        jpeg = cache.peek_view(token, name)
+        if seq and _etag_matches(if_none_match, etag):
+            return Response(status_code=304, headers=headers)
+        if jpeg is None:
+            jpeg = await get_encode_executor().run(cache.get_view, token, name)
+    except KeyError as exc:
+        raise HTTPException(status_code=404, detail="Unknown view") from exc
+    except ValueError as exc:
+        raise HTTPException(status_code=409, detail=str(exc)) from exc
+    except EncoderBusy as exc:
+        raise HTTPException(
+            status_code=503,
+            detail="Encoder busy",
+            headers={"Retry-After": str(get_settings().encode_retry_after_sec)},
+        ) from exc
+    if not jpeg:
+        raise HTTPException(status_code=503, detail="No frame available yet")
+    if cache.is_stale(token):
+        headers["X-Frame-Stale"] = "1"
+    return Response(content=jpeg, media_type="image/jpeg", headers=headers)
+
+
+@router.post("/snapshots")
+async def snapshots(payload: BatchSnapshotRequest = Body(...)) -> Response:
+    """Return the current JPEG of many cameras as one ``multipart/mixed`` body.
+
+    Cached payloads are read lock-free; the remaining tiles are encoded
+    together as one job on the encode executor.
+    """
+
+    variant = _resolve_variant(payload.tokens[0], payload.q, payload.width, payload.height, payload.fit, payload.preset)
+    # Without an explicit quality each camera resolves to its cached JPEG's
+    # quality (see ``cache.preset_for``), so the worker's JPEG and eager
+    # pre-renders are served as is.
+    quality = payload.q
+    if quality is None and payload.preset is not None:
+        quality = get_settings().snapshot_presets[payload.preset].quality
+    if variant.width is None and variant.height is None:
+        for token in payload.tokens:
+            await request_full_resolution(token)
+
+    items: List[Optional[cache.Snapshot]] = [
+        cache.peek_snapshot(token, quality, variant.width, variant.height, variant.fit) for token in payload.tokens
+    ]
+    misses = [token for token, item in zip(payload.tokens, items) if item is None]
+    if misses:
+        try:
+            encoded = await get_encode_executor().run(
+                cache.get_jpegs, misses, quality=quality, width=variant.width, height=variant.height, fit=variant.fit
+            )
+        except EncoderBusy:
+            settings = get_settings()
+            if settings.encode_overload_policy != "serve_default":
+                raise HTTPException(
+                    status_code=503,
+                    detail="Encoder busy",
+                    headers={"Retry-After": str(settings.encode_retry_after_sec)},
+                )
+            encoded = [cache.peek_snapshot(token) for token in misses]
+        by_token = dict(zip(misses, encoded))
+        items = [item if item is not None else by_token[token] for token, item in zip(payload.tokens, items)]
+
+    boundary = uuid.uuid4().hex
+    chunks: List[bytes] = []
+    for item in items:
+        headers = [
+            f"X-Token: {item.token}",
+            f"X-Camera-Status: {item.status}",
+            f"X-Frame-Seq: {item.seq}",
+        ]
+        if item.last_seen is not None:
+            headers.append(f"X-Frame-Timestamp: {item.last_seen:.6f}")
+        if item.jpeg and cache.is_stale(item.token):
+            headers.append("X-Frame-Stale: 1")
+        if item.jpeg:
+            headers.insert(0, "Content-Type: image/jpeg")
+            body = item.jpeg
+        else:
+            headers.insert(0, "Content-Type: text/plain")
+            body = b"No frame available yet"
+        headers.append(f"Content-Length: {len(body)}")
+        chunks.append(f"--{boundary}\r\n".encode())
+        chunks.append(("\r\n".join(headers) + "\r\n\r\n").encode())
+        chunks.append(body)
+        chunks.append(b"\r\n")
+    chunks.append(f"--{boundary}--\r\n".encode())
+
+    return Response(
+        content=b"".join(chunks),
+        media_type=f"multipart/mixed; boundary={boundary}",
+    )
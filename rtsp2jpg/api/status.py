@@ -2,11 +2,23 @@
 
 from __future__ import annotations
 
-from fastapi import APIRouter, HTTPException
+import json
+from typing import AsyncIterator, List, Optional, Set, Tuple
+
+import anyio.to_thread
+from fastapi import APIRouter, Header, HTTPException, Query
+from fastapi.responses import StreamingResponse
 
 from .. import cache, db
 from ..backends import backend_name, build_supports
-from ..worker import backend_flag_for
+from ..config import get_settings
+from ..events import STATUS_EVENTS, StatusEvent
+from ..executor import get_encode_executor
+from ..export import EXPORTER
+from ..scheduler import SCHEDULER
+from ..shedding import SHEDDER
+from ..watchdog import WATCHDOG
+from ..worker import backend_flag_for, capture_group, capture_stats, main_stream_live
 
 router = APIRouter(tags=["status"])
 
@@ -16,6 +28,27 @@ def health() -> dict:
     return {"ok": True, "backends_built": build_supports()}
 
 
+@router.get("/metrics")
+async def metrics() -> dict:
+    limiter = anyio.to_thread.current_default_thread_limiter()
+    return {
+        "cache": cache.memory_usage(),
+        "stream_subscribers": cache.FRAME_BROADCASTER.subscriber_count(),
+        "event_subscribers": STATUS_EVENTS.broadcaster.subscriber_count(),
+        "encode_executor": get_encode_executor().stats(),
+        "captures": capture_stats(),
+        "decode_scheduler": SCHEDULER.stats(),
+        "load_shedding": SHEDDER.stats(),
+        "watchdog": WATCHDOG.stats(),
+        "export": EXPORTER.stats(),
+        "threadpool": {
+            "total_tokens": limiter.total_tokens,
+            "borrowed_tokens": limiter.borrowed_tokens,
+            "waiting": limiter.statistics().tasks_waiting,
+        },
+    }
+
+
 @router.get("/status/{token}")
 def status(token: str) -> dict:
     camera = db.get_camera(token)
@@ -24,11 +57,77 @@ def status(token: str) -> dict:
 
     status_info = cache.get_status(token)
     backend = backend_name(backend_flag_for(token))
+    grant = SCHEDULER.grant(capture_group(token))
 
     return {
         "token": token,
         "status": status_info["status"],
         "last_seen": status_info["last_seen"],
+        "stale": cache.is_stale(token),
         "backend": backend,
         "error": status_info["error"],
+        "priority_class": grant.priority_class if grant else None,
+        "requested_fps": grant.requested_fps if grant else None,
+        "granted_fps": grant.granted_fps if grant else None,
+        "main_stream": ("live" if main_stream_live(token) else "idle") if camera.substream_url else None,
     }
+
+
+def _resume_point(last_event_id: Optional[str]) -> Tuple[int, bool]:
+    """Return the event id to resume after and whether events were certainly missed.
+
+    Without an id the client starts with new events.  Ids issued by an
+    earlier process (or unparsable ones) replay the whole buffer.
+    """
+
+    if not last_event_id:
+        return STATUS_EVENTS.last_id, False
+    instance, _, number = last_event_id.rpartition("-")
+    if instance != cache.INSTANCE_ID or not number.isdigit():
+        return 0, True
+    return int(number), False
+
+
+def _sse(event: str, data: dict, event_id: Optional[str] = None) -> bytes:
+    lines = [f"id: {event_id}"] if event_id is not None else []
+    lines += [f"event: {event}", f"data: {json.dumps(data)}", "", ""]
+    return "\n".join(lines).encode()
+
+
+def _status_message(event: StatusEvent) -> bytes:
+    return _sse("status", event.as_dict(), f"{cache.INSTANCE_ID}-{event.id}")
+
+
+async def _status_event_stream(
+    tokens: Optional[Set[str]], last_id: int, missed: bool
+) -> AsyncIterator[bytes]:
+    keepalive = get_settings().status_event_keepalive_sec
+    with STATUS_EVENTS.subscribe() as subscription:
+        while True:
+            events, lost = STATUS_EVENTS.since(last_id)
+            if lost or missed:
+                # Clients should re-read /status for the cameras they follow.
+                yield _sse("resync", {"reason": "events before the replay buffer were dropped"})
+                missed = False
+            for event in events:
+                last_id = event.id
+                if tokens is None or event.token in tokens:
+                    yield _status_message(event)
+            if await subscription.next(keepalive if keepalive > 0 else None) is None:
+                yield b": keepalive\n\n"
+
+
+@router.get("/events")
+async def status_events(
+    token: Optional[List[str]] = Query(default=None),
+    last_event_id: Optional[str] = Query(default=None),
+    last_event_id_header: Optional[str] = Header(default=None, alias="Last-Event-ID"),
+) -> StreamingResponse:
+    """Server-Sent Events stream of status transitions, optionally filtered by token."""
+
+    last_id, missed = _resume_point(last_event_id_header or last_event_id)
+    return StreamingResponse(
+        _status_event_stream(set(token) if token else None, last_id, missed),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -0,0 +1,321 @@
+"""Live MJPEG and WebSocket streaming endpoints."""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import struct
+from typing import AsyncIterator, Dict, Literal, NamedTuple, Optional, Tuple
+
+from fastapi import APIRouter, HTTPException, Query, WebSocket, WebSocketDisconnect
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field, ValidationError
+
+from .. import cache, db
+from ..config import get_settings
+from ..executor import EncoderBusy, get_encode_executor
+from ..variants import Variant
+from .snapshot import request_full_resolution
+
+LOGGER = logging.getLogger(__name__)
+
+router = APIRouter(tags=["stream"])
+
+MJPEG_BOUNDARY = "rtsp2jpgframe"
+MAX_SOCKET_SUBSCRIPTIONS = 256
+
+
+async def _is_registered(token: str) -> bool:
+    return await run_in_threadpool(db.get_camera, token) is not None
+
+
+class _VariantRequest(NamedTuple):
+    """Requested variant options, resolved per frame against the camera's current quality."""
+
+    q: Optional[int]
+    width: Optional[int]
+    height: Optional[int]
+    fit: str
+    preset: Optional[str]
+
+    def resolve(self, token: str) -> Variant:
+        if self.preset is not None:
+            return cache.preset_for(token, self.preset, self.q)
+        return Variant(self.q if self.q is not None else cache.cached_quality(token), self.width, self.height, self.fit)
+
+
+def _requested_variant(
+    q: Optional[int],
+    width: Optional[int],
+    height: Optional[int],
+    fit: str,
+    preset: Optional[str],
+) -> Optional[_VariantRequest]:
+    """Return the variant to stream, or ``None`` for the worker's own JPEG.
+
+    The quality is resolved for every frame, so a camera whose quality changes
+    (per-camera profile, load shedding) keeps hitting its eager pre-renders.
+    Raises ``KeyError`` for unknown presets.
+    """
+
+    if preset is not None:
+        if preset not in get_settings().snapshot_presets:
+            raise KeyError(preset)
+        return _VariantRequest(q, None, None, "contain", preset)
+    if q is not None or width is not None or height is not None:
+        return _VariantRequest(q, width, height, fit, None)
+    return None
+
+
+def _min_interval(fps: Optional[float]) -> float:
+    max_fps = get_settings().stream_max_fps
+    rate = min(fps, max_fps) if fps is not None else max_fps
+    return 1.0 / rate if rate > 0 else 0.0
+
+
+async def _jpeg_for(item: cache.Snapshot, request: Optional[_VariantRequest]) -> Optional[bytes]:
+    variant = request.resolve(item.token) if request is not None else None
+    if variant is None or (variant.width is None and variant.height is None):
+        # Keeps a dual-stream camera's main stream open while someone watches.
+        await request_full_resolution(item.token)
+    if variant is None:
+        return item.jpeg
+    jpeg = cache.peek_jpeg(item.token, variant.quality, variant.width, variant.height, variant.fit)
+    if jpeg is not None:
+        return jpeg
+    try:
+        return await get_encode_executor().run(
+            cache.get_jpeg,
+            item.token,
+            quality=variant.quality,
+            width=variant.width,
+            height=variant.height,
+            fit=variant.fit,
+        )
+    except EncoderBusy:
+        # Skip this frame; the next one will be tried again.
+        return None
+
+
+async def _mjpeg_parts(
+    subscription,
+    first: Optional[cache.Snapshot],
+    variant: Optional[_VariantRequest],
+    min_interval: float,
+) -> AsyncIterator[bytes]:
+    loop = asyncio.get_running_loop()
+    item = first
+    last_seq = -1
+    last_sent: Optional[float] = None
+    try:
+        while True:
+            if item is None or item.seq <= last_seq:
+                item = await subscription.next()
+                continue
+
+            if last_sent is not None:
+                delay = min_interval - (loop.time() - last_sent)
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                    # Frames published while we waited are dropped, not queued.
+                    newer = subscription.latest
+                    if newer is not None and newer.seq > item.seq:
+                        item = newer
+
+            jpeg = await _jpeg_for(item, variant)
+            last_seq = item.seq
+            if not jpeg:
+                continue
+            last_sent = loop.time()
+            header = (
+                f"--{MJPEG_BOUNDARY}\r\n"
+                "Content-Type: image/jpeg\r\n"
+                f"Content-Length: {len(jpeg)}\r\n"
+                f"X-Frame-Seq: {item.seq}\r\n\r\n"
+            )
+            yield header.encode() + jpeg + b"\r\n"
+    finally:
+        subscription.close()
+
+
+@router.get("/stream/{token}")
+async def stream(
+    token: str,
+    fps: Optional[float] = Query(default=None, gt=0),
+    q: Optional[int] = Query(default=None, ge=1, le=100),
+    width: Optional[int] = Query(default=None, ge=1, le=7680),
+    height: Optional[int] = Query(default=None, ge=1, le=4320),
+    fit: Literal["contain", "cover", "fill"] = Query(default="contain"),
+    preset: Optional[str] = Query(default=None),
+) -> StreamingResponse:
+    """Stream the camera as ``multipart/x-mixed-replace`` MJPEG.
+
+    Without size/quality options every client receives the JPEG the worker
+    already encoded; otherwise variants are shared through the variant cache.
+    """
+
+    try:
+        variant = _requested_variant(q, width, height, fit, preset)
+    except KeyError as exc:
+        raise HTTPException(status_code=400, detail=f"Unknown preset '{preset}'") from exc
+    if not await _is_registered(token):
+        raise HTTPException(status_code=404, detail="Invalid token")
+    min_interval = _min_interval(fps)
+
+    subscription = cache.FRAME_BROADCASTER.subscribe(token)
+    first = cache.latest_snapshot(token)
+    return StreamingResponse(
+        _mjpeg_parts(subscription, first, variant, min_interval),
+        media_type=f"multipart/x-mixed-replace; boundary={MJPEG_BOUNDARY}",
+        headers={"Cache-Control": "no-store"},
+    )
+
+
+def _frame_message(item: cache.Snapshot, jpeg: bytes) -> bytes:
+    """Frame a JPEG as ``<u32 header length><JSON header><JPEG bytes>``."""
+
+    header = json.dumps(
+        {"token": item.token, "seq": item.seq, "ts": item.last_seen},
+        separators=(",", ":"),
+    ).encode()
+    return struct.pack(">I", len(header)) + header + jpeg
+
+
+class _FrameChannel:
+    """Per-connection state for the WebSocket frame push channel.
+
+    One pump task per subscribed token feeds a ``pending`` slot that holds at
+    most one frame per token; a single sender drains it.  While the socket is
+    busy, newer frames overwrite older pending ones, so a slow client receives
+    fewer frames instead of an ever-growing backlog.
+    """
+
+    def __init__(self, websocket: WebSocket) -> None:
+        self._websocket = websocket
+        self._pending: Dict[str, Tuple[cache.Snapshot, Optional[_VariantRequest]]] = {}
+        self._ready = asyncio.Event()
+        self._pumps: Dict[str, asyncio.Task] = {}
+
+    def subscribe(self, token: str, variant: Optional[_VariantRequest], min_interval: float) -> None:
+        self.unsubscribe(token)
+        subscription = cache.FRAME_BROADCASTER.subscribe(token)
+        self._pumps[token] = asyncio.create_task(
+            self._pump(token, subscription, variant, min_interval)
+        )
+
+    def unsubscribe(self, token: str) -> None:
+        pump = self._pumps.pop(token, None)
+        if pump is not None:
+            pump.cancel()
+        self._pending.pop(token, None)
+
+    @property
+    def subscriptions(self) -> int:
+        return len(self._pumps)
+
+    async def _pump(self, token, subscription, variant, min_interval) -> None:
+        loop = asyncio.get_running_loop()
+        item = cache.latest_snapshot(token)
+        last_seq = -1
+        last_offered: Optional[float] = None
+        try:
+            while True:
+                if item is None or item.seq <= last_seq:
+                    item = await subscription.next()
+                    continue
+                if last_offered is not None:
+                    delay = min_interval - (loop.time() - last_offered)
+                    if delay > 0:
+                        await asyncio.sleep(delay)
+                        newer = subscription.latest
+                        if newer is not None and newer.seq > item.seq:
+                            item = newer
+                self._pending[token] = (item, variant)
+                self._ready.set()
+                last_seq = item.seq
+                last_offered = loop.time()
+        finally:
+            subscription.close()
+
+    async def send_loop(self) -> None:
+        while True:
+            await self._ready.wait()
+            self._ready.clear()
+            while self._pending:
+                token = next(iter(self._pending))
+                item, variant = self._pending.pop(token)
+                jpeg = await _jpeg_for(item, variant)
+                if jpeg and token in self._pumps:
+                    await self._websocket.send_bytes(_frame_message(item, jpeg))
+
+    def close(self) -> None:
+        for token in list(self._pumps):
+            self.unsubscribe(token)
+
+
+class SocketCommand(BaseModel):
+    action: Literal["subscribe", "unsubscribe"]
+    token: str
+    fps: Optional[float] = Field(default=None, gt=0)
+    q: Optional[int] = Field(default=None, ge=1, le=100)
+    width: Optional[int] = Field(default=None, ge=1, le=7680)
+    height: Optional[int] = Field(default=None, ge=1, le=4320)
+    fit: Literal["contain", "cover", "fill"] = "contain"
+    preset: Optional[str] = None
+
+
+async def _handle_message(channel: _FrameChannel, websocket: WebSocket, raw: str) -> None:
+    """Apply one client command; failures are reported without closing the socket."""
+
+    try:
+        command = SocketCommand.model_validate_json(raw)
+    except ValidationError as exc:
+        await websocket.send_json({"event": "error", "detail": exc.errors(include_url=False)})
+        return
+
+    token = command.token
+    if command.action == "unsubscribe":
+        channel.unsubscribe(token)
+        await websocket.send_json({"event": "unsubscribed", "token": token})
+        return
+    if channel.subscriptions >= MAX_SOCKET_SUBSCRIPTIONS:
+        await websocket.send_json({"event": "error", "token": token, "detail": "Too many subscriptions"})
+        return
+    try:
+        variant = _requested_variant(command.q, command.width, command.height, command.fit, command.preset)
+    except KeyError:
+        await websocket.send_json({"event": "error", "token": token, "detail": f"Unknown preset '{command.preset}'"})
+        return
+    if not await _is_registered(token):
+        await websocket.send_json({"event": "error", "token": token, "detail": "Invalid token"})
+        return
+
+    channel.subscribe(token, variant, _min_interval(command.fps))
+    await websocket.send_json({"event": "subscribed", "token": token})
+
+
+@router.websocket("/ws")
+async def frames_socket(websocket: WebSocket) -> None:
+    """Push binary JPEG frames for the tokens a client subscribes to."""
+
+    await websocket.accept()
+    channel = _FrameChannel(websocket)
+    sender = asyncio.create_task(channel.send_loop())
+    try:
+        while True:
+            receive = asyncio.create_task(websocket.receive_text())
+            done, _ = await asyncio.wait({receive, sender}, return_when=asyncio.FIRST_COMPLETED)
+            if sender in done:
+                receive.cancel()
+                sender.result()
+                break
+            await _handle_message(channel, websocket, receive.result())
+    except WebSocketDisconnect:
+        pass
+    except Exception as exc:  # pragma: no cover - connection teardown races
+        LOGGER.debug("frame socket closed: %s", exc)
+    finally:
+        channel.close()
+        sender.cancel()
@@ -0,0 +1,106 @@
+"""Named per-camera views: fixed crops served as their own snapshots."""
+
+from __future__ import annotations
+
+import json
+import threading
+from typing import Dict, List, Literal, Optional
+
+from fastapi import APIRouter, Body, HTTPException, Path
+from pydantic import BaseModel, Field
+
+from .. import cache, db
+from ..config import get_settings
+from ..variants import view_variants
+
+router = APIRouter(tags=["views"])
+
+MAX_VIEWS_PER_CAMERA = 32
+VIEW_NAME_PATTERN = r"^[A-Za-z0-9_-]{1,64}$"
+# Views are one JSON column: edits are read-modify-write and must not interleave.
+_VIEWS_LOCK = threading.Lock()
+
+
+class ViewDefinition(BaseModel):
+    crop: List[int] = Field(
+        ..., min_length=4, max_length=4, description="x, y, width, height in full-frame pixels"
+    )
+    width: Optional[int] = Field(default=None, ge=1, le=7680, description="Resize the crop to this width")
+    height: Optional[int] = Field(default=None, ge=1, le=4320, description="Resize the crop to this height")
+    fit: Literal["contain", "cover", "fill"] = "contain"
+    q: Optional[int] = Field(
+        default=None, ge=1, le=100, description="JPEG quality (default: the camera's jpeg_quality)"
+    )
+
+
+class ViewsResponse(BaseModel):
+    token: str
+    views: Dict[str, ViewDefinition]
+
+
+def _camera_or_404(token: str) -> db.Camera:
+    camera = db.get_camera(token)
+    if not camera:
+        raise HTTPException(status_code=404, detail="Invalid token")
+    return camera
+
+
+def apply_views(camera: db.Camera, definitions: Optional[Dict[str, dict]] = None) -> None:
+    """Install a camera's views in the cache, defaulting to its profile's JPEG quality."""
+
+    if definitions is None:
+        definitions = camera.view_definitions
+    quality = camera.profile.resolve(get_settings()).jpeg_quality
+    cache.set_views(camera.token, view_variants(definitions, quality))
+
+
+def refresh_views(token: str) -> None:
+    """Re-resolve a camera's views after its profile changed."""
+
+    with _VIEWS_LOCK:
+        camera = db.get_camera(token)
+        if camera is not None:
+            apply_views(camera)
+
+
+def _save_views(camera: db.Camera, definitions: Dict[str, dict]) -> None:
+    db.update_camera(camera.token, {"views": json.dumps(definitions) if definitions else None})
+    apply_views(camera, definitions)
+
+
+@router.get("/views/{token}", response_model=ViewsResponse)
+def list_views(token: str) -> ViewsResponse:
+    camera = _camera_or_404(token)
+    return ViewsResponse(token=token, views=camera.view_definitions)
+
+
+@router.put("/views/{token}/{name}", response_model=ViewsResponse)
+def put_view(
+    token: str,
+    name: str = Path(..., pattern=VIEW_NAME_PATTERN),
+    definition: ViewDefinition = Body(...),
+) -> ViewsResponse:
+    """Create or replace a named view of the camera."""
+
+    x, y, width, height = definition.crop
+    if x < 0 or y < 0 or width <= 0 or height <= 0:
+        raise HTTPException(status_code=400, detail="crop needs x, y >= 0 and a positive width and height")
+    with _VIEWS_LOCK:
+        camera = _camera_or_404(token)
+        definitions = camera.view_definitions
+        if name not in definitions and len(definitions) >= MAX_VIEWS_PER_CAMERA:
+            raise HTTPException(status_code=400, detail=f"At most {MAX_VIEWS_PER_CAMERA} views per camera")
+        definitions[name] = definition.model_dump()
+        _save_views(camera, definitions)
+    return ViewsResponse(token=token, views=definitions)
+
+
+@router.delete("/views/{token}/{name}", response_model=ViewsResponse)
+def delete_view(token: str, name: str) -> ViewsResponse:
+    with _VIEWS_LOCK:
+        camera = _camera_or_404(token)
+        definitions = camera.view_definitions
+        if definitions.pop(name, None) is None:
+            raise HTTPException(status_code=404, detail="Unknown view")
+        _save_views(camera, definitions)
+    return ViewsResponse(token=token, views=definitions)
@@ -3,30 +3,68 @@
 from __future__ import annotations
 
 import logging
+import time
 from contextlib import asynccontextmanager
-from typing import Optional
+from typing import Iterable, Optional
 
 from fastapi import FastAPI
 
-from . import __version__, cache, db, worker
+from . import __version__, cache, db, warmstart, worker
 from .api import api_router
+from .api.views import apply_views
 from .backends import choose_backend
+from .config import get_settings
+from .executor import shutdown_encode_executor
+from .export import EXPORTER
 from .logging_config import configure_logging
+from .pipelines import validate_template
 
 LOGGER = logging.getLogger(__name__)
 
 
+def _restore_warm_frames(tokens: Iterable[str]) -> None:
+    settings = get_settings()
+    if not settings.warm_start_path:
+        return
+    started = time.perf_counter()
+    frames = warmstart.load(settings.warm_start_path, tokens, settings.warm_start_max_age_sec)
+    restored = cache.restore_warm_frames(frames)
+    LOGGER.info(
+        "restored %d warm-start frames in %.0f ms", restored, (time.perf_counter() - started) * 1000.0
+    )
+
+
+def _save_warm_frames() -> None:
+    path = get_settings().warm_start_path
+    if not path:
+        return
+    try:
+        saved = warmstart.save(path, cache.warm_frames())
+    except OSError as exc:
+        LOGGER.warning("could not save warm-start frames to %s: %s", path, exc)
+        return
+    LOGGER.info("saved %d warm-start frames to %s", saved, path)
+
+
 @asynccontextmanager
 async def _lifespan(app: FastAPI):  # pragma: no cover - FastAPI wiring
+    validate_template(get_settings().gstreamer_pipeline_template)
     db.init_db()
 
-    for camera in db.list_cameras():
+    cameras = db.list_cameras()
+    # Files of cameras unregistered while the service was down would be served forever.
+    EXPORTER.prune(camera.token for camera in cameras)
+    _restore_warm_frames(camera.token for camera in cameras)
+
+    for camera in cameras:
         backend_flag = None
         autodetect = False
         startup_error: Optional[str] = None
 
         try:
-            backend_flag, _ = choose_backend(camera.rtsp_url)
+            backend_flag, _ = choose_backend(
+                camera.substream_url or camera.rtsp_url, options=camera.capture_options
+            )
         except ValueError as exc:
             autodetect = True
             startup_error = str(exc)
@@ -39,7 +77,11 @@ async def _lifespan(app: FastAPI):  # pragma: no cover - FastAPI wiring
             camera.rtsp_url,
             backend_flag,
             autodetect=autodetect,
+            capture=camera.capture_options,
+            profile=camera.profile,
+            substream_url=camera.substream_url,
         )
+        apply_views(camera)
 
         if startup_error is not None:
             cache.set_status(camera.token, "error", startup_error)
@@ -48,8 +90,11 @@ async def _lifespan(app: FastAPI):  # pragma: no cover - FastAPI wiring
     try:
         yield
     finally:
+        # Saved before the workers stop so each camera keeps its live status.
+        _save_warm_frames()
         worker.stop_all_workers()
         cache.clear_all()
+        shutdown_encode_executor()
 
 
 def create_app() -> FastAPI:
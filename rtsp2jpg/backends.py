@@ -9,6 +9,7 @@ from typing import Dict, Optional, Tuple
 import cv2
 
 from .config import get_settings
+from .pipelines import CaptureOptions, build_pipeline
 
 LOGGER = logging.getLogger(__name__)
 
@@ -33,9 +34,25 @@ def backend_name(flag: Optional[int]) -> str:
     return BACKEND_NAMES.get(flag, f"flag:{flag}")
 
 
-def _try_open(rtsp_url: str, backend_flag: Optional[int], quick: bool = False) -> Optional[cv2.VideoCapture]:
+def _open_capture(
+    rtsp_url: str, backend_flag: Optional[int], yuv: bool, options: CaptureOptions
+) -> cv2.VideoCapture:
+    if backend_flag == cv2.CAP_GSTREAMER:
+        # A bare URL gets GStreamer's default buffering (and ignores
+        # CAP_PROP_BUFFERSIZE); the pipeline keeps only the newest frame.
+        return cv2.VideoCapture(build_pipeline(rtsp_url, options, yuv), cv2.CAP_GSTREAMER)
+    return cv2.VideoCapture(rtsp_url, backend_flag) if backend_flag is not None else cv2.VideoCapture(rtsp_url)
+
+
+def _try_open(
+    rtsp_url: str,
+    backend_flag: Optional[int],
+    quick: bool = False,
+    yuv: bool = False,
+    options: CaptureOptions = CaptureOptions(),
+) -> Optional[cv2.VideoCapture]:
     settings = get_settings()
-    cap = cv2.VideoCapture(rtsp_url, backend_flag) if backend_flag is not None else cv2.VideoCapture(rtsp_url)
+    cap = _open_capture(rtsp_url, backend_flag, yuv, options)
     if not cap.isOpened():
         cap.release()
         return None
@@ -57,8 +74,14 @@ def _try_open(rtsp_url: str, backend_flag: Optional[int], quick: bool = False) -
     return cap
 
 
-def choose_backend(rtsp_url: str, prefer: Optional[str] = None) -> Tuple[Optional[int], str]:
-    """Determine the backend flag to use for the RTSP URL."""
+def choose_backend(
+    rtsp_url: str, prefer: Optional[str] = None, options: CaptureOptions = CaptureOptions()
+) -> Tuple[Optional[int], str]:
+    """Determine the backend flag to use for the RTSP URL.
+
+    GStreamer is probed with the camera's own pipeline, so a registration
+    also checks that the rendered template actually opens.
+    """
 
     settings = get_settings()
 
@@ -66,7 +89,7 @@ def choose_backend(rtsp_url: str, prefer: Optional[str] = None) -> Tuple[Optiona
         prefer_flag = _prefer_to_flag(prefer)
         if prefer_flag is None and prefer.lower() != "default":
             raise ValueError("Invalid backend preference")
-        cap = _try_open(rtsp_url, prefer_flag, quick=True)
+        cap = _try_open(rtsp_url, prefer_flag, quick=True, options=options)
         if not cap:
             raise ValueError("Cannot open stream with preferred backend")
         cap.release()
@@ -83,7 +106,7 @@ def choose_backend(rtsp_url: str, prefer: Optional[str] = None) -> Tuple[Optiona
             continue
         if flag == cv2.CAP_GSTREAMER and not supports.get("gstreamer", False):
             continue
-        cap = _try_open(rtsp_url, flag, quick=True)
+        cap = _try_open(rtsp_url, flag, quick=True, options=options)
         if cap:
             cap.release()
             return flag, backend_name(flag)
@@ -91,10 +114,19 @@ def choose_backend(rtsp_url: str, prefer: Optional[str] = None) -> Tuple[Optiona
     raise ValueError("Cannot open stream with any backend")
 
 
-def open_stream(rtsp_url: str, backend_flag: Optional[int]) -> Tuple[Optional[cv2.VideoCapture], str]:
-    """Open a stream using the provided backend flag."""
+def open_stream(
+    rtsp_url: str, backend_flag: Optional[int], options: CaptureOptions = CaptureOptions()
+) -> Tuple[Optional[cv2.VideoCapture], str]:
+    """Open a stream using the provided backend flag.
+
+    With ``capture_pixel_format=yuv`` the GStreamer backend delivers planar
+    I420 frames (single-channel arrays of ``H * 3 / 2`` rows); other backends
+    always deliver BGR.  The GStreamer backend applies the decode profile in
+    the pipeline; for other backends the worker applies it after capture.
+    """
 
-    cap = _try_open(rtsp_url, backend_flag, quick=False)
+    yuv = get_settings().capture_pixel_format == "yuv"
+    cap = _try_open(rtsp_url, backend_flag, quick=False, yuv=yuv, options=options)
     if cap:
         name = backend_name(backend_flag)
         return cap, name
@@ -0,0 +1,98 @@
+"""Latest-value fan-out from worker threads to asyncio subscribers."""
+
+from __future__ import annotations
+
+import asyncio
+import threading
+from typing import Any, Dict, Optional, Set
+
+
+class Subscription:
+    """A single consumer of a broadcast topic.
+
+    Only the most recent item is kept: a subscriber that falls behind skips
+    intermediate items instead of buffering them.
+    """
+
+    def __init__(self, broadcaster: "Broadcaster", topic: str, loop: asyncio.AbstractEventLoop) -> None:
+        self._broadcaster = broadcaster
+        self.topic = topic
+        self.loop = loop
+        self.latest: Any = None
+        self._event = asyncio.Event()
+
+    def _offer(self, item: Any) -> bool:
+        self.latest = item
+        if self._event.is_set():
+            return True
+        try:
+            self.loop.call_soon_threadsafe(self._event.set)
+        except RuntimeError:
+            # The subscriber's loop is gone; let the broadcaster drop it.
+            return False
+        return True
+
+    async def next(self, timeout: Optional[float] = None) -> Any:
+        """Wait for an item published after the previous call and return it.
+
+        Returns ``None`` when ``timeout`` expires first.
+        """
+
+        try:
+            await asyncio.wait_for(self._event.wait(), timeout)
+        except asyncio.TimeoutError:
+            return None
+        self._event.clear()
+        return self.latest
+
+    def close(self) -> None:
+        self._broadcaster.unsubscribe(self)
+
+    def __enter__(self) -> "Subscription":
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+
+class Broadcaster:
+    """Thread-safe topic registry that publishes each item once to all subscribers."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._subscribers: Dict[str, Set[Subscription]] = {}
+
+    def subscribe(self, topic: str) -> Subscription:
+        """Subscribe the running event loop to ``topic``."""
+
+        subscription = Subscription(self, topic, asyncio.get_running_loop())
+        with self._lock:
+            self._subscribers.setdefault(topic, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.topic)
+            if not subscribers:
+                return
+            subscribers.discard(subscription)
+            if not subscribers:
+                self._subscribers.pop(subscription.topic, None)
+
+    def publish(self, topic: str, item: Any) -> None:
+        """Hand ``item`` to every subscriber of ``topic``; callable from any thread."""
+
+        with self._lock:
+            subscribers = self._subscribers.get(topic)
+            if not subscribers:
+                return
+            subscribers = tuple(subscribers)
+        for subscription in subscribers:
+            if not subscription._offer(item):
+                self.unsubscribe(subscription)
+
+    def subscriber_count(self, topic: Optional[str] = None) -> int:
+        with self._lock:
+            if topic is not None:
+                return len(self._subscribers.get(topic, ()))
+            return sum(len(subscribers) for subscribers in self._subscribers.values())
@@ -0,0 +1,64 @@
+"""Reusable frame buffers for the capture loop."""
+
+from __future__ import annotations
+
+import sys
+from typing import List, Optional
+
+import numpy as np
+
+
+class FrameBufferPool:
+    """Small ring of preallocated frame buffers that ``cap.read`` decodes into.
+
+    Ownership is tracked through reference counts: a buffer is only handed out
+    again once nothing but the pool refers to it.  Publishing a frame into
+    ``cache.FRAME_CACHE`` or holding it during an encode therefore keeps the
+    buffer out of rotation until the reference is dropped, so readers never
+    observe a frame being overwritten.
+    """
+
+    def __init__(self, size: int = 3) -> None:
+        self._size = max(1, size)
+        self._buffers: List[np.ndarray] = []
+        self.allocations = 0
+        self.reuses = 0
+
+        probe = np.empty(0, dtype=np.uint8)
+        self._buffers.append(probe)
+        del probe
+        self._baseline = self._refcount(0)
+        self._buffers.clear()
+
+    def _refcount(self, index: int) -> int:
+        return sys.getrefcount(self._buffers[index])
+
+    def acquire(self) -> Optional[np.ndarray]:
+        """Return a buffer nobody else references, or ``None`` to let OpenCV allocate."""
+
+        for index in range(len(self._buffers)):
+            if self._refcount(index) <= self._baseline:
+                return self._buffers[index]
+        return None
+
+    def adopt(self, frame: np.ndarray, buffer: Optional[np.ndarray]) -> None:
+        """Account for the array returned by ``cap.read(buffer)``."""
+
+        if buffer is not None and frame is buffer:
+            self.reuses += 1
+            return
+
+        self.allocations += 1
+        if self._buffers and (
+            self._buffers[0].shape != frame.shape or self._buffers[0].dtype != frame.dtype
+        ):
+            # Resolution changed: the old buffers can no longer be decoded into.
+            self._buffers.clear()
+        if len(self._buffers) < self._size:
+            self._buffers.append(frame)
+
+    def clear(self) -> None:
+        self._buffers.clear()
+
+    def __len__(self) -> int:
+        return len(self._buffers)
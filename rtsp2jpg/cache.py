@@ -4,58 +4,801 @@ from __future__ import annotations
 
 import threading
 import time
-from typing import Dict, Optional
+import uuid
+from concurrent.futures import Future
+from typing import Dict, Iterable, List, NamedTuple, Optional, Sequence, Set, Tuple
 
 import cv2
 import numpy as np
 
+from .broadcast import Broadcaster
+from .config import get_settings
+from .encoders import get_encoder
+from .events import STATUS_EVENTS
+from .export import EXPORTER
+from .frames import BGR, I420, frame_size, to_bgr, to_gray
+from .variants import Variant, crop_frame, preset_variant, resize_frame, target_size
+
 FRAME_CACHE: Dict[str, np.ndarray] = {}
+FRAME_FORMAT: Dict[str, str] = {}
 JPEG_CACHE: Dict[str, bytes] = {}
 JPEG_CACHE_QUALITY: Dict[str, int] = {}
 STATUS_CACHE: Dict[str, str] = {}
 ERROR_CACHE: Dict[str, Optional[str]] = {}
 LAST_SEEN_TS: Dict[str, float] = {}
+LAST_REQUESTED_TS: Dict[str, float] = {}
+FRAME_SEQ: Dict[str, int] = {}
+FRAME_SIZE: Dict[str, Tuple[int, int]] = {}
+VARIANT_CACHE: Dict[str, Dict[Variant, bytes]] = {}
+RESIZED_CACHE: Dict[str, Dict[Tuple[int, int, str], np.ndarray]] = {}
+BGR_CACHE: Dict[str, np.ndarray] = {}
+# Named views (crop variants) per token, and when each view was last read.
+VIEWS: Dict[str, Dict[str, Variant]] = {}
+VIEW_REQUESTED_TS: Dict[str, Dict[str, float]] = {}
+# Dual-stream cameras: tokens whose current frame comes from the substream,
+# and the size of their last full-resolution frame, which view crops refer to.
+SUBSTREAM_FRAMES: Set[str] = set()
+FULL_SIZE: Dict[str, Tuple[int, int]] = {}
+# Tokens whose JPEG was restored from the warm-start file and not yet replaced.
+STALE_TOKENS: Set[str] = set()
+_IN_FLIGHT: Dict[Tuple[str, int, Variant], Future] = {}
 
 CACHE_LOCK = threading.Lock()
 
+# Distinguishes frame sequence numbers of this process from those of earlier runs.
+INSTANCE_ID = uuid.uuid4().hex[:8]
+
+# Subscribers receive a ``Snapshot`` for every stored frame, keyed by token.
+FRAME_BROADCASTER = Broadcaster()
+
+FRAME_POLICIES = ("full", "recent", "downscale", "none")
+
+_FRAME_BYTES = 0
+_FRAMES_EVICTED = 0
+# Tokens sharing a capture hold the same array: bytes are counted once per
+# array, keyed by ``id()`` (stable while the cache references it).
+_FRAME_REFS: Dict[int, int] = {}
+
+
+def _retained_frame(
+    tokens: Sequence[str], frame: np.ndarray, now: float, pixel_format: str = BGR
+) -> Tuple[Optional[np.ndarray], str]:
+    """Return the raw frame (and its pixel format) to keep according to the cache policy.
+
+    Tokens sharing a capture keep the same frame, so ``recent`` keeps it when
+    any of them was requested recently.
+    """
+
+    settings = get_settings()
+    policy = settings.frame_cache_policy
+    if policy == "none":
+        return None, pixel_format
+    if policy == "recent":
+        requested = max((LAST_REQUESTED_TS.get(token, 0.0) for token in tokens), default=0.0)
+        if not requested or now - requested > settings.frame_cache_recent_sec:
+            return None, pixel_format
+        return frame, pixel_format
+    if policy == "downscale":
+        width, height = frame_size(frame, pixel_format)
+        target_width = settings.frame_cache_downscale_width
+        if target_width <= 0 or width <= target_width:
+            return frame, pixel_format
+        target_height = max(1, round(height * target_width / width))
+        small = cv2.resize(to_bgr(frame, pixel_format), (target_width, target_height), interpolation=cv2.INTER_AREA)
+        return small, BGR
+    return frame, pixel_format
+
+
+def _put_frame_locked(token: str, frame: Optional[np.ndarray], pixel_format: str = BGR) -> None:
+    global _FRAME_BYTES
+    previous = FRAME_CACHE.pop(token, None)
+    FRAME_FORMAT.pop(token, None)
+    if previous is not None:
+        refs = _FRAME_REFS.pop(id(previous)) - 1
+        if refs:
+            _FRAME_REFS[id(previous)] = refs
+        else:
+            _FRAME_BYTES -= previous.nbytes
+    if frame is not None:
+        FRAME_CACHE[token] = frame
+        FRAME_FORMAT[token] = pixel_format
+        refs = _FRAME_REFS.get(id(frame), 0)
+        if not refs:
+            _FRAME_BYTES += frame.nbytes
+        _FRAME_REFS[id(frame)] = refs + 1
+
+
+def _enforce_budget_locked(budget_bytes: int) -> None:
+    """Drop raw frames of the least recently requested cameras until under budget.
 
-def store_frame(token: str, frame: np.ndarray, jpeg_quality: int) -> None:
-    """Encode and store the latest frame + JPEG payload for the token."""
+    A frame shared by several tokens is dropped for all of them at once, and
+    ranked by the most recent request of any of them.
+    """
 
-    ok, jpeg = cv2.imencode(".jpg", frame, [int(cv2.IMWRITE_JPEG_QUALITY), int(jpeg_quality)])
-    if not ok:
+    global _FRAMES_EVICTED
+    if budget_bytes <= 0 or _FRAME_BYTES <= budget_bytes:
         return
+    holders: Dict[int, List[str]] = {}
+    for key, frame in FRAME_CACHE.items():
+        holders.setdefault(id(frame), []).append(key)
+    victims = sorted(
+        holders.values(), key=lambda keys: max(LAST_REQUESTED_TS.get(key, 0.0) for key in keys)
+    )
+    for keys in victims:
+        if _FRAME_BYTES <= budget_bytes:
+            break
+        for key in keys:
+            _put_frame_locked(key, None)
+        _FRAMES_EVICTED += 1
+
+
+def _encode(frame: np.ndarray, quality: int) -> Optional[bytes]:
+    return get_encoder().encode(frame, quality)
+
+
+def _encode_i420(frame: np.ndarray, quality: int) -> Optional[bytes]:
+    return get_encoder().encode_i420(frame, quality)
+
+
+def _encode_as(frame: np.ndarray, pixel_format: str, quality: int) -> Optional[bytes]:
+    if pixel_format == I420:
+        return _encode_i420(frame, quality)
+    return _encode(frame, quality)
+
+
+def store_frame(
+    token: str,
+    frame: np.ndarray,
+    jpeg_quality: int,
+    pixel_format: str = BGR,
+    eager: bool = True,
+    aliases: Sequence[str] = (),
+    substream: bool = False,
+) -> None:
+    """Encode and store the latest frame + JPEG payload for the token.
+
+    ``pixel_format`` is ``"bgr"`` or ``"i420"``; I420 frames are encoded from
+    their planes and only converted to BGR when a resized variant needs them.
+    ``eager=False`` leaves eager presets to be rendered on demand.  ``aliases``
+    are further tokens sharing the capture: they get the same frame and JPEG
+    objects, encoded once.  ``substream`` marks a dual-stream camera's reduced
+    frame, on which view crops are scaled down.
+    """
+
+    jpeg = _encode_as(frame, pixel_format, jpeg_quality)
+    if jpeg is None:
+        return
+    settings = get_settings()
     now = time.time()
+    tokens = (token, *aliases)
+    retained, retained_format = _retained_frame(tokens, frame, now, pixel_format)
+    budget_bytes = int(settings.frame_cache_max_mb * 1024 * 1024)
+    size = frame_size(frame, pixel_format)
+    published = []
     with CACHE_LOCK:
-        FRAME_CACHE[token] = frame
-        JPEG_CACHE[token] = jpeg.tobytes()
-        JPEG_CACHE_QUALITY[token] = int(jpeg_quality)
-        LAST_SEEN_TS[token] = now
+        for member in tokens:
+            _put_frame_locked(member, retained, retained_format)
+            JPEG_CACHE[member] = jpeg
+            JPEG_CACHE_QUALITY[member] = int(jpeg_quality)
+            LAST_SEEN_TS[member] = now
+            seq = FRAME_SEQ.get(member, 0) + 1
+            FRAME_SEQ[member] = seq
+            FRAME_SIZE[member] = size
+            if substream:
+                SUBSTREAM_FRAMES.add(member)
+            else:
+                SUBSTREAM_FRAMES.discard(member)
+                FULL_SIZE[member] = size
+            VARIANT_CACHE[member] = {}
+            RESIZED_CACHE[member] = {}
+            BGR_CACHE.pop(member, None)
+            STALE_TOKENS.discard(member)
+            published.append((member, seq, LAST_REQUESTED_TS.get(member)))
+        _enforce_budget_locked(budget_bytes)
+
+    for member, seq, _ in published:
+        FRAME_BROADCASTER.publish(member, Snapshot(member, jpeg, seq, now, STATUS_CACHE.get(member, "unknown")))
+        EXPORTER.maybe_write(member, jpeg)
+
+    if not eager:
+        return
+    if settings.eager_presets:
+        for member, seq, requested in published:
+            if requested is not None and now - requested <= settings.eager_preset_window_sec:
+                _render_eager_presets(member, seq, frame, pixel_format, jpeg, jpeg_quality)
+    if VIEWS:
+        for member, seq, _ in published:
+            _render_active_views(member, seq, frame, pixel_format, jpeg, now - settings.view_active_window_sec)
+
+
+def _render_eager_presets(
+    token: str, seq: int, frame: np.ndarray, pixel_format: str, jpeg: bytes, jpeg_quality: int
+) -> None:
+    full_size = frame_size(frame, pixel_format)
+    for name in get_settings().eager_presets:
+        try:
+            variant = preset_for(token, name, jpeg_quality)
+        except KeyError:
+            continue
+        _complete(_PendingEncode(token, seq, frame, jpeg, full_size, variant, pixel_format))
 
 
-def get_jpeg(token: str, quality: Optional[int] = None) -> Optional[bytes]:
-    """Return cached JPEG bytes, optionally re-encoding at a new quality."""
+def _render_active_views(
+    token: str, seq: int, frame: np.ndarray, pixel_format: str, jpeg: bytes, read_since: float
+) -> None:
+    """Render the views of ``token`` read since ``read_since`` for the new generation."""
 
     with CACHE_LOCK:
-        cached_jpeg = JPEG_CACHE.get(token)
-        cached_quality = JPEG_CACHE_QUALITY.get(token)
-        frame = FRAME_CACHE.get(token)
+        views = VIEWS.get(token)
+        if not views:
+            return
+        requested = VIEW_REQUESTED_TS.get(token, {})
+        active = [variant for name, variant in views.items() if requested.get(name, 0.0) >= read_since]
+    full_size = frame_size(frame, pixel_format)
+    for variant in active:
+        try:
+            _complete(_PendingEncode(token, seq, frame, jpeg, full_size, variant, pixel_format))
+        except ValueError:
+            # Crop outside this frame, or no full-resolution size to scale it
+            # from yet; reported to the reader by get_view.
+            continue
 
-    if quality is None or quality == cached_quality:
-        return cached_jpeg
 
+def _view_crop(token: str, crop: Tuple[int, int, int, int], frame: np.ndarray) -> Tuple[int, int, int, int]:
+    """Map a view crop, given in full-resolution pixels, onto ``frame``.
+
+    Substream frames of dual-stream cameras are smaller than the main-stream
+    frames crops are defined on; the crop is scaled to them.  Raises
+    ``ValueError`` while no full-resolution frame size is known.
+    """
+
+    if token not in SUBSTREAM_FRAMES:
+        return crop
+    reference = FULL_SIZE.get(token)
+    if reference is None:
+        raise ValueError("view crops need a full-resolution frame, none received yet")
+    frame_height, frame_width = frame.shape[:2]
+    if (frame_width, frame_height) == reference:
+        return crop
+    scale_x, scale_y = frame_width / reference[0], frame_height / reference[1]
+    x, y, width, height = crop
+    return (
+        round(x * scale_x),
+        round(y * scale_y),
+        max(1, round(width * scale_x)),
+        max(1, round(height * scale_y)),
+    )
+
+
+def _render_variant(
+    token: str, seq: int, source: np.ndarray, pixel_format: str, variant: Variant
+) -> Optional[bytes]:
+    """Resize/encode ``source`` for ``variant`` and cache it for generation ``seq``."""
+
+    if variant.crop is not None:
+        source = _bgr_frame(token, seq, source, pixel_format)
+        source = crop_frame(source, _view_crop(token, variant.crop, source))
+        if variant.resized:
+            source = resize_frame(source, variant.width, variant.height, variant.fit)
+        source = np.ascontiguousarray(source)
+        pixel_format = BGR
+    elif variant.resized:
+        source = _resized_frame(token, seq, _bgr_frame(token, seq, source, pixel_format), variant)
+        pixel_format = BGR
+    jpeg = _encode_as(source, pixel_format, variant.quality)
+    if jpeg is None:
+        return None
+    with CACHE_LOCK:
+        if FRAME_SEQ.get(token) == seq:
+            VARIANT_CACHE.setdefault(token, {})[variant] = jpeg
+    return jpeg
+
+
+def _bgr_frame(token: str, seq: int, source: np.ndarray, pixel_format: str) -> np.ndarray:
+    """Convert ``source`` to BGR once per generation, for consumers that need it."""
+
+    if pixel_format == BGR:
+        return source
+    with CACHE_LOCK:
+        if FRAME_SEQ.get(token) == seq:
+            cached = BGR_CACHE.get(token)
+            if cached is not None:
+                return cached
+    converted = to_bgr(source, pixel_format)
+    with CACHE_LOCK:
+        if FRAME_SEQ.get(token) == seq:
+            BGR_CACHE[token] = converted
+    return converted
+
+
+def _resized_frame(token: str, seq: int, source: np.ndarray, variant: Variant) -> np.ndarray:
+    key = (variant.width or 0, variant.height or 0, variant.fit)
+    with CACHE_LOCK:
+        if FRAME_SEQ.get(token) == seq:
+            cached = RESIZED_CACHE.get(token, {}).get(key)
+            if cached is not None:
+                return cached
+    resized = resize_frame(source, variant.width, variant.height, variant.fit)
+    with CACHE_LOCK:
+        if FRAME_SEQ.get(token) == seq:
+            RESIZED_CACHE.setdefault(token, {})[key] = resized
+    return resized
+
+
+def _source_frame(
+    frame: Optional[np.ndarray],
+    cached_jpeg: bytes,
+    full_size: Optional[Tuple[int, int]],
+    variant: Variant,
+) -> Optional[np.ndarray]:
+    """Pick the frame to re-encode from, decoding the JPEG when no raw frame fits.
+
+    A decoded JPEG is always BGR; a retained frame keeps its own pixel format.
+    """
+
+    if frame is not None and variant.crop is not None and full_size is not None:
+        # Crop coordinates refer to the full frame, not a downscaled copy.
+        if frame.shape[1] < full_size[0]:
+            frame = None
+    if frame is not None and variant.resized and full_size is not None:
+        if frame.shape[1] < full_size[0]:
+            # Downscaled copy: only usable when the requested size fits inside it.
+            needed_width, _ = target_size(
+                full_size[0], full_size[1], variant.width, variant.height, variant.fit
+            )
+            if frame.shape[1] < needed_width:
+                frame = None
     if frame is None:
+        frame = cv2.imdecode(np.frombuffer(cached_jpeg, dtype=np.uint8), cv2.IMREAD_COLOR)
+    return frame
+
+
+class _PendingEncode(NamedTuple):
+    token: str
+    seq: int
+    frame: Optional[np.ndarray]
+    cached_jpeg: bytes
+    full_size: Optional[Tuple[int, int]]
+    variant: Variant
+    pixel_format: str = BGR
+
+
+class Snapshot(NamedTuple):
+    """A JPEG payload together with the metadata describing its frame."""
+
+    token: str
+    jpeg: Optional[bytes]
+    seq: int
+    last_seen: Optional[float]
+    status: str
+
+
+def _lookup_locked(
+    token: str,
+    quality: Optional[int],
+    width: Optional[int],
+    height: Optional[int],
+    fit: str,
+    now: float,
+) -> Tuple[Optional[bytes], Optional[_PendingEncode]]:
+    """Return a cached payload, or describe the encode needed to produce it.
+
+    Must be called with ``CACHE_LOCK`` held.
+    """
+
+    cached_jpeg = JPEG_CACHE.get(token)
+    if cached_jpeg is None:
+        return None, None
+    LAST_REQUESTED_TS[token] = now
+    cached_quality = JPEG_CACHE_QUALITY.get(token)
+    if quality is None:
+        quality = cached_quality
+    if width is None and height is None and (quality is None or quality == cached_quality):
+        return cached_jpeg, None
+    if quality is None:
+        quality = get_settings().jpeg_quality
+    variant = Variant(int(quality), width, height, fit)
+    hit = VARIANT_CACHE.get(token, {}).get(variant)
+    if hit is not None:
+        return hit, None
+    pending = _PendingEncode(
+        token,
+        FRAME_SEQ.get(token, 0),
+        FRAME_CACHE.get(token),
+        cached_jpeg,
+        FRAME_SIZE.get(token),
+        variant,
+        FRAME_FORMAT.get(token, BGR),
+    )
+    return None, pending
+
+
+def _complete(pending: _PendingEncode) -> Optional[bytes]:
+    """Produce the pending variant, sharing one encode between concurrent callers.
+
+    The first caller for a ``(token, generation, variant)`` encodes; everyone
+    arriving while that encode is in flight waits for and reuses its result.
+    """
+
+    key = (pending.token, pending.seq, pending.variant)
+    with CACHE_LOCK:
+        if FRAME_SEQ.get(pending.token) == pending.seq:
+            hit = VARIANT_CACHE.get(pending.token, {}).get(pending.variant)
+            if hit is not None:
+                return hit
+        flight = _IN_FLIGHT.get(key)
+        leader = flight is None
+        if leader:
+            flight = _IN_FLIGHT[key] = Future()
+    if not leader:
+        return flight.result()
+
+    try:
+        source = _source_frame(pending.frame, pending.cached_jpeg, pending.full_size, pending.variant)
+        pixel_format = pending.pixel_format if source is pending.frame else BGR
+        if source is None:
+            result = pending.cached_jpeg
+        else:
+            result = _render_variant(pending.token, pending.seq, source, pixel_format, pending.variant)
+    except BaseException as exc:
+        flight.set_exception(exc)
+        raise
+    else:
+        flight.set_result(result)
+        return result
+    finally:
+        with CACHE_LOCK:
+            _IN_FLIGHT.pop(key, None)
+
+
+def peek_jpeg(
+    token: str,
+    quality: Optional[int] = None,
+    width: Optional[int] = None,
+    height: Optional[int] = None,
+    fit: str = "contain",
+) -> Optional[bytes]:
+    """Return the payload only if it is already cached; never encodes.
+
+    Lock-free (plain dict reads) so it is safe to call on the event loop.
+    ``None`` means the caller must fall back to ``get_jpeg``.
+    """
+
+    cached_jpeg = JPEG_CACHE.get(token)
+    if cached_jpeg is None:
+        return None
+    cached_quality = JPEG_CACHE_QUALITY.get(token)
+    if width is None and height is None and (quality is None or quality == cached_quality):
+        LAST_REQUESTED_TS[token] = time.time()
         return cached_jpeg
+    if quality is None:
+        quality = cached_quality if cached_quality is not None else get_settings().jpeg_quality
+    hit = VARIANT_CACHE.get(token, {}).get(Variant(int(quality), width, height, fit))
+    if hit is not None:
+        LAST_REQUESTED_TS[token] = time.time()
+    return hit
+
+
+def get_jpeg(
+    token: str,
+    quality: Optional[int] = None,
+    width: Optional[int] = None,
+    height: Optional[int] = None,
+    fit: str = "contain",
+) -> Optional[bytes]:
+    """Return cached JPEG bytes, optionally re-encoding at a new quality or size.
+
+    Re-encoded variants are cached until the next frame arrives.  When the raw
+    frame was not retained (see ``frame_cache_policy``) the cached JPEG is
+    decoded again and used as the re-encode source.
+    """
+
+    with CACHE_LOCK:
+        jpeg, pending = _lookup_locked(token, quality, width, height, fit, time.time())
+    if pending is None:
+        return jpeg
+    return _complete(pending)
+
+
+def get_jpegs(
+    tokens: Iterable[str],
+    quality: Optional[int] = None,
+    width: Optional[int] = None,
+    height: Optional[int] = None,
+    fit: str = "contain",
+) -> List[Snapshot]:
+    """Return snapshots for many tokens, looking all of them up under one lock."""
+
+    now = time.time()
+    lookups = []
+    with CACHE_LOCK:
+        for token in tokens:
+            jpeg, pending = _lookup_locked(token, quality, width, height, fit, now)
+            lookups.append((token, jpeg, pending, FRAME_SEQ.get(token, 0), LAST_SEEN_TS.get(token)))
+
+    snapshots = []
+    for token, jpeg, pending, seq, last_seen in lookups:
+        if pending is not None:
+            jpeg = _complete(pending)
+        snapshots.append(Snapshot(token, jpeg, seq, last_seen, STATUS_CACHE.get(token, "unknown")))
+    return snapshots
+
+
+def frame_info(token: str) -> Tuple[int, Optional[float]]:
+    """Return ``(seq, last_seen)`` of the latest stored frame (``seq`` 0 if none).
+
+    Lock-free like ``peek_jpeg``, so it is safe to call on the event loop.
+    """
 
-    ok, jpeg = cv2.imencode(".jpg", frame, [int(cv2.IMWRITE_JPEG_QUALITY), int(quality)])
-    if not ok:
+    return FRAME_SEQ.get(token, 0), LAST_SEEN_TS.get(token)
+
+
+def peek_snapshot(
+    token: str,
+    quality: Optional[int] = None,
+    width: Optional[int] = None,
+    height: Optional[int] = None,
+    fit: str = "contain",
+) -> Optional[Snapshot]:
+    """Lock-free ``Snapshot`` of an already cached payload; never encodes.
+
+    A token without a frame yields a snapshot whose ``jpeg`` is ``None``;
+    ``None`` means the variant must be encoded with ``get_jpegs`` first.
+    """
+
+    seq, last_seen = frame_info(token)
+    status = STATUS_CACHE.get(token, "unknown")
+    if token not in JPEG_CACHE:
+        return Snapshot(token, None, seq, last_seen, status)
+    jpeg = peek_jpeg(token, quality, width, height, fit)
+    if jpeg is None:
+        return None
+    return Snapshot(token, jpeg, seq, last_seen, status)
+
+
+def latest_snapshot(token: str) -> Optional[Snapshot]:
+    """Return the most recently stored frame for ``token`` without re-encoding.
+
+    Lock-free like ``frame_info``.  The sequence is read before the payload,
+    so a frame stored in between is under-reported rather than skipped.
+    """
+
+    seq, last_seen = frame_info(token)
+    jpeg = JPEG_CACHE.get(token)
+    if jpeg is None:
         return None
-    return jpeg.tobytes()
+    return Snapshot(token, jpeg, seq, last_seen, STATUS_CACHE.get(token, "unknown"))
+
+
+def cached_quality(token: str) -> int:
+    """Quality of the JPEG cached for ``token``, or the global default without one.
+
+    Lock-free; requests without an explicit quality resolve to this value so
+    they hit the worker's JPEG instead of re-encoding it.
+    """
+
+    quality = JPEG_CACHE_QUALITY.get(token)
+    return quality if quality is not None else get_settings().jpeg_quality
+
+
+def preset_for(token: str, name: str, quality: Optional[int] = None) -> Variant:
+    """Resolve a named preset for ``token``.
+
+    A preset without its own quality takes ``quality``, else the quality of
+    the token's cached JPEG, the same value eager pre-renders use, so
+    requests find them.  Raises ``KeyError`` for an unknown preset.
+    """
+
+    return preset_variant(name, quality if quality is not None else cached_quality(token))
+
+
+class RawFrame(NamedTuple):
+    """A decoded frame served without JPEG encoding."""
+
+    array: np.ndarray
+    seq: int
+    last_seen: Optional[float]
+    # True when no raw frame was retained and the cached JPEG was decoded instead.
+    decoded: bool
+
+
+def set_views(token: str, views: Dict[str, Variant]) -> None:
+    """Replace the named views of ``token``."""
+
+    with CACHE_LOCK:
+        if views:
+            VIEWS[token] = dict(views)
+        else:
+            VIEWS.pop(token, None)
+        requested = VIEW_REQUESTED_TS.get(token)
+        if requested:
+            for name in set(requested) - set(views):
+                del requested[name]
+
+
+def peek_view(token: str, name: str) -> Optional[bytes]:
+    """Return the view's JPEG if already rendered for the current frame; never encodes.
+
+    Lock-free like ``peek_jpeg``.  Raises ``KeyError`` for an unknown view.
+    """
+
+    variant = VIEWS.get(token, {})[name]
+    now = time.time()
+    VIEW_REQUESTED_TS.setdefault(token, {})[name] = now
+    hit = VARIANT_CACHE.get(token, {}).get(variant)
+    if hit is not None:
+        LAST_REQUESTED_TS[token] = now
+    return hit
+
+
+def get_view(token: str, name: str) -> Optional[bytes]:
+    """Return the JPEG of a named view, rendering it for the current frame if needed.
+
+    Reading a view keeps it rendered on every new frame for
+    ``view_active_window_sec``.  Raises ``KeyError`` for an unknown view and
+    ``ValueError`` when its crop lies outside the frame, or when only
+    substream frames of a dual-stream camera have been received so far.
+    """
+
+    now = time.time()
+    with CACHE_LOCK:
+        variant = VIEWS.get(token, {})[name]
+        VIEW_REQUESTED_TS.setdefault(token, {})[name] = now
+        cached_jpeg = JPEG_CACHE.get(token)
+        if cached_jpeg is None:
+            return None
+        LAST_REQUESTED_TS[token] = now
+        hit = VARIANT_CACHE.get(token, {}).get(variant)
+        if hit is not None:
+            return hit
+        pending = _PendingEncode(
+            token,
+            FRAME_SEQ.get(token, 0),
+            FRAME_CACHE.get(token),
+            cached_jpeg,
+            FRAME_SIZE.get(token),
+            variant,
+            FRAME_FORMAT.get(token, BGR),
+        )
+    return _complete(pending)
+
+
+def raw_frame(
+    token: str,
+    width: Optional[int] = None,
+    height: Optional[int] = None,
+    fit: str = "contain",
+    crop: Optional[Tuple[int, int, int, int]] = None,
+    gray: bool = False,
+) -> Optional[RawFrame]:
+    """Return the latest frame as a BGR (or grayscale) array.
+
+    ``crop`` is ``(x, y, width, height)`` in full-frame pixels, clipped to the
+    frame and applied before resizing.  Without any transform the retained
+    array itself is returned, so callers must treat it as read-only.  Raises
+    ``ValueError`` when the crop lies outside the frame.
+    """
+
+    with CACHE_LOCK:
+        cached_jpeg = JPEG_CACHE.get(token)
+        if cached_jpeg is None:
+            return None
+        LAST_REQUESTED_TS[token] = time.time()
+        frame = FRAME_CACHE.get(token)
+        pixel_format = FRAME_FORMAT.get(token, BGR)
+        full_size = FRAME_SIZE.get(token)
+        seq = FRAME_SEQ.get(token, 0)
+        last_seen = LAST_SEEN_TS.get(token)
+
+    variant = Variant(0, width, height, fit, crop)
+    source = _source_frame(frame, cached_jpeg, full_size, variant)
+    if source is None:
+        return None
+    decoded = source is not frame
+    if decoded:
+        pixel_format = BGR
+
+    if gray:
+        image = to_gray(source, pixel_format)
+    elif decoded:
+        image = source
+    else:
+        image = _bgr_frame(token, seq, source, pixel_format)
+
+    if crop is not None:
+        image = crop_frame(image, crop)
+
+    if variant.resized:
+        if crop is None and not gray and not decoded:
+            # Shares the resize with JPEG variants of the same size.
+            image = _resized_frame(token, seq, image, variant)
+        else:
+            image = resize_frame(image, width, height, fit)
+    return RawFrame(image, seq, last_seen, decoded)
+
+
+def memory_usage() -> Dict[str, int]:
+    """Report how much memory the frame and JPEG caches currently hold."""
+
+    budget_bytes = int(get_settings().frame_cache_max_mb * 1024 * 1024)
+    with CACHE_LOCK:
+        return {
+            "frames": len(_FRAME_REFS),
+            "frame_bytes": _FRAME_BYTES,
+            "frame_budget_bytes": budget_bytes,
+            "frames_evicted": _FRAMES_EVICTED,
+            "jpegs": len(JPEG_CACHE),
+            "jpeg_bytes": sum(len(payload) for payload in JPEG_CACHE.values()),
+            "variants": sum(len(entries) for entries in VARIANT_CACHE.values()),
+            "variant_bytes": sum(
+                len(payload) for entries in VARIANT_CACHE.values() for payload in entries.values()
+            ),
+        }
+
+
+class WarmFrame(NamedTuple):
+    """A camera's last JPEG and state, as persisted across restarts."""
+
+    token: str
+    jpeg: bytes
+    quality: int
+    last_seen: float
+    status: str
+    error: Optional[str]
+
+
+def warm_frames() -> List[WarmFrame]:
+    """Return the current JPEG of every camera that has one, for persisting."""
+
+    with CACHE_LOCK:
+        entries = [
+            (token, jpeg, JPEG_CACHE_QUALITY.get(token, 0), LAST_SEEN_TS.get(token))
+            for token, jpeg in JPEG_CACHE.items()
+        ]
+    return [
+        WarmFrame(token, jpeg, quality, last_seen, STATUS_CACHE.get(token, "unknown"), ERROR_CACHE.get(token))
+        for token, jpeg, quality, last_seen in entries
+        if last_seen is not None
+    ]
+
+
+def restore_warm_frames(frames: Iterable[WarmFrame]) -> int:
+    """Seed the caches with persisted JPEGs, flagged stale until a live frame arrives.
+
+    Restored frames keep sequence 0, so long-polls and ETags only ever match
+    live frames.  Tokens that already have a frame are left alone.
+    """
+
+    restored = 0
+    with CACHE_LOCK:
+        for frame in frames:
+            if frame.token in JPEG_CACHE:
+                continue
+            JPEG_CACHE[frame.token] = frame.jpeg
+            JPEG_CACHE_QUALITY[frame.token] = frame.quality
+            LAST_SEEN_TS[frame.token] = frame.last_seen
+            STALE_TOKENS.add(frame.token)
+            STATUS_CACHE.setdefault(frame.token, frame.status)
+            ERROR_CACHE.setdefault(frame.token, frame.error)
+            restored += 1
+    return restored
+
+
+def is_stale(token: str) -> bool:
+    return token in STALE_TOKENS
+
 
+def set_status(
+    token: str, status: str, error: Optional[str] = None, backend: Optional[str] = None
+) -> None:
+    """Record the camera status and publish an event when it changed."""
 
-def set_status(token: str, status: str, error: Optional[str] = None) -> None:
+    previous = STATUS_CACHE.get(token)
+    changed = previous != status or ERROR_CACHE.get(token) != error
     STATUS_CACHE[token] = status
     ERROR_CACHE[token] = error
+    if changed:
+        STATUS_EVENTS.record(token, status, previous, error, backend)
 
 
 def get_status(token: str) -> Dict[str, Optional[str]]:
@@ -68,19 +811,46 @@ def get_status(token: str) -> Dict[str, Optional[str]]:
 
 def clear(token: str) -> None:
     with CACHE_LOCK:
-        FRAME_CACHE.pop(token, None)
+        _put_frame_locked(token, None)
         JPEG_CACHE.pop(token, None)
         JPEG_CACHE_QUALITY.pop(token, None)
         LAST_SEEN_TS.pop(token, None)
+        LAST_REQUESTED_TS.pop(token, None)
+        FRAME_SEQ.pop(token, None)
+        FRAME_SIZE.pop(token, None)
+        SUBSTREAM_FRAMES.discard(token)
+        FULL_SIZE.pop(token, None)
+        VARIANT_CACHE.pop(token, None)
+        RESIZED_CACHE.pop(token, None)
+        BGR_CACHE.pop(token, None)
+        STALE_TOKENS.discard(token)
+        VIEWS.pop(token, None)
+        VIEW_REQUESTED_TS.pop(token, None)
     STATUS_CACHE.pop(token, None)
     ERROR_CACHE.pop(token, None)
 
 
 def clear_all() -> None:
+    global _FRAME_BYTES, _FRAMES_EVICTED
     with CACHE_LOCK:
         FRAME_CACHE.clear()
+        FRAME_FORMAT.clear()
+        _FRAME_BYTES = 0
+        _FRAMES_EVICTED = 0
+        _FRAME_REFS.clear()
         JPEG_CACHE.clear()
         JPEG_CACHE_QUALITY.clear()
         LAST_SEEN_TS.clear()
+        LAST_REQUESTED_TS.clear()
+        FRAME_SEQ.clear()
+        FRAME_SIZE.clear()
+        SUBSTREAM_FRAMES.clear()
+        FULL_SIZE.clear()
+        VARIANT_CACHE.clear()
+        RESIZED_CACHE.clear()
+        BGR_CACHE.clear()
+        STALE_TOKENS.clear()
+        VIEWS.clear()
+        VIEW_REQUESTED_TS.clear()
     STATUS_CACHE.clear()
     ERROR_CACHE.clear()
@@ -3,11 +3,28 @@
 from __future__ import annotations
 
 from functools import lru_cache
+from typing import Dict, List, Literal, Optional
 
-from pydantic import Field
+from pydantic import BaseModel, Field
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
+class SnapshotPreset(BaseModel):
+    """Named snapshot rendition (size, fit and optional quality)."""
+
+    width: Optional[int] = Field(default=None, ge=1)
+    height: Optional[int] = Field(default=None, ge=1)
+    fit: Literal["contain", "cover", "fill"] = "contain"
+    quality: Optional[int] = Field(default=None, ge=1, le=100)
+
+
+def _default_presets() -> Dict[str, SnapshotPreset]:
+    return {
+        "thumb": SnapshotPreset(width=320, quality=70),
+        "small": SnapshotPreset(width=640, quality=80),
+    }
+
+
 class Settings(BaseSettings):
     """Service settings sourced from environment variables and optional .env file."""
 
@@ -15,9 +32,99 @@ class Settings(BaseSettings):
     read_throttle_sec: float = Field(default=0.08, description="Delay between frame reads")
     reconnect_delay_sec: float = Field(default=2.0, description="Delay before reconnecting after failure")
     open_test_timeout_sec: float = Field(default=4.0, description="Timeout for backend open test")
+    read_stall_timeout_sec: float = Field(
+        default=15.0,
+        ge=0,
+        description="Replace a worker whose stream open or read blocks this long (0 disables)",
+    )
+    shutdown_timeout_sec: float = Field(
+        default=10.0,
+        ge=0,
+        description="Overall deadline for all workers to stop on shutdown or restart",
+    )
+    restart_batch_size: int = Field(
+        default=10,
+        ge=1,
+        description="Captures reconnected together by a rolling restart",
+    )
+    restart_interval_sec: float = Field(
+        default=1.0,
+        ge=0,
+        description="Pause between batches of a rolling restart",
+    )
     register_test_frames: int = Field(default=3, description="Number of frames to read on registration test")
     ffmpeg_first: bool = Field(default=True, description="Prefer FFmpeg backend when available")
     jpeg_quality: int = Field(default=85, description="JPEG quality for encoded snapshots")
+    jpeg_encoder: Literal["auto", "opencv", "turbojpeg", "simplejpeg"] = Field(
+        default="opencv",
+        description="JPEG encoder backend (auto picks the fastest installed one)",
+    )
+    jpeg_subsampling: Literal["444", "422", "420"] = Field(
+        default="420",
+        description="Chroma subsampling for encoded JPEGs",
+    )
+    jpeg_optimize: bool = Field(default=False, description="Optimize Huffman tables (smaller, slower)")
+    jpeg_progressive: bool = Field(default=False, description="Write progressive JPEGs")
+    jpeg_restart_interval: int = Field(
+        default=0,
+        description="JPEG restart interval in MCU rows/blocks (0 disables restart markers)",
+    )
+    capture_pixel_format: Literal["bgr", "yuv"] = Field(
+        default="bgr",
+        description="Keep decoded frames in planar YUV (I420) where the backend supports it",
+    )
+    decode_keyframe_interval_sec: float = Field(
+        default=2.0,
+        description="Minimum time between stored frames for cameras using the keyframe decode profile",
+    )
+    decode_lowres_width: int = Field(
+        default=640,
+        description="Frame width delivered to cameras using the lowres decode profile",
+    )
+    main_stream_idle_sec: float = Field(
+        default=30.0,
+        ge=0,
+        description="Close a dual-stream camera's main stream after this long without full-resolution requests",
+    )
+    main_stream_wait_sec: float = Field(
+        default=3.0,
+        ge=0,
+        description="How long a full-resolution snapshot waits for the main stream before serving the substream",
+    )
+    gstreamer_pipeline_template: str = Field(
+        default=(
+            "{source} ! {decode} ! videoconvert ! video/x-raw,format={format} ! "
+            "appsink drop=true max-buffers=1 sync=false"
+        ),
+        description="Template for GStreamer capture pipelines (see docs/configuration.md)",
+    )
+    gstreamer_latency_ms: int = Field(default=0, ge=0, description="rtspsrc jitterbuffer latency in ms")
+    gstreamer_transport: Literal["tcp", "udp", "auto"] = Field(
+        default="tcp",
+        description="RTSP transport for GStreamer capture",
+    )
+    gstreamer_decoder: str = Field(
+        default="decodebin",
+        description="Decoder element(s) used in GStreamer pipelines",
+    )
+    gstreamer_allowed_elements: List[str] = Field(
+        default_factory=list,
+        description="Extra element names accepted in per-camera decoder overrides",
+    )
+    priority_class: Literal["critical", "normal", "background"] = Field(
+        default="normal",
+        description="Default decode priority class of cameras without their own",
+    )
+    decode_budget_fps: float = Field(
+        default=0.0,
+        ge=0,
+        description="Total frames per second all cameras may decode (0 disables the budget)",
+    )
+    decode_min_fps: float = Field(
+        default=0.2,
+        ge=0,
+        description="Rate every camera keeps even when the decode budget is exhausted",
+    )
     log_level: str = Field(default="INFO", description="Base logging level")
     decoder_warning_window_sec: float = Field(
         default=0.4,
@@ -28,6 +135,119 @@ class Settings(BaseSettings):
         description="Capture FFmpeg/GStreamer stderr to detect decode corruption",
     )
 
+    frame_cache_policy: Literal["full", "recent", "downscale", "none"] = Field(
+        default="full",
+        description="Which raw frames to keep for quality re-encodes (full|recent|downscale|none)",
+    )
+    frame_cache_max_mb: float = Field(
+        default=0.0,
+        description="Memory budget for retained raw frames in MiB (0 disables the budget)",
+    )
+    frame_cache_recent_sec: float = Field(
+        default=30.0,
+        description="Window after a snapshot request during which the 'recent' policy keeps raw frames",
+    )
+    frame_cache_downscale_width: int = Field(
+        default=640,
+        description="Width of the raw frame copy kept by the 'downscale' policy",
+    )
+    snapshot_presets: Dict[str, SnapshotPreset] = Field(
+        default_factory=_default_presets,
+        description="Named snapshot variants selectable with ?preset= (JSON object)",
+    )
+    eager_presets: List[str] = Field(
+        default_factory=list,
+        description="Presets pre-rendered on every new frame for recently requested cameras",
+    )
+    eager_preset_window_sec: float = Field(
+        default=30.0,
+        description="How recently a camera must have been requested to pre-render eager presets",
+    )
+    view_active_window_sec: float = Field(
+        default=30.0,
+        description="How recently a camera view must have been read to be rendered on every new frame",
+    )
+    stream_max_fps: float = Field(
+        default=10.0,
+        description="Upper bound on the frame rate delivered to each MJPEG stream client",
+    )
+    snapshot_long_poll_max_sec: float = Field(
+        default=30.0,
+        description="Longest time a /snapshot?after= request may wait for a newer frame",
+    )
+    status_event_buffer: int = Field(
+        default=1000,
+        description="Status-change events kept for clients resuming /events with Last-Event-ID",
+    )
+    status_event_keepalive_sec: float = Field(
+        default=15.0,
+        description="Interval of keep-alive comments on idle /events connections",
+    )
+    export_dir: Optional[str] = Field(
+        default=None,
+        description="Directory (e.g. on tmpfs) receiving each camera's latest JPEG as <token>.jpg",
+    )
+    export_interval_sec: float = Field(
+        default=1.0,
+        ge=0,
+        description="Minimum time between exported JPEG writes per camera",
+    )
+    warm_start_path: Optional[str] = Field(
+        default=None,
+        description="File the last JPEG of every camera is saved to on shutdown and reloaded from at startup",
+    )
+    warm_start_max_age_sec: float = Field(
+        default=3600.0,
+        ge=0,
+        description="Discard warm-start frames older than this at startup (0 keeps all)",
+    )
+    encode_workers: int = Field(
+        default=4,
+        description="Threads dedicated to on-demand JPEG re-encodes",
+    )
+    encode_queue_max: int = Field(
+        default=32,
+        description="Re-encodes allowed to wait for a worker before requests are shed",
+    )
+    encode_overload_policy: Literal["reject", "serve_default"] = Field(
+        default="reject",
+        description="When the encode queue is full: reject with 503 or serve the default JPEG",
+    )
+    encode_retry_after_sec: int = Field(
+        default=1,
+        description="Retry-After value sent with 503 responses when the encode queue is full",
+    )
+    load_shedding: bool = Field(
+        default=True,
+        description="Shed worker load automatically when the process falls behind",
+    )
+    shed_high_watermark: float = Field(
+        default=0.85,
+        gt=0,
+        description="Load (fraction of CPU or encode queue) at which shedding escalates",
+    )
+    shed_low_watermark: float = Field(
+        default=0.6,
+        gt=0,
+        description="Projected load below which shedding steps back down",
+    )
+    shed_hold_sec: float = Field(
+        default=5.0,
+        ge=0,
+        description="How long load must stay past a watermark before the level changes",
+    )
+    shed_throttle_factor: float = Field(
+        default=2.0,
+        ge=1,
+        description="Factor applied to read intervals while shedding",
+    )
+    shed_jpeg_quality: int = Field(
+        default=60,
+        ge=1,
+        le=100,
+        description="Ceiling on worker JPEG quality while shedding quality",
+    )
+
     model_config = SettingsConfigDict(
         env_file=".env",
         env_prefix="RTSP2JPG_",
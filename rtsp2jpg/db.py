@@ -2,22 +2,79 @@
 
 from __future__ import annotations
 
+import json
 import sqlite3
 import threading
 from contextlib import contextmanager
 from dataclasses import dataclass
-from typing import Iterator, List, Optional
+from typing import Any, Dict, Iterable, Iterator, List, Optional
 
 from .config import get_settings
+from .pipelines import CaptureOptions
+from .profiles import CameraProfile
 
 _DB_LOCK = threading.Lock()
 
+_CAMERA_COLUMNS = (
+    "token, rtsp_url, status, decode_profile, transport, latency_ms, decoder, "
+    "read_throttle_sec, jpeg_quality, reconnect_delay_sec, decoder_warning_window_sec, priority_class, "
+    "substream_url, views"
+)
+
+# Columns added after the first release, with their definitions.
+_ADDED_COLUMNS = {
+    "decode_profile": "TEXT DEFAULT 'full'",
+    "transport": "TEXT",
+    "latency_ms": "INTEGER",
+    "decoder": "TEXT",
+    "read_throttle_sec": "REAL",
+    "jpeg_quality": "INTEGER",
+    "reconnect_delay_sec": "REAL",
+    "decoder_warning_window_sec": "REAL",
+    "priority_class": "TEXT",
+    "substream_url": "TEXT",
+    "views": "TEXT",
+}
+
+# Columns ``update_camera`` may change.
+_UPDATABLE_COLUMNS = frozenset(_ADDED_COLUMNS) - {"substream_url"}
+
 
 @dataclass
 class Camera:
     token: str
     rtsp_url: str
     status: str
+    decode_profile: str = "full"
+    transport: Optional[str] = None
+    latency_ms: Optional[int] = None
+    decoder: Optional[str] = None
+    read_throttle_sec: Optional[float] = None
+    jpeg_quality: Optional[int] = None
+    reconnect_delay_sec: Optional[float] = None
+    decoder_warning_window_sec: Optional[float] = None
+    priority_class: Optional[str] = None
+    substream_url: Optional[str] = None
+    # JSON object of named views: ``{name: {"crop": [x, y, w, h], "width": ..., ...}}``.
+    views: Optional[str] = None
+
+    @property
+    def view_definitions(self) -> Dict[str, Dict[str, Any]]:
+        return json.loads(self.views) if self.views else {}
+
+    @property
+    def capture_options(self) -> CaptureOptions:
+        return CaptureOptions(self.decode_profile or "full", self.transport, self.latency_ms, self.decoder)
+
+    @property
+    def profile(self) -> CameraProfile:
+        return CameraProfile(
+            self.read_throttle_sec,
+            self.jpeg_quality,
+            self.reconnect_delay_sec,
+            self.decoder_warning_window_sec,
+            self.priority_class,
+        )
 
 
 @contextmanager
@@ -37,18 +94,55 @@ def init_db() -> None:
             CREATE TABLE IF NOT EXISTS cameras (
                 token TEXT PRIMARY KEY,
                 rtsp_url TEXT NOT NULL,
-                status TEXT DEFAULT 'inactive'
+                status TEXT DEFAULT 'inactive',
+                decode_profile TEXT DEFAULT 'full',
+                transport TEXT,
+                latency_ms INTEGER,
+                decoder TEXT,
+                read_throttle_sec REAL,
+                jpeg_quality INTEGER,
+                reconnect_delay_sec REAL,
+                decoder_warning_window_sec REAL,
+                priority_class TEXT,
+                substream_url TEXT,
+                views TEXT
             )
             """
         )
+        _add_missing_columns(conn)
         conn.commit()
 
 
-def add_camera(token: str, rtsp_url: str, status: str = "inactive") -> None:
+def _add_missing_columns(conn: sqlite3.Connection) -> None:
+    """Upgrade databases created before newer columns existed."""
+
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(cameras)")}
+    for name, definition in _ADDED_COLUMNS.items():
+        if name not in columns:
+            conn.execute(f"ALTER TABLE cameras ADD COLUMN {name} {definition}")
+
+
+def add_camera(
+    token: str,
+    rtsp_url: str,
+    status: str = "inactive",
+    options: CaptureOptions = CaptureOptions(),
+    substream_url: Optional[str] = None,
+) -> None:
     with _DB_LOCK, _connection() as conn:
         conn.execute(
-            "INSERT INTO cameras (token, rtsp_url, status) VALUES (?, ?, ?)",
-            (token, rtsp_url, status),
+            "INSERT INTO cameras (token, rtsp_url, status, decode_profile, transport, latency_ms, decoder, "
+            "substream_url) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                token,
+                rtsp_url,
+                status,
+                options.decode_profile,
+                options.transport,
+                options.latency_ms,
+                options.decoder,
+                substream_url,
+            ),
         )
         conn.commit()
 
@@ -56,7 +150,7 @@ def add_camera(token: str, rtsp_url: str, status: str = "inactive") -> None:
 def get_camera(token: str) -> Optional[Camera]:
     with _DB_LOCK, _connection() as conn:
         row = conn.execute(
-            "SELECT token, rtsp_url, status FROM cameras WHERE token = ?",
+            f"SELECT {_CAMERA_COLUMNS} FROM cameras WHERE token = ?",
             (token,),
         ).fetchone()
     if not row:
@@ -70,6 +164,31 @@ def update_status(token: str, status: str) -> None:
         conn.commit()
 
 
+def update_statuses(tokens: Iterable[str], status: str) -> None:
+    """Set the status of many cameras in a single transaction."""
+
+    with _DB_LOCK, _connection() as conn:
+        conn.executemany("UPDATE cameras SET status = ? WHERE token = ?", [(status, token) for token in tokens])
+        conn.commit()
+
+
+def update_camera(token: str, values: Dict[str, Any]) -> None:
+    """Update per-camera capture/profile columns; ``None`` restores the default."""
+
+    unknown = set(values) - _UPDATABLE_COLUMNS
+    if unknown:
+        raise ValueError(f"Unknown camera column(s): {', '.join(sorted(unknown))}")
+    if not values:
+        return
+    assignments = ", ".join(f"{name} = ?" for name in values)
+    with _DB_LOCK, _connection() as conn:
+        conn.execute(
+            f"UPDATE cameras SET {assignments} WHERE token = ?",
+            (*values.values(), token),
+        )
+        conn.commit()
+
+
 def delete_camera(token: str) -> None:
     with _DB_LOCK, _connection() as conn:
         conn.execute("DELETE FROM cameras WHERE token = ?", (token,))
@@ -78,5 +197,5 @@ def delete_camera(token: str) -> None:
 
 def list_cameras() -> List[Camera]:
     with _DB_LOCK, _connection() as conn:
-        rows = conn.execute("SELECT token, rtsp_url, status FROM cameras").fetchall()
+        rows = conn.execute(f"SELECT {_CAMERA_COLUMNS} FROM cameras").fetchall()
     return [Camera(*row) for row in rows]
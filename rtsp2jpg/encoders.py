@@ -0,0 +1,244 @@
+"""Pluggable JPEG encoder backends."""
+
+from __future__ import annotations
+
+import logging
+import threading
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple, Type
+
+import cv2
+import numpy as np
+
+from .config import get_settings
+from .frames import I420, frame_size, full_range_i420, i420_planes, to_bgr
+
+LOGGER = logging.getLogger(__name__)
+
+
+class EncoderUnavailable(RuntimeError):
+    """Raised when an encoder's optional library is not installed."""
+
+
+@dataclass(frozen=True)
+class EncoderOptions:
+    """Encoder-independent JPEG options; backends ignore what they cannot honour."""
+
+    subsampling: str = "420"
+    optimize: bool = False
+    progressive: bool = False
+    restart_interval: int = 0
+
+
+class JpegEncoder:
+    """Base class: encode a BGR (or planar I420) ``uint8`` frame to JPEG bytes."""
+
+    name = "base"
+    supported_options: Tuple[str, ...] = ()
+
+    def __init__(self, options: EncoderOptions) -> None:
+        self.options = options
+        defaults = EncoderOptions()
+        ignored = [
+            field
+            for field in ("subsampling", "optimize", "progressive", "restart_interval")
+            if getattr(options, field) != getattr(defaults, field) and field not in self.supported_options
+        ]
+        if ignored:
+            LOGGER.warning("%s encoder ignores option(s): %s", self.name, ", ".join(ignored))
+
+    def encode(self, frame: np.ndarray, quality: int) -> Optional[bytes]:
+        raise NotImplementedError
+
+    def encode_i420(self, frame: np.ndarray, quality: int) -> Optional[bytes]:
+        """Encode a planar I420 frame; backends without a YUV path convert to BGR."""
+
+        return self.encode(to_bgr(frame, I420), quality)
+
+
+_CV2_SAMPLING = {
+    "444": "IMWRITE_JPEG_SAMPLING_FACTOR_444",
+    "422": "IMWRITE_JPEG_SAMPLING_FACTOR_422",
+    "420": "IMWRITE_JPEG_SAMPLING_FACTOR_420",
+}
+
+
+class OpenCVEncoder(JpegEncoder):
+    name = "opencv"
+    supported_options = ("subsampling", "optimize", "progressive", "restart_interval")
+
+    def __init__(self, options: EncoderOptions) -> None:
+        super().__init__(options)
+        params: List[int] = []
+        if options.optimize:
+            params += [cv2.IMWRITE_JPEG_OPTIMIZE, 1]
+        if options.progressive:
+            params += [cv2.IMWRITE_JPEG_PROGRESSIVE, 1]
+        if options.restart_interval:
+            params += [cv2.IMWRITE_JPEG_RST_INTERVAL, int(options.restart_interval)]
+        sampling = getattr(cv2, _CV2_SAMPLING.get(options.subsampling, ""), None)
+        if sampling is not None and options.subsampling != "420":
+            params += [cv2.IMWRITE_JPEG_SAMPLING_FACTOR, int(sampling)]
+        self._params = params
+
+    def encode(self, frame: np.ndarray, quality: int) -> Optional[bytes]:
+        ok, jpeg = cv2.imencode(".jpg", frame, [int(cv2.IMWRITE_JPEG_QUALITY), int(quality)] + self._params)
+        if not ok:
+            return None
+        return jpeg.tobytes()
+
+
+class TurboJPEGEncoder(JpegEncoder):
+    """libjpeg-turbo through PyTurboJPEG (needs the system ``libturbojpeg``)."""
+
+    name = "turbojpeg"
+    supported_options = ("subsampling", "progressive")
+
+    def __init__(self, options: EncoderOptions) -> None:
+        try:
+            import turbojpeg
+        except ImportError as exc:
+            raise EncoderUnavailable("PyTurboJPEG is not installed") from exc
+        try:
+            self._jpeg = turbojpeg.TurboJPEG()
+        except (OSError, RuntimeError) as exc:
+            raise EncoderUnavailable(f"libturbojpeg could not be loaded: {exc}") from exc
+        super().__init__(options)
+        self._subsample = {
+            "444": turbojpeg.TJSAMP_444,
+            "422": turbojpeg.TJSAMP_422,
+            "420": turbojpeg.TJSAMP_420,
+        }.get(options.subsampling, turbojpeg.TJSAMP_420)
+        self._flags = turbojpeg.TJFLAG_PROGRESSIVE if options.progressive else 0
+
+    def encode(self, frame: np.ndarray, quality: int) -> Optional[bytes]:
+        try:
+            return self._jpeg.encode(
+                frame, quality=int(quality), jpeg_subsample=self._subsample, flags=self._flags
+            )
+        except (OSError, ValueError) as exc:
+            LOGGER.debug("turbojpeg encode failed: %s", exc)
+            return None
+
+    def encode_i420(self, frame: np.ndarray, quality: int) -> Optional[bytes]:
+        encode_from_yuv = getattr(self._jpeg, "encode_from_yuv", None)
+        if encode_from_yuv is None:  # PyTurboJPEG < 1.6
+            return super().encode_i420(frame, quality)
+        width, height = frame_size(frame, I420)
+        try:
+            return encode_from_yuv(
+                full_range_i420(frame), height, width, quality=int(quality), flags=self._flags
+            )
+        except (OSError, ValueError) as exc:
+            LOGGER.debug("turbojpeg YUV encode failed: %s", exc)
+            return None
+
+
+class SimpleJPEGEncoder(JpegEncoder):
+    """libjpeg-turbo through the ``simplejpeg`` wheel (bundles the library)."""
+
+    name = "simplejpeg"
+    supported_options = ("subsampling",)
+
+    def __init__(self, options: EncoderOptions) -> None:
+        try:
+            import simplejpeg
+        except ImportError as exc:
+            raise EncoderUnavailable("simplejpeg is not installed") from exc
+        super().__init__(options)
+        self._simplejpeg = simplejpeg
+
+    def encode(self, frame: np.ndarray, quality: int) -> Optional[bytes]:
+        if frame.ndim == 2:
+            colorspace, subsampling = "GRAY", "Gray"
+            frame = frame[:, :, np.newaxis]
+        else:
+            colorspace, subsampling = "BGR", self.options.subsampling
+        try:
+            return self._simplejpeg.encode_jpeg(
+                np.ascontiguousarray(frame),
+                quality=int(quality),
+                colorspace=colorspace,
+                colorsubsampling=subsampling,
+            )
+        except ValueError as exc:
+            LOGGER.debug("simplejpeg encode failed: %s", exc)
+            return None
+
+    def encode_i420(self, frame: np.ndarray, quality: int) -> Optional[bytes]:
+        y, u, v = i420_planes(full_range_i420(frame))
+        try:
+            return self._simplejpeg.encode_jpeg_yuv_planes(y, u, v, quality=int(quality))
+        except ValueError as exc:
+            LOGGER.debug("simplejpeg YUV encode failed: %s", exc)
+            return None
+
+
+ENCODERS: Dict[str, Type[JpegEncoder]] = {
+    OpenCVEncoder.name: OpenCVEncoder,
+    TurboJPEGEncoder.name: TurboJPEGEncoder,
+    SimpleJPEGEncoder.name: SimpleJPEGEncoder,
+}
+
+# Preference order when ``jpeg_encoder`` is ``auto``.
+AUTO_ORDER = ("turbojpeg", "simplejpeg", "opencv")
+
+_INSTANCES: Dict[Tuple[str, EncoderOptions], JpegEncoder] = {}
+_INSTANCES_LOCK = threading.Lock()
+
+
+def create_encoder(name: str, options: EncoderOptions) -> JpegEncoder:
+    """Instantiate the named encoder; raises ``EncoderUnavailable`` or ``KeyError``."""
+
+    return ENCODERS[name](options)
+
+
+def available_encoders() -> List[str]:
+    """Return the names of encoders whose libraries can be loaded."""
+
+    names = []
+    for name in ENCODERS:
+        try:
+            create_encoder(name, EncoderOptions())
+        except EncoderUnavailable:
+            continue
+        names.append(name)
+    return names
+
+
+def _options_from_settings() -> Tuple[str, EncoderOptions]:
+    settings = get_settings()
+    options = EncoderOptions(
+        subsampling=settings.jpeg_subsampling,
+        optimize=settings.jpeg_optimize,
+        progressive=settings.jpeg_progressive,
+        restart_interval=settings.jpeg_restart_interval,
+    )
+    return settings.jpeg_encoder, options
+
+
+def get_encoder() -> JpegEncoder:
+    """Return the encoder selected in ``Settings``, falling back to OpenCV."""
+
+    key = _options_from_settings()
+    encoder = _INSTANCES.get(key)
+    if encoder is not None:
+        return encoder
+
+    with _INSTANCES_LOCK:
+        encoder = _INSTANCES.get(key)
+        if encoder is None:
+            name, options = key
+            candidates = AUTO_ORDER if name == "auto" else (name, OpenCVEncoder.name)
+            for candidate in candidates:
+                try:
+                    encoder = create_encoder(candidate, options)
+                except EncoderUnavailable as exc:
+                    if name != "auto":
+                        LOGGER.warning("%s encoder unavailable (%s); using opencv", candidate, exc)
+                    continue
+                break
+            assert encoder is not None  # OpenCV is always available
+            LOGGER.info("Using %s JPEG encoder", encoder.name)
+            _INSTANCES[key] = encoder
+    return encoder
@@ -0,0 +1,89 @@
+"""In-process feed of camera status transitions with a replay buffer."""
+
+from __future__ import annotations
+
+import threading
+import time
+from collections import deque
+from typing import Any, Deque, Dict, List, NamedTuple, Optional, Tuple
+
+from .broadcast import Broadcaster
+from .config import get_settings
+
+_TOPIC = "status"
+
+
+class StatusEvent(NamedTuple):
+    id: int
+    token: str
+    status: str
+    previous: Optional[str]
+    error: Optional[str]
+    backend: Optional[str]
+    timestamp: float
+
+    def as_dict(self) -> Dict[str, Any]:
+        return self._asdict()
+
+
+class StatusEventLog:
+    """Numbers status transitions and keeps the newest ones for replay.
+
+    Subscribers are only woken through the broadcaster; they read the events
+    themselves with ``since``, so a slow reader catches up from the buffer
+    instead of losing intermediate transitions.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._events: Deque[StatusEvent] = deque()
+        self._last_id = 0
+        self.broadcaster = Broadcaster()
+
+    def record(
+        self,
+        token: str,
+        status: str,
+        previous: Optional[str],
+        error: Optional[str],
+        backend: Optional[str],
+    ) -> StatusEvent:
+        limit = max(get_settings().status_event_buffer, 1)
+        with self._lock:
+            self._last_id += 1
+            event = StatusEvent(self._last_id, token, status, previous, error, backend, time.time())
+            self._events.append(event)
+            while len(self._events) > limit:
+                self._events.popleft()
+        self.broadcaster.publish(_TOPIC, event.id)
+        return event
+
+    def since(self, last_id: int) -> Tuple[List[StatusEvent], bool]:
+        """Return the buffered events after ``last_id`` and whether some were lost.
+
+        An id ahead of the log (e.g. from before a restart) replays the whole
+        buffer and counts as a gap.
+        """
+
+        with self._lock:
+            if last_id > self._last_id:
+                return list(self._events), True
+            events = [event for event in self._events if event.id > last_id]
+            oldest = self._events[0].id if self._events else self._last_id + 1
+            return events, oldest > last_id + 1 and last_id < self._last_id
+
+    @property
+    def last_id(self) -> int:
+        return self._last_id
+
+    def subscribe(self):
+        """Subscribe the running event loop to new-event notifications."""
+
+        return self.broadcaster.subscribe(_TOPIC)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._events.clear()
+
+
+STATUS_EVENTS = StatusEventLog()
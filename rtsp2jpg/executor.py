@@ -0,0 +1,121 @@
+"""Dedicated, size-capped executor for JPEG re-encodes requested by clients."""
+
+from __future__ import annotations
+
+import asyncio
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+from .config import get_settings
+
+
+class EncoderBusy(RuntimeError):
+    """Raised when the encode queue is full and the request must be shed."""
+
+
+class EncodeExecutor:
+    """Thread pool with a bounded backlog and queue-wait accounting.
+
+    At most ``workers + max_queue`` jobs are admitted; further submissions raise
+    ``EncoderBusy`` immediately instead of queueing without bound.
+    """
+
+    def __init__(self, workers: int, max_queue: int) -> None:
+        self.workers = max(1, workers)
+        self.capacity = self.workers + max(0, max_queue)
+        self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="encode")
+        self._lock = threading.Lock()
+        self._admitted = 0
+        self._running = 0
+        self._completed = 0
+        self._rejected = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+        self._wait_ewma = 0.0
+
+    def _admit(self) -> None:
+        with self._lock:
+            if self._admitted >= self.capacity:
+                self._rejected += 1
+                raise EncoderBusy("encode queue is full")
+            self._admitted += 1
+
+    def _wrap(self, fn: Callable[..., Any], submitted: float) -> Callable[..., Any]:
+        def job(*args: Any, **kwargs: Any) -> Any:
+            waited = time.monotonic() - submitted
+            with self._lock:
+                self._running += 1
+                self._wait_total += waited
+                self._wait_max = max(self._wait_max, waited)
+                self._wait_ewma = waited if not self._completed else 0.9 * self._wait_ewma + 0.1 * waited
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                with self._lock:
+                    self._running -= 1
+                    self._completed += 1
+
+        return job
+
+    def _release(self, _future: Optional[Future]) -> None:
+        with self._lock:
+            self._admitted -= 1
+
+    async def run(self, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        """Run ``fn`` on the pool without blocking the event loop.
+
+        Raises ``EncoderBusy`` when the backlog is already at capacity.
+        """
+
+        self._admit()
+        try:
+            future = self._pool.submit(self._wrap(fn, time.monotonic()), *args, **kwargs)
+        except BaseException:
+            self._release(None)
+            raise
+        future.add_done_callback(self._release)
+        return await asyncio.wrap_future(future)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            completed = self._completed
+            return {
+                "workers": self.workers,
+                "capacity": self.capacity,
+                "running": self._running,
+                "queued": self._admitted - self._running,
+                "completed": completed,
+                "rejected": self._rejected,
+                "queue_wait_avg_ms": (self._wait_total / completed * 1000.0) if completed else 0.0,
+                "queue_wait_recent_ms": self._wait_ewma * 1000.0,
+                "queue_wait_max_ms": self._wait_max * 1000.0,
+            }
+
+    def shutdown(self) -> None:
+        self._pool.shutdown(wait=False)
+
+
+_EXECUTOR: Optional[EncodeExecutor] = None
+_EXECUTOR_LOCK = threading.Lock()
+
+
+def get_encode_executor() -> EncodeExecutor:
+    """Return the process-wide encode executor, creating it from settings."""
+
+    global _EXECUTOR
+    if _EXECUTOR is None:
+        with _EXECUTOR_LOCK:
+            if _EXECUTOR is None:
+                settings = get_settings()
+                _EXECUTOR = EncodeExecutor(settings.encode_workers, settings.encode_queue_max)
+    return _EXECUTOR
+
+
+def shutdown_encode_executor() -> None:
+    global _EXECUTOR
+    with _EXECUTOR_LOCK:
+        if _EXECUTOR is not None:
+            _EXECUTOR.shutdown()
+            _EXECUTOR = None
@@ -0,0 +1,219 @@
+"""Optional export of each camera's latest JPEG to a file for static serving."""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, Optional, Set
+
+from .config import get_settings
+
+LOGGER = logging.getLogger(__name__)
+
+EXPORT_SUFFIX = ".jpg"
+# The export directory may be shared (e.g. a web root): only files listed in
+# the manifest, or temp files with the exporter's prefix, are ever pruned.
+MANIFEST_NAME = ".rtsp2jpg-export.json"
+TEMP_PREFIX = ".rtsp2jpg."
+
+
+def export_path(directory: str, token: str) -> str:
+    return os.path.join(directory, token + EXPORT_SUFFIX)
+
+
+def _exportable(token: str) -> bool:
+    return bool(token) and not token.startswith(".") and os.sep not in token and "/" not in token
+
+
+def _write_atomic(directory: str, name: str, payload: bytes) -> None:
+    os.makedirs(directory, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(prefix=TEMP_PREFIX, suffix=".tmp", dir=directory)
+    try:
+        with os.fdopen(fd, "wb") as handle:
+            # mkstemp creates 0600 files; the static server runs as another user.
+            os.fchmod(handle.fileno(), 0o644)
+            handle.write(payload)
+        os.replace(temp_path, os.path.join(directory, name))
+    except BaseException:
+        try:
+            os.unlink(temp_path)
+        except OSError:
+            pass
+        raise
+
+
+def _read_manifest(directory: str) -> Set[str]:
+    try:
+        with open(os.path.join(directory, MANIFEST_NAME), "rb") as handle:
+            return {str(token) for token in json.load(handle)["tokens"]}
+    except FileNotFoundError:
+        return set()
+    except (OSError, ValueError, KeyError, TypeError) as exc:
+        LOGGER.warning("ignoring export manifest in %s: %s", directory, exc)
+        return set()
+
+
+class JpegExporter:
+    """Writes ``<export_dir>/<token>.jpg`` at most once per ``export_interval_sec``.
+
+    Each file is written to a temporary name in the same directory and
+    renamed over the previous one, so a static file server (``sendfile``)
+    never sees a partially written JPEG.  Tokens are recorded in a manifest
+    before their first file is written, so ``prune`` only deletes files the
+    exporter created.
+    """
+
+    def __init__(self, clock: Callable[[], float] = time.monotonic) -> None:
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._manifest_lock = threading.Lock()
+        self._owned: Optional[Set[str]] = None
+        self._owned_dir: Optional[str] = None
+        self._last_write: Dict[str, float] = {}
+        self._failing: Dict[str, bool] = {}
+        self._written = 0
+        self._skipped = 0
+        self._failed = 0
+
+    def maybe_write(self, token: str, jpeg: bytes) -> bool:
+        """Export ``jpeg`` for ``token`` unless disabled or written too recently."""
+
+        settings = get_settings()
+        directory = settings.export_dir
+        if not directory or not _exportable(token):
+            return False
+        now = self._clock()
+        with self._lock:
+            last = self._last_write.get(token)
+            if last is not None and now - last < settings.export_interval_sec:
+                self._skipped += 1
+                return False
+            self._last_write[token] = now
+        try:
+            self._claim(directory, token)
+            _write_atomic(directory, token + EXPORT_SUFFIX, jpeg)
+        except OSError as exc:
+            with self._lock:
+                self._failed += 1
+                first_failure = not self._failing.get(token)
+                self._failing[token] = True
+            if first_failure:
+                LOGGER.warning("%s: JPEG export to %s failed: %s", token, directory, exc)
+            return False
+        with self._lock:
+            self._written += 1
+            self._failing.pop(token, None)
+        return True
+
+    def _owned_tokens(self, directory: str) -> Set[str]:
+        """Tokens listed in ``directory``'s manifest; ``_manifest_lock`` must be held."""
+
+        if self._owned is None or self._owned_dir != directory:
+            self._owned = _read_manifest(directory)
+            self._owned_dir = directory
+        return self._owned
+
+    def _save_manifest(self, directory: str, owned: Set[str]) -> None:
+        payload = json.dumps({"tokens": sorted(owned)}, separators=(",", ":")).encode()
+        _write_atomic(directory, MANIFEST_NAME, payload)
+
+    def _claim(self, directory: str, token: str) -> None:
+        with self._manifest_lock:
+            owned = self._owned_tokens(directory)
+            if token in owned:
+                return
+            owned.add(token)
+            self._save_manifest(directory, owned)
+
+    def remove(self, token: str) -> None:
+        """Delete the exported file of an unregistered camera."""
+
+        with self._lock:
+            self._last_write.pop(token, None)
+            self._failing.pop(token, None)
+        directory = get_settings().export_dir
+        if not directory or not _exportable(token):
+            return
+        with self._manifest_lock:
+            owned = self._owned_tokens(directory)
+            if token not in owned:
+                return
+            try:
+                os.unlink(export_path(directory, token))
+            except FileNotFoundError:
+                pass
+            except OSError as exc:
+                LOGGER.warning("%s: could not remove exported JPEG: %s", token, exc)
+                return
+            owned.discard(token)
+            try:
+                self._save_manifest(directory, owned)
+            except OSError as exc:
+                LOGGER.warning("could not update export manifest in %s: %s", directory, exc)
+
+    def prune(self, keep: Iterable[str]) -> int:
+        """Remove exported files of tokens not in ``keep``, and leftover temp files.
+
+        Only tokens in the manifest and ``TEMP_PREFIX`` temp files are touched;
+        other files in the directory are left alone.
+        """
+
+        directory = get_settings().export_dir
+        if not directory or not os.path.isdir(directory):
+            return 0
+        keep = set(keep)
+        removed = 0
+        for name in os.listdir(directory):
+            if not (name.startswith(TEMP_PREFIX) and name.endswith(".tmp")):
+                continue
+            try:
+                os.unlink(os.path.join(directory, name))
+                removed += 1
+            except OSError as exc:
+                LOGGER.warning("could not remove stale export %s: %s", name, exc)
+        with self._manifest_lock:
+            owned = self._owned_tokens(directory)
+            stale = {token for token in owned - keep if _exportable(token)}
+            for token in sorted(stale):
+                try:
+                    os.unlink(export_path(directory, token))
+                    removed += 1
+                except FileNotFoundError:
+                    pass
+                except OSError as exc:
+                    LOGGER.warning("could not remove stale export %s: %s", token, exc)
+                    stale.discard(token)
+            if stale:
+                owned -= stale
+                try:
+                    self._save_manifest(directory, owned)
+                except OSError as exc:
+                    LOGGER.warning("could not update export manifest in %s: %s", directory, exc)
+        return removed
+
+    def stats(self) -> Dict[str, Any]:
+        settings = get_settings()
+        with self._lock:
+            return {
+                "dir": settings.export_dir,
+                "interval_sec": settings.export_interval_sec,
+                "written": self._written,
+                "skipped": self._skipped,
+                "failed": self._failed,
+                "failing_tokens": sorted(self._failing),
+            }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._last_write.clear()
+            self._failing.clear()
+        with self._manifest_lock:
+            self._owned = None
+            self._owned_dir = None
+
+
+EXPORTER = JpegExporter()
@@ -0,0 +1,71 @@
+"""Pixel format helpers for captured frames."""
+
+from __future__ import annotations
+
+from typing import Tuple
+
+import cv2
+import numpy as np
+
+BGR = "bgr"
+I420 = "i420"
+PIXEL_FORMATS = (BGR, I420)
+
+# Decoders emit (and ``cvtColor`` assumes) video-range YUV; JFIF expects full range.
+_LUMA_TO_FULL = np.clip(np.round((np.arange(256) - 16) * 255 / 219), 0, 255).astype(np.uint8)
+_CHROMA_TO_FULL = np.clip(np.round((np.arange(256) - 128) * 255 / 224 + 128), 0, 255).astype(np.uint8)
+
+
+def frame_size(frame: np.ndarray, pixel_format: str = BGR) -> Tuple[int, int]:
+    """Return the ``(width, height)`` of the picture stored in ``frame``."""
+
+    if pixel_format == I420:
+        return frame.shape[1], frame.shape[0] * 2 // 3
+    return frame.shape[1], frame.shape[0]
+
+
+def i420_planes(frame: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Split a ``(H * 3 / 2, W)`` I420 buffer into Y, U and V views without copying."""
+
+    width, height = frame_size(frame, I420)
+    flat = frame.reshape(-1)
+    luma = width * height
+    chroma = (width // 2) * (height // 2)
+    y = flat[:luma].reshape(height, width)
+    u = flat[luma : luma + chroma].reshape(height // 2, width // 2)
+    v = flat[luma + chroma : luma + 2 * chroma].reshape(height // 2, width // 2)
+    return y, u, v
+
+
+def full_range_i420(frame: np.ndarray) -> np.ndarray:
+    """Return a contiguous copy of an I420 frame rescaled to full-range YCbCr.
+
+    A per-plane lookup is far cheaper than a round trip through BGR.
+    """
+
+    width, height = frame_size(frame, I420)
+    flat = frame.reshape(-1)
+    luma = width * height
+    out = np.empty_like(flat)
+    out[:luma] = cv2.LUT(flat[:luma], _LUMA_TO_FULL).reshape(-1)
+    out[luma:] = cv2.LUT(flat[luma:], _CHROMA_TO_FULL).reshape(-1)
+    return out.reshape(frame.shape)
+
+
+def to_bgr(frame: np.ndarray, pixel_format: str = BGR) -> np.ndarray:
+    """Return ``frame`` as a BGR image, converting from I420 when needed."""
+
+    if pixel_format == I420:
+        return cv2.cvtColor(frame, cv2.COLOR_YUV2BGR_I420)
+    return frame
+
+
+def to_gray(frame: np.ndarray, pixel_format: str = BGR) -> np.ndarray:
+    """Return ``frame`` as a full-range 8-bit grayscale image.
+
+    I420 frames only need their luma plane rescaled, skipping colour conversion.
+    """
+
+    if pixel_format == I420:
+        return cv2.LUT(i420_planes(frame)[0], _LUMA_TO_FULL)
+    return cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
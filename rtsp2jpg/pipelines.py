@@ -0,0 +1,176 @@
+"""GStreamer capture pipeline templates and per-camera capture options."""
+
+from __future__ import annotations
+
+import re
+import string
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional
+from urllib.parse import urlsplit, urlunsplit
+
+from .config import get_settings
+
+# Per-camera decode profiles: ``keyframe`` and ``lowres`` trade freshness and
+# resolution for CPU on cameras that are only sampled occasionally.
+DECODE_PROFILES = ("full", "keyframe", "lowres")
+TRANSPORTS = ("tcp", "udp", "auto")
+TEMPLATE_FIELDS = ("source", "decode", "format", "url", "latency", "protocols", "decoder")
+
+# rtspsrc ``protocols`` per transport; ``auto`` lets rtspsrc try UDP then TCP.
+_PROTOCOLS = {"tcp": "tcp", "udp": "udp", "auto": "tcp+udp+udp-mcast"}
+_DEFAULT_PORTS = {"rtsp": 554, "rtsps": 322, "http": 80, "https": 443}
+# Elements a per-camera ``decoder`` override may use: depayloaders, parsers,
+# decoders and converters.  Anything else (sinks, tee, file sources) could
+# make a registration read or write files on the host.
+DECODER_ELEMENTS = frozenset(
+    {
+        "decodebin", "decodebin3", "parsebin",
+        "rtph264depay", "rtph265depay", "rtpjpegdepay", "rtpmp4vdepay",
+        "h264parse", "h265parse", "jpegparse", "mpeg4videoparse",
+        "avdec_h264", "avdec_h265", "avdec_mjpeg", "avdec_mpeg4", "jpegdec", "openh264dec",
+        "nvh264dec", "nvh265dec", "nvjpegdec", "nvv4l2decoder",
+        "vah264dec", "vah265dec", "vajpegdec", "vaapih264dec", "vaapih265dec", "vaapidecodebin",
+        "v4l2h264dec", "v4l2h265dec", "qsvh264dec", "qsvh265dec",
+        "d3d11h264dec", "d3d11h265dec", "omxh264dec", "omxh265dec", "mppvideodec",
+        "videoconvert", "videoscale", "queue",
+    }
+)
+# Properties that point an element at a file/URI or name it for pad references.
+_FORBIDDEN_PROPERTIES = frozenset({"location", "name", "uri", "filename", "device"})
+_PROPERTY_PATTERN = re.compile(r"^([a-z][a-z0-9-]*)=([A-Za-z0-9_.+:/-]+)$")
+_CAPS_PATTERN = re.compile(r"^video/x-[a-z0-9-]+(,[a-z][a-z0-9-]*=[A-Za-z0-9_.+:/-]+)*$")
+
+
+class PipelineError(ValueError):
+    """Raised when a pipeline template or capture option is invalid."""
+
+
+@dataclass(frozen=True)
+class CaptureOptions:
+    """Per-camera capture settings; ``None`` falls back to the global setting."""
+
+    decode_profile: str = "full"
+    transport: Optional[str] = None
+    latency_ms: Optional[int] = None
+    decoder: Optional[str] = None
+
+
+def normalize_url(url: str) -> str:
+    """Canonical form of a stream URL, used to spot cameras registered twice.
+
+    Scheme and host are case-folded, default ports and trailing slashes are
+    dropped; credentials, path case and query are kept as given.
+    """
+
+    url = url.strip()
+    try:
+        parts = urlsplit(url)
+        port = parts.port
+    except ValueError:
+        return url
+    if not parts.hostname:
+        return url
+    scheme = parts.scheme.lower()
+    host = parts.hostname.lower()
+    if ":" in host:
+        host = f"[{host}]"
+    if port is not None and port != _DEFAULT_PORTS.get(scheme):
+        host = f"{host}:{port}"
+    if parts.username is not None:
+        userinfo = parts.username if parts.password is None else f"{parts.username}:{parts.password}"
+        host = f"{userinfo}@{host}"
+    return urlunsplit((scheme, host, parts.path.rstrip("/"), parts.query, ""))
+
+
+def validate_template(template: str) -> None:
+    """Check that ``template`` only uses known placeholders and ends in an appsink."""
+
+    try:
+        fields = {name for _, name, _, _ in string.Formatter().parse(template) if name is not None}
+    except ValueError as exc:
+        raise PipelineError(f"Malformed pipeline template: {exc}") from exc
+    unknown = fields - set(TEMPLATE_FIELDS)
+    if unknown:
+        raise PipelineError(f"Unknown pipeline template field(s): {', '.join(sorted(unknown))}")
+    if not fields & {"source", "url"}:
+        raise PipelineError("Pipeline template must contain {source} or {url}")
+    if "appsink" not in template:
+        raise PipelineError("Pipeline template must end in an appsink")
+
+
+def validate_options(rtsp_url: str, options: CaptureOptions) -> None:
+    """Reject capture options (and URLs) that cannot be put into a pipeline safely."""
+
+    if '"' in rtsp_url:
+        raise PipelineError("RTSP URL must not contain double quotes")
+    if options.decode_profile not in DECODE_PROFILES:
+        raise PipelineError(f"Unknown decode profile '{options.decode_profile}'")
+    if options.transport is not None and options.transport not in TRANSPORTS:
+        raise PipelineError(f"Unknown transport '{options.transport}'")
+    if options.latency_ms is not None and options.latency_ms < 0:
+        raise PipelineError("Latency must be zero or positive")
+    if options.decoder is not None:
+        for element in options.decoder.split("!"):
+            _validate_decoder_element(element.strip())
+    validate_template(get_settings().gstreamer_pipeline_template)
+
+
+def _validate_decoder_element(element: str) -> None:
+    """Accept an allowlisted element with plain ``key=value`` properties, or video caps."""
+
+    if _CAPS_PATTERN.match(element):
+        return
+    name, *properties = element.split()
+    if not name:
+        raise PipelineError("Empty decoder element")
+    allowed = DECODER_ELEMENTS | set(get_settings().gstreamer_allowed_elements)
+    if name not in allowed:
+        raise PipelineError(f"Decoder element '{name}' is not allowed")
+    for prop in properties:
+        match = _PROPERTY_PATTERN.match(prop)
+        if match is None:
+            raise PipelineError(f"Invalid property '{prop}' on decoder element '{name}'")
+        if match.group(1) in _FORBIDDEN_PROPERTIES:
+            raise PipelineError(f"Property '{match.group(1)}' is not allowed in decoder overrides")
+
+
+def _decode_chain(decoder: str, decode_profile: str) -> str:
+    elements = [element.strip() for element in decoder.split("!")]
+    if decode_profile == "keyframe":
+        # Drop delta units before they reach the decoder; decodebin needs a
+        # parsed stream for the flags to be set.
+        if elements == ["decodebin"]:
+            elements.insert(0, "parsebin")
+        elements.insert(len(elements) - 1, "identity drop-buffer-flags=delta-unit")
+    if decode_profile == "lowres":
+        width = get_settings().decode_lowres_width
+        elements += ["videoscale", f"video/x-raw,width={width},pixel-aspect-ratio=1/1"]
+    return " ! ".join(elements)
+
+
+def build_pipeline(source: str, options: CaptureOptions = CaptureOptions(), yuv: bool = False) -> str:
+    """Render the configured pipeline template for one camera.
+
+    RTSP URLs become an ``rtspsrc`` with the camera's latency and transport;
+    anything else (local files in benchmarks) goes through ``urisourcebin``.
+    """
+
+    settings = get_settings()
+    latency = settings.gstreamer_latency_ms if options.latency_ms is None else options.latency_ms
+    protocols = _PROTOCOLS[options.transport or settings.gstreamer_transport]
+    decoder = options.decoder or settings.gstreamer_decoder
+    if source.lower().startswith(("rtsp://", "rtsps://")):
+        src = f'rtspsrc location="{source}" latency={latency} protocols={protocols}'
+    else:
+        uri = source if "://" in source else Path(source).resolve().as_uri()
+        src = f'urisourcebin uri="{uri}"'
+    return settings.gstreamer_pipeline_template.format(
+        source=src,
+        decode=_decode_chain(decoder, options.decode_profile),
+        format="I420" if yuv else "BGR",
+        url=source,
+        latency=latency,
+        protocols=protocols,
+        decoder=decoder,
+    )
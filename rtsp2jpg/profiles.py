@@ -0,0 +1,39 @@
+"""Per-camera tuning profiles layered over the global settings."""
+
+from __future__ import annotations
+
+from dataclasses import dataclass, fields
+from typing import NamedTuple, Optional
+
+from .config import Settings
+
+
+class Tuning(NamedTuple):
+    """Resolved tuning values a worker reads on every iteration."""
+
+    read_throttle_sec: float
+    jpeg_quality: int
+    reconnect_delay_sec: float
+    decoder_warning_window_sec: float
+    priority_class: str
+
+
+TUNING_FIELDS = Tuning._fields
+
+
+@dataclass(frozen=True)
+class CameraProfile:
+    """Per-camera overrides of the global tuning settings; ``None`` inherits."""
+
+    read_throttle_sec: Optional[float] = None
+    jpeg_quality: Optional[int] = None
+    reconnect_delay_sec: Optional[float] = None
+    decoder_warning_window_sec: Optional[float] = None
+    priority_class: Optional[str] = None
+
+    def resolve(self, settings: Settings) -> Tuning:
+        values = {}
+        for field in fields(self):
+            value = getattr(self, field.name)
+            values[field.name] = getattr(settings, field.name) if value is None else value
+        return Tuning(**values)
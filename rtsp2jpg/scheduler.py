@@ -0,0 +1,123 @@
+"""Process-wide decode budget shared between cameras by priority class."""
+
+from __future__ import annotations
+
+import threading
+from typing import Any, Dict, NamedTuple, Optional, Tuple
+
+from .config import get_settings
+
+# Highest priority first: lower classes are demoted first when over budget.
+PRIORITY_CLASSES = ("critical", "normal", "background")
+
+# Rate assumed for a camera read without a throttle.
+UNTHROTTLED_FPS = 30.0
+
+
+class Grant(NamedTuple):
+    priority_class: str
+    requested_fps: float
+    granted_fps: float
+
+
+def requested_fps(read_throttle_sec: float) -> float:
+    return 1.0 / read_throttle_sec if read_throttle_sec > 0 else UNTHROTTLED_FPS
+
+
+def allocate(
+    requests: Dict[str, Tuple[str, float]], budget_fps: float, floor_fps: float
+) -> Dict[str, float]:
+    """Split ``budget_fps`` between ``{token: (priority_class, requested_fps)}``.
+
+    Every camera keeps ``floor_fps`` (or its request, if lower) so nothing
+    starves; the rest goes to each class in priority order, scaled down
+    proportionally inside the first class that no longer fits.  A budget of
+    zero grants every request.
+    """
+
+    if budget_fps <= 0:
+        return {token: wanted for token, (_, wanted) in requests.items()}
+
+    grants = {token: min(floor_fps, wanted) for token, (_, wanted) in requests.items()}
+    spare = budget_fps - sum(grants.values())
+    for priority_class in PRIORITY_CLASSES:
+        extra = {
+            token: wanted - grants[token]
+            for token, (klass, wanted) in requests.items()
+            if klass == priority_class and wanted > grants[token]
+        }
+        total = sum(extra.values())
+        if not total:
+            continue
+        share = 1.0 if total <= spare else max(spare, 0.0) / total
+        for token, amount in extra.items():
+            grants[token] += amount * share
+        spare -= total * share
+    return grants
+
+
+class DecodeScheduler:
+    """Keeps per-camera frame rates inside the global decode budget.
+
+    Grants are recomputed whenever a camera is added, removed or changes its
+    request, so demoted cameras recover as soon as load falls.  Workers only
+    read ``min_interval`` (a dict lookup) in their loop.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._requests: Dict[str, Tuple[str, float]] = {}
+        self._grants: Dict[str, float] = {}
+        self._intervals: Dict[str, float] = {}
+
+    def update(self, token: str, priority_class: str, requested: float) -> None:
+        with self._lock:
+            self._requests[token] = (priority_class, requested)
+            self._rebalance_locked()
+
+    def remove(self, token: str) -> None:
+        with self._lock:
+            if self._requests.pop(token, None) is not None:
+                self._rebalance_locked()
+
+    def _rebalance_locked(self) -> None:
+        settings = get_settings()
+        self._grants = allocate(self._requests, settings.decode_budget_fps, settings.decode_min_fps)
+        self._intervals = {
+            token: 1.0 / granted if granted > 0 else 0.0 for token, granted in self._grants.items()
+        }
+
+    def min_interval(self, token: str) -> float:
+        """Shortest time the worker of ``token`` may take per frame (0 = unrestricted)."""
+
+        return self._intervals.get(token, 0.0)
+
+    def grant(self, token: str) -> Optional[Grant]:
+        with self._lock:
+            request = self._requests.get(token)
+            if request is None:
+                return None
+            return Grant(request[0], request[1], self._grants.get(token, request[1]))
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            cameras = {
+                token: Grant(klass, wanted, self._grants.get(token, wanted))._asdict()
+                for token, (klass, wanted) in self._requests.items()
+            }
+        return {
+            "budget_fps": get_settings().decode_budget_fps,
+            "requested_fps": sum(camera["requested_fps"] for camera in cameras.values()),
+            "granted_fps": sum(camera["granted_fps"] for camera in cameras.values()),
+            "demoted": sum(1 for camera in cameras.values() if camera["granted_fps"] < camera["requested_fps"]),
+            "cameras": cameras,
+        }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._requests.clear()
+            self._grants.clear()
+            self._intervals.clear()
+
+
+SCHEDULER = DecodeScheduler()
@@ -0,0 +1,204 @@
+"""Adaptive load shedding driven by the measured cost of camera workers."""
+
+from __future__ import annotations
+
+import logging
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from .config import get_settings
+from .executor import get_encode_executor
+from .profiles import Tuning
+from .scheduler import requested_fps
+
+LOGGER = logging.getLogger(__name__)
+
+# Each level keeps the measures of the levels below it.
+SHED_LEVELS = ("normal", "throttle", "quality", "lazy")
+NORMAL, THROTTLE, QUALITY, LAZY = range(len(SHED_LEVELS))
+
+# Cameras in this class are never shed.
+EXEMPT_CLASS = "critical"
+
+_EVAL_INTERVAL_SEC = 1.0
+_EWMA_ALPHA = 0.2
+
+
+def _cpu_count() -> int:
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:  # pragma: no cover - non-Linux platforms
+        return os.cpu_count() or 1
+
+
+def _ewma(previous: Optional[float], value: float) -> float:
+    return value if previous is None else previous + _EWMA_ALPHA * (value - previous)
+
+
+class _CameraLoad:
+    __slots__ = ("read", "encode", "cpu", "period", "last")
+
+    def __init__(self, now: float) -> None:
+        self.read: Optional[float] = None
+        self.encode: Optional[float] = None
+        self.cpu: Optional[float] = None
+        self.period: Optional[float] = None
+        self.last = now
+
+
+class LoadShedder:
+    """Escalates through ``SHED_LEVELS`` while the process is falling behind.
+
+    Workers report per-frame read/encode wall time and the CPU time their
+    thread spent on the frame.  The load is the CPU share of all cameras
+    (relative to the cores available) or the encode queue fill, whichever is
+    higher.  The level goes up one step once the load has stayed above
+    ``shed_high_watermark`` for ``shed_hold_sec`` and back down once the load
+    projected for the lower level has stayed below ``shed_low_watermark`` as
+    long, so the controller does not flap around a single threshold.
+    """
+
+    def __init__(self, clock: Callable[[], float] = time.monotonic, cpus: Optional[int] = None) -> None:
+        self._clock = clock
+        self._cpus = cpus or _cpu_count()
+        self._lock = threading.Lock()
+        self._cameras: Dict[str, _CameraLoad] = {}
+        # Read without the lock by workers on every frame.
+        self.level = NORMAL
+        self._load = 0.0
+        self._queue_fill = 0.0
+        self._candidate: Optional[int] = None
+        self._candidate_since = 0.0
+        self._changed_at = clock()
+        self._transitions = 0
+        self._next_eval = 0.0
+        # (throttle factor, shed JPEG quality), read once per level change so
+        # ``apply`` never touches the settings on the per-frame path.
+        self._shed_params: Optional[Tuple[float, int]] = None
+
+    def observe(self, token: str, read_sec: float, encode_sec: float, cpu_sec: float) -> None:
+        """Record the cost of one stored frame and re-evaluate at most once a second."""
+
+        now = self._clock()
+        with self._lock:
+            camera = self._cameras.get(token)
+            if camera is None:
+                self._cameras[token] = _CameraLoad(now)
+                return
+            camera.read = _ewma(camera.read, read_sec)
+            camera.encode = _ewma(camera.encode, encode_sec)
+            camera.cpu = _ewma(camera.cpu, cpu_sec)
+            camera.period = _ewma(camera.period, now - camera.last)
+            camera.last = now
+            due = now >= self._next_eval
+        if due:
+            self.evaluate()
+
+    def forget(self, token: str) -> None:
+        with self._lock:
+            self._cameras.pop(token, None)
+
+    def _queue_fill_now(self) -> float:
+        stats = get_encode_executor().stats()
+        backlog = stats["capacity"] - stats["workers"]
+        return stats["queued"] / backlog if backlog > 0 else 0.0
+
+    def evaluate(self) -> int:
+        """Recompute the load and move the shedding level if the hold time has passed."""
+
+        settings = get_settings()
+        queue_fill = self._queue_fill_now()
+        with self._lock:
+            now = self._clock()
+            self._next_eval = now + _EVAL_INTERVAL_SEC
+            busy = sum(
+                camera.cpu / camera.period
+                for camera in self._cameras.values()
+                if camera.cpu is not None and camera.period
+            )
+            self._load = busy / self._cpus
+            self._queue_fill = queue_fill
+            level = self.level
+            if not settings.load_shedding:
+                self._set_level_locked(NORMAL, now, "load shedding disabled")
+                return self.level
+
+            pressure = max(self._load, queue_fill)
+            # Dropping the throttle step multiplies the frame rate again.
+            projected = max(
+                self._load * settings.shed_throttle_factor if level == THROTTLE else self._load,
+                queue_fill,
+            )
+            target: Optional[int] = None
+            if level < LAZY and pressure >= settings.shed_high_watermark:
+                target = level + 1
+            elif level > NORMAL and projected <= settings.shed_low_watermark:
+                target = level - 1
+
+            if target != self._candidate:
+                self._candidate = target
+                self._candidate_since = now
+            elif target is not None and now - self._candidate_since >= settings.shed_hold_sec:
+                reason = f"cpu load {self._load:.2f}, encode queue {queue_fill:.2f}"
+                self._set_level_locked(target, now, reason)
+            return self.level
+
+    def _set_level_locked(self, level: int, now: float, reason: str) -> None:
+        self._candidate = None
+        if level == self.level:
+            return
+        log = LOGGER.warning if level > self.level else LOGGER.info
+        log("load shedding %s -> %s (%s)", SHED_LEVELS[self.level], SHED_LEVELS[level], reason)
+        self._shed_params = None
+        self.level = level
+        self._changed_at = now
+        self._transitions += 1
+
+    def apply(self, tuning: Tuning) -> Tuple[Tuning, bool]:
+        """Return the tuning a worker should use now and whether to render eager presets."""
+
+        level = self.level
+        if level == NORMAL or tuning.priority_class == EXEMPT_CLASS:
+            return tuning, True
+        params = self._shed_params
+        if params is None:
+            settings = get_settings()
+            params = self._shed_params = (settings.shed_throttle_factor, settings.shed_jpeg_quality)
+        throttle_factor, shed_quality = params
+        throttle = throttle_factor / requested_fps(tuning.read_throttle_sec)
+        quality = tuning.jpeg_quality
+        if level >= QUALITY:
+            quality = min(quality, shed_quality)
+        return tuning._replace(read_throttle_sec=throttle, jpeg_quality=quality), level < LAZY
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "enabled": get_settings().load_shedding,
+                "level": SHED_LEVELS[self.level],
+                "cpu_load": round(self._load, 3),
+                "encode_queue_fill": round(self._queue_fill, 3),
+                "level_age_sec": round(self._clock() - self._changed_at, 1),
+                "transitions": self._transitions,
+                "cameras": {
+                    token: {
+                        "read_ms": round((camera.read or 0.0) * 1000.0, 2),
+                        "encode_ms": round((camera.encode or 0.0) * 1000.0, 2),
+                        "cpu_ms": round((camera.cpu or 0.0) * 1000.0, 2),
+                        "fps": round(1.0 / camera.period, 2) if camera.period else 0.0,
+                    }
+                    for token, camera in self._cameras.items()
+                },
+            }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._cameras.clear()
+            self._candidate = None
+            self._shed_params = None
+            self.level = NORMAL
+
+
+SHEDDER = LoadShedder()
@@ -0,0 +1,126 @@
+"""Snapshot variants: output quality, size and named presets."""
+
+from __future__ import annotations
+
+from typing import Any, Dict, Mapping, NamedTuple, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from .config import get_settings
+
+FIT_MODES = ("contain", "cover", "fill")
+
+
+class Variant(NamedTuple):
+    """Encoding parameters identifying one cached rendition of a frame.
+
+    ``crop`` (``x, y, width, height`` in full-frame pixels) is applied before
+    resizing; named camera views are crop variants.
+    """
+
+    quality: int
+    width: Optional[int] = None
+    height: Optional[int] = None
+    fit: str = "contain"
+    crop: Optional[Tuple[int, int, int, int]] = None
+
+    @property
+    def resized(self) -> bool:
+        return self.width is not None or self.height is not None
+
+
+def preset_variant(name: str, default_quality: int) -> Variant:
+    """Return the variant configured for the named preset.
+
+    Raises ``KeyError`` when the preset is not defined in ``Settings``.
+    """
+
+    preset = get_settings().snapshot_presets[name]
+    quality = preset.quality if preset.quality is not None else default_quality
+    return Variant(int(quality), preset.width, preset.height, preset.fit)
+
+
+def view_variant(definition: Mapping[str, Any], default_quality: int) -> Variant:
+    """Return the crop variant of a stored camera view definition."""
+
+    quality = definition.get("q")
+    return Variant(
+        int(quality if quality is not None else default_quality),
+        definition.get("width"),
+        definition.get("height"),
+        definition.get("fit", "contain"),
+        tuple(definition["crop"]),
+    )
+
+
+def view_variants(definitions: Mapping[str, Mapping[str, Any]], default_quality: int) -> Dict[str, Variant]:
+    return {name: view_variant(definition, default_quality) for name, definition in definitions.items()}
+
+
+def crop_frame(frame: np.ndarray, crop: Tuple[int, int, int, int]) -> np.ndarray:
+    """Return the ``(x, y, width, height)`` region of ``frame`` as a view, clipped to the frame.
+
+    Raises ``ValueError`` when the region lies entirely outside the frame.
+    """
+
+    x, y, width, height = crop
+    frame_height, frame_width = frame.shape[:2]
+    left, top = max(x, 0), max(y, 0)
+    right, bottom = min(x + width, frame_width), min(y + height, frame_height)
+    if right <= left or bottom <= top:
+        raise ValueError(f"crop lies outside the {frame_width}x{frame_height} frame")
+    return frame[top:bottom, left:right]
+
+
+def target_size(
+    frame_width: int,
+    frame_height: int,
+    width: Optional[int],
+    height: Optional[int],
+    fit: str,
+) -> Tuple[int, int]:
+    """Compute the output size for a requested width/height/fit combination."""
+
+    if width is None and height is None:
+        return frame_width, frame_height
+    if width is None:
+        width = max(1, round(frame_width * height / frame_height))
+        fit = "contain" if fit == "cover" else fit
+    if height is None:
+        height = max(1, round(frame_height * width / frame_width))
+        fit = "contain" if fit == "cover" else fit
+
+    if fit == "contain":
+        scale = min(width / frame_width, height / frame_height, 1.0)
+        return max(1, round(frame_width * scale)), max(1, round(frame_height * scale))
+    return width, height
+
+
+def resize_frame(
+    frame: np.ndarray,
+    width: Optional[int],
+    height: Optional[int],
+    fit: str = "contain",
+) -> np.ndarray:
+    """Resize ``frame`` with area interpolation according to ``fit``.
+
+    ``contain`` keeps the aspect ratio inside the box and never upscales,
+    ``cover`` fills the box and centre-crops the overflow, ``fill`` stretches.
+    """
+
+    frame_height, frame_width = frame.shape[:2]
+    out_width, out_height = target_size(frame_width, frame_height, width, height, fit)
+
+    if fit == "cover" and width is not None and height is not None:
+        scale = max(out_width / frame_width, out_height / frame_height)
+        crop_width = min(frame_width, max(1, round(out_width / scale)))
+        crop_height = min(frame_height, max(1, round(out_height / scale)))
+        x0 = (frame_width - crop_width) // 2
+        y0 = (frame_height - crop_height) // 2
+        frame = frame[y0 : y0 + crop_height, x0 : x0 + crop_width]
+        frame_height, frame_width = frame.shape[:2]
+
+    if (out_width, out_height) == (frame_width, frame_height):
+        return frame
+    return cv2.resize(frame, (out_width, out_height), interpolation=cv2.INTER_AREA)
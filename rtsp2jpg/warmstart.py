@@ -0,0 +1,107 @@
+"""Single-file store of the last JPEG per camera, reloaded at startup."""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+import struct
+import tempfile
+import time
+from typing import Iterable, List, Optional
+
+from .cache import WarmFrame
+
+LOGGER = logging.getLogger(__name__)
+
+# File layout: magic, little-endian index length, JSON index, then the JPEGs
+# back to back in index order.
+MAGIC = b"R2JWARM1"
+_INDEX_LENGTH = struct.Struct("<I")
+
+
+def save(path: str, frames: Iterable[WarmFrame]) -> int:
+    """Atomically replace ``path`` with ``frames``; return how many were written."""
+
+    frames = list(frames)
+    index = json.dumps(
+        [
+            {
+                "token": frame.token,
+                "quality": frame.quality,
+                "last_seen": frame.last_seen,
+                "status": frame.status,
+                "error": frame.error,
+                "length": len(frame.jpeg),
+            }
+            for frame in frames
+        ],
+        separators=(",", ":"),
+    ).encode()
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(prefix=".warmstart.", suffix=".tmp", dir=directory)
+    try:
+        with os.fdopen(fd, "wb") as handle:
+            handle.write(MAGIC)
+            handle.write(_INDEX_LENGTH.pack(len(index)))
+            handle.write(index)
+            for frame in frames:
+                handle.write(frame.jpeg)
+        os.replace(temp_path, path)
+    except BaseException:
+        try:
+            os.unlink(temp_path)
+        except OSError:
+            pass
+        raise
+    return len(frames)
+
+
+def load(
+    path: str,
+    tokens: Optional[Iterable[str]] = None,
+    max_age_sec: float = 0.0,
+    now: Optional[float] = None,
+) -> List[WarmFrame]:
+    """Read the frames in ``path``, keeping only ``tokens`` and frames newer than ``max_age_sec``.
+
+    A missing file yields no frames; a damaged one is logged and ignored.
+    """
+
+    wanted = set(tokens) if tokens is not None else None
+    now = time.time() if now is None else now
+    try:
+        with open(path, "rb") as handle:
+            if handle.read(len(MAGIC)) != MAGIC:
+                raise ValueError("not a warm-start file")
+            (index_length,) = _INDEX_LENGTH.unpack(handle.read(_INDEX_LENGTH.size))
+            index = json.loads(handle.read(index_length))
+            frames = []
+            for entry in index:
+                length = entry["length"]
+                keep = (wanted is None or entry["token"] in wanted) and (
+                    max_age_sec <= 0 or now - entry["last_seen"] <= max_age_sec
+                )
+                if not keep:
+                    handle.seek(length, os.SEEK_CUR)
+                    continue
+                jpeg = handle.read(length)
+                if len(jpeg) != length:
+                    raise ValueError("truncated warm-start file")
+                frames.append(
+                    WarmFrame(
+                        entry["token"],
+                        jpeg,
+                        entry["quality"],
+                        entry["last_seen"],
+                        entry["status"],
+                        entry["error"],
+                    )
+                )
+    except FileNotFoundError:
+        return []
+    except (OSError, ValueError, KeyError, TypeError, struct.error) as exc:
+        LOGGER.warning("ignoring warm-start file %s: %s", path, exc)
+        return []
+    return frames
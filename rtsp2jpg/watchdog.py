@@ -0,0 +1,124 @@
+"""Watchdog for camera workers stuck in a blocking open or read."""
+
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from .config import get_settings
+
+LOGGER = logging.getLogger(__name__)
+
+
+class Heartbeat:
+    """Per-thread marker set while the worker is blocked in OpenCV."""
+
+    __slots__ = ("blocked_since",)
+
+    def __init__(self) -> None:
+        self.blocked_since: Optional[float] = None
+
+
+class Watchdog:
+    """Detects workers whose open/read has blocked longer than the stall timeout.
+
+    A stuck ``VideoCapture`` cannot be released safely from another thread
+    (the decoder state would be freed under the blocked call), so stalled
+    readers are abandoned instead: the callback replaces them and the old
+    thread, with its session, is counted as leaked until the call returns.
+    """
+
+    def __init__(self, clock: Callable[[], float] = time.monotonic) -> None:
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._heartbeats: Dict[str, Heartbeat] = {}
+        self._abandoned: List[Tuple[str, threading.Thread]] = []
+        self._stalls = 0
+        self._leaked_total = 0
+        self._thread: Optional[threading.Thread] = None
+
+    def attach(self, token: str) -> Heartbeat:
+        heartbeat = Heartbeat()
+        with self._lock:
+            self._heartbeats[token] = heartbeat
+        return heartbeat
+
+    def detach(self, token: str, heartbeat: Optional[Heartbeat] = None) -> None:
+        with self._lock:
+            if heartbeat is None or self._heartbeats.get(token) is heartbeat:
+                self._heartbeats.pop(token, None)
+
+    def attached(self, token: str) -> Optional[Heartbeat]:
+        """Return the heartbeat currently watched for ``token``, if any."""
+
+        with self._lock:
+            return self._heartbeats.get(token)
+
+    def abandon(self, token: str, thread: Optional[threading.Thread]) -> None:
+        """Count ``thread`` as leaked until it finally exits."""
+
+        if thread is None or not thread.is_alive():
+            return
+        with self._lock:
+            self._abandoned.append((token, thread))
+            self._leaked_total += 1
+
+    def is_abandoned(self, thread: threading.Thread) -> bool:
+        with self._lock:
+            return any(abandoned is thread for _, abandoned in self._abandoned)
+
+    def check(self) -> List[Tuple[str, float]]:
+        """Return ``(token, blocked_for)`` for every worker past the stall timeout.
+
+        Reported heartbeats are detached, so each stall is reported once.
+        """
+
+        timeout = get_settings().read_stall_timeout_sec
+        if timeout <= 0:
+            return []
+        now = self._clock()
+        stalled = []
+        with self._lock:
+            for token, heartbeat in list(self._heartbeats.items()):
+                since = heartbeat.blocked_since
+                if since is not None and now - since >= timeout:
+                    stalled.append((token, now - since))
+                    del self._heartbeats[token]
+            self._stalls += len(stalled)
+            self._abandoned = [entry for entry in self._abandoned if entry[1].is_alive()]
+        return stalled
+
+    def ensure_started(self, on_stall: Callable[[str, float], None]) -> None:
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(
+                target=self._run, args=(on_stall,), name="capture-watchdog", daemon=True
+            )
+            self._thread.start()
+
+    def _run(self, on_stall: Callable[[str, float], None]) -> None:
+        while True:
+            timeout = get_settings().read_stall_timeout_sec
+            time.sleep(min(1.0, timeout / 4) if timeout > 0 else 1.0)
+            for token, blocked_for in self.check():
+                try:
+                    on_stall(token, blocked_for)
+                except Exception:  # pragma: no cover - keep watching other cameras
+                    LOGGER.exception("%s: failed to replace stalled worker", token)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            self._abandoned = [entry for entry in self._abandoned if entry[1].is_alive()]
+            return {
+                "stall_timeout_sec": get_settings().read_stall_timeout_sec,
+                "stalls": self._stalls,
+                "leaked_threads": len(self._abandoned),
+                "leaked_tokens": sorted({token for token, _ in self._abandoned}),
+                "leaked_total": self._leaked_total,
+            }
+
+
+WATCHDOG = Watchdog()
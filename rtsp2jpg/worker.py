@@ -5,29 +5,63 @@ from __future__ import annotations
 import logging
 import threading
 import time
-from typing import Dict, Optional
+from dataclasses import replace
+from typing import Any, Callable, Dict, Hashable, Iterable, List, Optional, Set, Tuple
 
 import cv2
+import numpy as np
 
 from . import cache
 from .backends import backend_name, choose_backend, open_stream
+from .buffers import FrameBufferPool
 from .config import get_settings
-from .db import update_status
+from .db import update_status, update_statuses
 from .decoder_warnings import ensure_started as ensure_decoder_monitor_started
 from .decoder_warnings import (
     had_recent_warning_for_token as decoder_warning_recent_for_token,
 )
 from .decoder_warnings import register_stream as register_decoder_stream
 from .decoder_warnings import unregister_stream as unregister_decoder_stream
+from .frames import BGR, I420, frame_size, to_bgr
+from .pipelines import CaptureOptions, normalize_url
+from .profiles import CameraProfile, Tuning
+from .scheduler import SCHEDULER, requested_fps
+from .shedding import SHEDDER
+from .watchdog import WATCHDOG, Heartbeat
 
 LOGGER = logging.getLogger(__name__)
 
+# Per-capture state is keyed by the token that started the capture (its
+# group); further tokens registered for the same stream join that group.
 WORKERS: Dict[str, threading.Thread] = {}
 STOP_EVENTS: Dict[str, threading.Event] = {}
 BACKEND_CHOICE: Dict[str, Optional[int]] = {}
 BACKEND_AUTODETECT: Dict[str, bool] = {}
+CAPTURE_OPTIONS: Dict[str, CaptureOptions] = {}
+STREAM_URLS: Dict[str, str] = {}
+PROFILES: Dict[str, CameraProfile] = {}
+# Resolved per-camera tuning, read by the worker on every iteration.
+TUNING: Dict[str, Tuning] = {}
+# Token -> group, group -> member tokens, capture key -> group.
+GROUP_OF: Dict[str, str] = {}
+MEMBERS: Dict[str, Tuple[str, ...]] = {}
+SHARED_CAPTURES: Dict[Hashable, str] = {}
+_LIFECYCLE_LOCK = threading.RLock()
+# Dual-stream cameras: the worker decodes the substream continuously and a
+# main-stream reader runs only while full-resolution frames are requested.
+SUBSTREAM_URLS: Dict[str, str] = {}
+MAIN_DEMAND: Dict[str, float] = {}
+MAIN_READERS: Dict[str, Tuple[threading.Thread, threading.Event]] = {}
+MAIN_RETRY_AT: Dict[str, float] = {}
+MAIN_LIVE: Set[str] = set()
+# Watchdog key suffix of a group's main-stream reader.
+MAIN_READER_SUFFIX = "/main"
+# Progress of the background rolling restart (see ``start_restart``).
+RESTART_STATUS: Dict[str, Any] = {"state": "idle"}
+_RESTART: Optional[Tuple[threading.Thread, threading.Event]] = None
 
 MAX_CONSECUTIVE_FRAME_FAILURES = 5
+FRAME_BUFFER_POOL_SIZE = 3
 
 
 def start_worker(
@@ -36,56 +70,633 @@ def start_worker(
     backend_flag: Optional[int],
     *,
     autodetect: bool = False,
+    capture: CaptureOptions = CaptureOptions(),
+    profile: CameraProfile = CameraProfile(),
+    substream_url: Optional[str] = None,
 ) -> None:
     """Start a worker thread for the given camera token.
 
     When ``autodetect`` is ``True`` the worker will periodically re-run backend
     detection after connection failures until it succeeds, allowing startup to
     proceed even if the camera was temporarily offline during the initial
-    bootstrap.
+    bootstrap.  ``capture`` carries the camera's decode profile and pipeline
+    overrides, ``profile`` its tuning overrides.  With ``substream_url`` the
+    worker decodes the substream and opens ``rtsp_url`` only on demand.
+
+    A token whose normalized URL, backend and profiles match a running
+    capture joins it instead of opening a second RTSP session.
     """
 
-    stop_event = threading.Event()
-    STOP_EVENTS[token] = stop_event
-    BACKEND_CHOICE[token] = backend_flag
-    BACKEND_AUTODETECT[token] = autodetect
-    cache.set_status(token, "connecting")
-    update_status(token, "connecting")
+    key = _capture_key(rtsp_url, substream_url, backend_flag, capture, profile)
+    with _LIFECYCLE_LOCK:
+        group = SHARED_CAPTURES.get(key)
+        if group is not None and group in STOP_EVENTS:
+            _join_group(token, group)
+            return
+        group = _free_group_id(token)
+        SHARED_CAPTURES[key] = group
+        GROUP_OF[token] = group
+        MEMBERS[group] = (token,)
+        BACKEND_CHOICE[group] = backend_flag
+        BACKEND_AUTODETECT[group] = autodetect
+        CAPTURE_OPTIONS[group] = capture
+        STREAM_URLS[group] = rtsp_url
+        if substream_url:
+            SUBSTREAM_URLS[group] = substream_url
+        PROFILES[group] = profile
+        _set_tuning(group, profile.resolve(get_settings()))
+        cache.set_status(token, "connecting", backend=backend_name(backend_flag))
+        update_status(token, "connecting")
+        _spawn(group, _capture_url(group))
+    WATCHDOG.ensure_started(_replace_stalled_worker)
+
+
+def _free_group_id(token: str) -> str:
+    """Return ``token``, or a suffixed id while a capture it started still serves other tokens."""
+
+    group, suffix = token, 1
+    while group in MEMBERS or group in STOP_EVENTS:
+        suffix += 1
+        group = f"{token}#{suffix}"
+    return group
+
+
+def _capture_key(
+    rtsp_url: str,
+    substream_url: Optional[str],
+    backend_flag: Optional[int],
+    capture: CaptureOptions,
+    profile: CameraProfile,
+) -> Hashable:
+    substream = normalize_url(substream_url) if substream_url else None
+    return normalize_url(rtsp_url), substream, backend_flag, capture, profile
+
+
+def _capture_url(group: str) -> str:
+    """URL the group's worker reads continuously: the substream when there is one."""
+
+    return SUBSTREAM_URLS.get(group) or STREAM_URLS[group]
+
+
+def _join_group(token: str, group: str) -> None:
+    members = MEMBERS[group]
+    MEMBERS[group] = members + (token,)
+    GROUP_OF[token] = group
+    current = cache.get_status(members[0])
+    cache.set_status(token, current["status"], current["error"], backend_name(BACKEND_CHOICE.get(group)))
+    update_status(token, current["status"])
+    LOGGER.info("%s: sharing the capture of %s (%d tokens)", token, group, len(members) + 1)
+
+
+def _members(group: str) -> Tuple[str, ...]:
+    return MEMBERS.get(group, (group,))
+
+
+def _set_status(group: str, status: str, error: Optional[str] = None, persist: bool = True) -> None:
+    """Set the status of every token served by ``group``'s capture."""
+
+    backend = backend_name(BACKEND_CHOICE.get(group))
+    for member in _members(group):
+        cache.set_status(member, status, error, backend)
+        if persist:
+            update_status(member, status)
 
+
+def find_shared_capture(
+    rtsp_url: str,
+    capture: CaptureOptions = CaptureOptions(),
+    profile: CameraProfile = CameraProfile(),
+    substream_url: Optional[str] = None,
+) -> Optional[str]:
+    """Return the running capture a new token for this stream would join, if any."""
+
+    wanted = _capture_key(rtsp_url, substream_url, None, capture, profile)
+    with _LIFECYCLE_LOCK:
+        for key, group in SHARED_CAPTURES.items():
+            if key[:2] + key[3:] == wanted[:2] + wanted[3:] and group in STOP_EVENTS:
+                return group
+    return None
+
+
+def capture_group(token: str) -> str:
+    """Return the key of the capture serving ``token``."""
+
+    return GROUP_OF.get(token, token)
+
+
+def capture_stats() -> Dict[str, int]:
+    captures = len(MEMBERS)
+    tokens = sum(len(members) for members in MEMBERS.values())
+    return {"captures": captures, "tokens": tokens, "shared_sessions_saved": tokens - captures}
+
+
+def _spawn(token: str, rtsp_url: str) -> None:
+    stop_event = threading.Event()
+    heartbeat = WATCHDOG.attach(token)
     thread = threading.Thread(
         target=_camera_worker,
-        args=(token, rtsp_url, stop_event),
+        args=(token, rtsp_url, stop_event, heartbeat),
         name=f"camera-{token}",
         daemon=True,
     )
+    STOP_EVENTS[token] = stop_event
     WORKERS[token] = thread
     thread.start()
 
 
+def _replace_stalled_worker(token: str, blocked_for: float) -> None:
+    """Abandon a worker stuck inside OpenCV and start a fresh reader.
+
+    Called from the watchdog thread after it detached the stalled heartbeat.
+    Nothing is spawned when the capture was stopped meanwhile, or when its
+    reader was already replaced (the new reader's heartbeat is attached).
+    """
+
+    if token.endswith(MAIN_READER_SUFFIX):
+        _abandon_main_reader(token[: -len(MAIN_READER_SUFFIX)], blocked_for)
+        return
+    with _LIFECYCLE_LOCK:
+        stop_event = STOP_EVENTS.get(token)
+        thread = WORKERS.get(token)
+        if stop_event is None or stop_event.is_set() or token not in STREAM_URLS:
+            return
+        if WATCHDOG.attached(token) is not None:
+            return
+        stop_event.set()
+        WATCHDOG.abandon(token, thread)
+        message = f"capture blocked for {blocked_for:.0f}s"
+        LOGGER.warning("%s: %s, abandoning reader and reconnecting", token, message)
+        _set_status(token, "stalled", message)
+        _spawn(token, _capture_url(token))
+
+
+def _abandon_main_reader(group: str, blocked_for: float) -> None:
+    """Give up on a stalled main-stream reader so the substream is stored again."""
+
+    key = group + MAIN_READER_SUFFIX
+    with _LIFECYCLE_LOCK:
+        reader = MAIN_READERS.get(group)
+        if reader is None or reader[1].is_set() or WATCHDOG.attached(key) is not None:
+            return
+        thread, stop_event = reader
+        stop_event.set()
+        del MAIN_READERS[group]
+        WATCHDOG.abandon(key, thread)
+        MAIN_LIVE.discard(group)
+        tuning = TUNING.get(group) or CameraProfile().resolve(get_settings())
+        MAIN_RETRY_AT[group] = time.monotonic() + tuning.reconnect_delay_sec
+    LOGGER.warning("%s: main stream blocked for %.0fs, serving the substream", group, blocked_for)
+
+
+def _leave_group(token: str) -> Optional[str]:
+    """Drop ``token`` from its capture; return the group if it was the last member."""
+
+    with _LIFECYCLE_LOCK:
+        group = GROUP_OF.pop(token, token)
+        remaining = tuple(member for member in _members(group) if member != token)
+        if remaining:
+            MEMBERS[group] = remaining
+            return None
+        # The last member stays listed until the worker is gone so the
+        # worker's final status lands on it.
+        MEMBERS[group] = (token,)
+        for key in [key for key, owner in SHARED_CAPTURES.items() if owner == group]:
+            del SHARED_CAPTURES[key]
+        return group
+
+
 def stop_worker(token: str, join_timeout: float = 2.0) -> None:
-    stop_event = STOP_EVENTS.get(token)
-    thread = WORKERS.get(token)
+    backend = backend_name(backend_flag_for(token))
+    group = _leave_group(token)
+    if group is not None:
+        _stop_capture(group, join_timeout)
+    cache.set_status(token, "inactive", backend=backend)
+    update_status(token, "inactive")
+
 
+def _signal_capture(group: str) -> List[threading.Thread]:
+    """Set the stop events of ``group``'s reader threads and return the threads."""
+
+    threads = []
+    reader = MAIN_READERS.pop(group, None)
+    if reader is not None:
+        reader[1].set()
+        threads.append(reader[0])
+    MAIN_LIVE.discard(group)
+    stop_event = STOP_EVENTS.get(group)
+    thread = WORKERS.get(group)
     if stop_event:
         stop_event.set()
-    if thread and thread.is_alive():
-        thread.join(timeout=join_timeout)
-
-    WORKERS.pop(token, None)
-    STOP_EVENTS.pop(token, None)
-    BACKEND_CHOICE.pop(token, None)
-    BACKEND_AUTODETECT.pop(token, None)
-    cache.set_status(token, "inactive")
-    update_status(token, "inactive")
+    if thread is not None:
+        threads.append(thread)
+    return threads
+
+
+def _join_until(group: str, threads: List[threading.Thread], deadline: float) -> bool:
+    """Join signalled ``threads`` until ``deadline``; abandon those still running.
+
+    Returns whether every thread stopped.
+    """
+
+    stopped = True
+    for thread in threads:
+        if thread.is_alive():
+            thread.join(timeout=max(deadline - time.monotonic(), 0.0))
+        if thread.is_alive():
+            WATCHDOG.abandon(group, thread)
+            stopped = False
+    return stopped
+
+
+def _stop_capture(group: str, join_timeout: float) -> None:
+    # Signalled under the lock so a watchdog replacement cannot slip in between.
+    with _LIFECYCLE_LOCK:
+        threads = _signal_capture(group)
+    if not _join_until(group, threads, time.monotonic() + join_timeout):
+        LOGGER.warning("%s: worker did not stop within %.1fs, leaking it", group, join_timeout)
+    _forget_capture(group)
+
+
+def _forget_capture(group: str) -> None:
+    WATCHDOG.detach(group)
+    WATCHDOG.detach(group + MAIN_READER_SUFFIX)
+    WORKERS.pop(group, None)
+    STOP_EVENTS.pop(group, None)
+    BACKEND_CHOICE.pop(group, None)
+    BACKEND_AUTODETECT.pop(group, None)
+    CAPTURE_OPTIONS.pop(group, None)
+    STREAM_URLS.pop(group, None)
+    SUBSTREAM_URLS.pop(group, None)
+    MAIN_DEMAND.pop(group, None)
+    MAIN_RETRY_AT.pop(group, None)
+    PROFILES.pop(group, None)
+    TUNING.pop(group, None)
+    MEMBERS.pop(group, None)
+    SCHEDULER.remove(group)
+    SHEDDER.forget(group)
+
+
+def stop_all_workers(timeout: Optional[float] = None) -> List[str]:
+    """Stop every capture at once within one overall deadline.
+
+    All stop events are set before any thread is joined, so the wait is
+    bounded by ``timeout`` (default ``shutdown_timeout_sec``) rather than
+    growing with the number of cameras, and the final statuses are written
+    in one transaction.  Returns the captures whose worker had not stopped
+    by the deadline; those threads are abandoned like stalled readers.
+    """
+
+    if timeout is None:
+        timeout = get_settings().shutdown_timeout_sec
+    with _LIFECYCLE_LOCK:
+        if _RESTART is not None:
+            _RESTART[1].set()
+        tokens = list(GROUP_OF)
+        groups = sorted(set(GROUP_OF.values()) | set(STOP_EVENTS))
+        backends = {token: backend_name(backend_flag_for(token)) for token in tokens}
+        GROUP_OF.clear()
+        SHARED_CAPTURES.clear()
+        threads = {group: _signal_capture(group) for group in groups}
+
+    deadline = time.monotonic() + timeout
+    stuck = [group for group in groups if not _join_until(group, threads[group], deadline)]
+    for group in groups:
+        _forget_capture(group)
+    for token in tokens:
+        cache.set_status(token, "inactive", backend=backends[token])
+    update_statuses(tokens, "inactive")
+
+    if stuck:
+        LOGGER.warning(
+            "%d of %d workers did not stop within %.1fs: %s", len(stuck), len(groups), timeout, ", ".join(stuck)
+        )
+    else:
+        LOGGER.info("stopped %d workers", len(groups))
+    return stuck
+
+
+def restart_workers(
+    tokens: Optional[Iterable[str]] = None,
+    batch_size: Optional[int] = None,
+    interval_sec: Optional[float] = None,
+    on_batch: Optional[Callable[[Dict[str, List[str]], int], None]] = None,
+    cancel: Optional[threading.Event] = None,
+) -> Dict[str, List[str]]:
+    """Reconnect the captures of ``tokens`` (default: all) in rolling batches.
+
+    Each batch is stopped in parallel within ``shutdown_timeout_sec`` and
+    respawned with its current configuration; ``interval_sec`` separates
+    batches so cameras do not all reconnect at once.  Returns the restarted
+    captures, the ones whose old worker had to be abandoned, and the
+    requested tokens without a running capture.  ``on_batch`` is called with
+    the report and the number of captures still pending before the first
+    batch and after each one; setting ``cancel`` skips the remaining batches.
+    """
+
+    settings = get_settings()
+    batch_size = batch_size or settings.restart_batch_size
+    interval_sec = settings.restart_interval_sec if interval_sec is None else interval_sec
+    with _LIFECYCLE_LOCK:
+        requested = list(GROUP_OF) if tokens is None else list(dict.fromkeys(tokens))
+        groups = list(dict.fromkeys(GROUP_OF[token] for token in requested if token in GROUP_OF))
+        not_running = [token for token in requested if token not in GROUP_OF]
+
+    cancel = cancel or threading.Event()
+    report: Dict[str, List[str]] = {"restarted": [], "stuck": [], "not_running": not_running}
+    if on_batch is not None:
+        on_batch(report, len(groups))
+    for start in range(0, len(groups), batch_size):
+        if start and interval_sec > 0:
+            cancel.wait(interval_sec)
+        if cancel.is_set():
+            LOGGER.info("rolling restart cancelled with %d captures pending", len(groups) - start)
+            break
+        batch = groups[start : start + batch_size]
+        with _LIFECYCLE_LOCK:
+            signalled = {
+                group: (STOP_EVENTS[group], _signal_capture(group)) for group in batch if group in STOP_EVENTS
+            }
+        deadline = time.monotonic() + settings.shutdown_timeout_sec
+        stopped = {group: _join_until(group, threads, deadline) for group, (_, threads) in signalled.items()}
+        with _LIFECYCLE_LOCK:
+            for group, (stop_event, _) in signalled.items():
+                if STOP_EVENTS.get(group) is not stop_event:
+                    continue  # unregistered or replaced meanwhile
+                if not stopped[group]:
+                    report["stuck"].append(group)
+                WATCHDOG.detach(group)
+                _set_status(group, "connecting")
+                _spawn(group, _capture_url(group))
+                report["restarted"].append(group)
+        if on_batch is not None:
+            on_batch(report, max(len(groups) - start - batch_size, 0))
+    LOGGER.info(
+        "restarted %d captures (%d abandoned) in batches of %d",
+        len(report["restarted"]),
+        len(report["stuck"]),
+        batch_size,
+    )
+    return report
+
 
+def _record_restart(report: Dict[str, List[str]], pending: int) -> None:
+    with _LIFECYCLE_LOCK:
+        RESTART_STATUS.update({key: list(value) for key, value in report.items()}, pending=pending)
 
-def stop_all_workers() -> None:
-    for token in list(STOP_EVENTS.keys()):
-        stop_worker(token)
+
+def _run_restart(
+    tokens: Optional[List[str]],
+    batch_size: Optional[int],
+    interval_sec: Optional[float],
+    cancel: threading.Event,
+) -> None:
+    state = "done"
+    try:
+        restart_workers(tokens, batch_size, interval_sec, on_batch=_record_restart, cancel=cancel)
+    except Exception:  # pragma: no cover - defensive, keeps the status accurate
+        LOGGER.exception("rolling restart failed")
+        state = "failed"
+    with _LIFECYCLE_LOCK:
+        if cancel.is_set() and state == "done":
+            state = "cancelled"
+        RESTART_STATUS.update(state=state, finished_at=time.time())
+
+
+def start_restart(
+    tokens: Optional[Iterable[str]] = None,
+    batch_size: Optional[int] = None,
+    interval_sec: Optional[float] = None,
+) -> Optional[Dict[str, Any]]:
+    """Run ``restart_workers`` on a background thread.
+
+    Returns the initial progress, or ``None`` while a previous rolling restart
+    is still running.  Progress is read with ``restart_status``.
+    """
+
+    global _RESTART
+    with _LIFECYCLE_LOCK:
+        if _RESTART is not None and _RESTART[0].is_alive():
+            return None
+        cancel = threading.Event()
+        RESTART_STATUS.clear()
+        RESTART_STATUS.update(
+            state="running",
+            started_at=time.time(),
+            finished_at=None,
+            pending=None,
+            restarted=[],
+            stuck=[],
+            not_running=[],
+        )
+        thread = threading.Thread(
+            target=_run_restart,
+            args=(None if tokens is None else list(tokens), batch_size, interval_sec, cancel),
+            name="rolling-restart",
+            daemon=True,
+        )
+        _RESTART = (thread, cancel)
+        thread.start()
+        return restart_status()
+
+
+def restart_status() -> Dict[str, Any]:
+    """Snapshot of the current or last rolling restart."""
+
+    with _LIFECYCLE_LOCK:
+        return {key: list(value) if isinstance(value, list) else value for key, value in RESTART_STATUS.items()}
+
+
+def _set_tuning(token: str, tuning: Tuning) -> None:
+    TUNING[token] = tuning
+    SCHEDULER.update(token, tuning.priority_class, requested_fps(tuning.read_throttle_sec))
+
+
+def update_profile(
+    token: str,
+    *,
+    profile: Optional[CameraProfile] = None,
+    capture: Optional[CaptureOptions] = None,
+) -> None:
+    """Apply new per-camera settings to a running worker without restarting it.
+
+    Tuning changes take effect on the worker's next iteration; changed capture
+    options make it reconnect with the new pipeline.  A token sharing its
+    capture with others moves to a capture of its own instead.
+    """
+
+    with _LIFECYCLE_LOCK:
+        group = capture_group(token)
+        if group not in STOP_EVENTS:
+            return
+        if len(_members(group)) > 1:
+            profile = profile or PROFILES.get(group, CameraProfile())
+            capture = capture or CAPTURE_OPTIONS.get(group, CaptureOptions())
+            if profile == PROFILES.get(group) and capture == CAPTURE_OPTIONS.get(group):
+                return
+            rtsp_url, backend_flag = STREAM_URLS[group], BACKEND_CHOICE.get(group)
+            substream_url = SUBSTREAM_URLS.get(group)
+            # The other members keep the running capture, even when ``token``
+            # started it; ``token`` gets a capture (and group id) of its own.
+            _leave_group(token)
+            LOGGER.info("%s: profile diverged from %s, starting its own capture", token, group)
+            start_worker(
+                token, rtsp_url, backend_flag, capture=capture, profile=profile, substream_url=substream_url
+            )
+            return
+        if profile is not None:
+            PROFILES[group] = profile
+            _set_tuning(group, profile.resolve(get_settings()))
+        if capture is not None:
+            CAPTURE_OPTIONS[group] = capture
+        if group in STREAM_URLS:
+            for key in [key for key, owner in SHARED_CAPTURES.items() if owner == group]:
+                del SHARED_CAPTURES[key]
+            key = _capture_key(
+                STREAM_URLS[group],
+                SUBSTREAM_URLS.get(group),
+                BACKEND_CHOICE.get(group),
+                CAPTURE_OPTIONS[group],
+                PROFILES.get(group, CameraProfile()),
+            )
+            SHARED_CAPTURES.setdefault(key, group)
 
 
 def backend_flag_for(token: str) -> Optional[int]:
-    return BACKEND_CHOICE.get(token)
+    return BACKEND_CHOICE.get(capture_group(token))
+
+
+def request_full_resolution(token: str) -> Optional[bool]:
+    """Record that someone wants full-resolution frames of ``token``.
+
+    Returns ``None`` when there is no main stream to wait for (single-stream
+    cameras, or a main stream that just failed to open) and otherwise whether
+    main-stream frames are already being stored.  Opens the main stream when
+    it is not running; it closes after ``main_stream_idle_sec`` without demand.
+    """
+
+    group = capture_group(token)
+    if group not in SUBSTREAM_URLS:
+        return None
+    now = time.monotonic()
+    MAIN_DEMAND[group] = now
+    if group in MAIN_LIVE:
+        return True
+    reader = MAIN_READERS.get(group)
+    if reader is not None and reader[0].is_alive():
+        return False
+    # Only opening the main stream takes the lifecycle lock.
+    with _LIFECYCLE_LOCK:
+        reader = MAIN_READERS.get(group)
+        if reader is not None and reader[0].is_alive():
+            return False
+        if group not in STOP_EVENTS or now < MAIN_RETRY_AT.get(group, 0.0):
+            return None
+        stop_event = threading.Event()
+        heartbeat = WATCHDOG.attach(group + MAIN_READER_SUFFIX)
+        thread = threading.Thread(
+            target=_main_stream_worker,
+            args=(group, STREAM_URLS[group], stop_event, heartbeat),
+            name=f"camera-{group}-main",
+            daemon=True,
+        )
+        MAIN_READERS[group] = (thread, stop_event)
+        thread.start()
+    return False
+
+
+def has_main_stream(token: str) -> bool:
+    """Whether ``token`` is a dual-stream camera whose main stream opens on demand."""
+
+    return capture_group(token) in SUBSTREAM_URLS
+
+
+def main_stream_live(token: str) -> bool:
+    return capture_group(token) in MAIN_LIVE
+
+
+def _main_stream_worker(
+    group: str,
+    rtsp_url: str,
+    stop_event: threading.Event,
+    heartbeat: Optional[Heartbeat] = None,
+) -> None:
+    """Store main-stream frames for ``group`` until requests for them stop.
+
+    Like the substream worker it marks ``heartbeat`` while blocked in OpenCV;
+    the watchdog abandons a stalled reader so the substream takes over again.
+    Frames go through the same load shedding and decode budget, reported
+    under the group, while the substream only keeps its session alive.
+    """
+
+    settings = get_settings()
+    heartbeat = heartbeat or Heartbeat()
+    default_tuning = CameraProfile().resolve(settings)
+    tuning = TUNING.get(group, default_tuning)
+    # The decode profile exists to save CPU on the continuous stream; frames
+    # fetched on demand are wanted at full resolution.
+    capture = replace(CAPTURE_OPTIONS.get(group, CaptureOptions()), decode_profile="full")
+    heartbeat.blocked_since = time.monotonic()
+    cap, note = open_stream(rtsp_url, BACKEND_CHOICE.get(group), capture)
+    heartbeat.blocked_since = None
+    if stop_event.is_set():
+        if cap is not None:
+            cap.release()
+        WATCHDOG.detach(group + MAIN_READER_SUFFIX, heartbeat)
+        return
+    if cap is None:
+        WATCHDOG.detach(group + MAIN_READER_SUFFIX, heartbeat)
+        MAIN_RETRY_AT[group] = time.monotonic() + tuning.reconnect_delay_sec
+        LOGGER.warning("%s: failed to open main stream (%s)", group, note)
+        return
+    LOGGER.info("%s: main stream opened for full-resolution requests", group)
+    failures = 0
+    try:
+        while not stop_event.is_set():
+            if time.monotonic() - MAIN_DEMAND.get(group, 0.0) > settings.main_stream_idle_sec:
+                break
+            tuning, eager = SHEDDER.apply(TUNING.get(group, default_tuning))
+            frame_started = time.monotonic()
+            cpu_started = time.thread_time()
+            heartbeat.blocked_since = frame_started
+            ok, frame = cap.read()
+            heartbeat.blocked_since = None
+            if stop_event.is_set():
+                break
+            if not _is_frame_valid(ok, frame):
+                failures += 1
+                if failures >= MAX_CONSECUTIVE_FRAME_FAILURES:
+                    LOGGER.warning("%s: main stream stopped delivering frames", group)
+                    break
+                continue
+            failures = 0
+            encode_started = time.monotonic()
+            members = _members(group)
+            cache.store_frame(
+                members[0],
+                frame,
+                tuning.jpeg_quality,
+                pixel_format=_pixel_format(frame),
+                eager=eager,
+                aliases=members[1:],
+            )
+            MAIN_LIVE.add(group)
+            stored = time.monotonic()
+            SHEDDER.observe(
+                group,
+                read_sec=encode_started - frame_started,
+                encode_sec=stored - encode_started,
+                cpu_sec=time.thread_time() - cpu_started,
+            )
+            budget_wait = SCHEDULER.min_interval(group) - (stored - frame_started)
+            if stop_event.wait(max(tuning.read_throttle_sec, budget_wait)):
+                break
+    finally:
+        WATCHDOG.detach(group + MAIN_READER_SUFFIX, heartbeat)
+        if not WATCHDOG.is_abandoned(threading.current_thread()):
+            # An abandoned reader must not clear the flag of its replacement.
+            MAIN_LIVE.discard(group)
+        cap.release()
+        LOGGER.info("%s: main stream closed", group)
 
 
 def _is_frame_valid(ok: bool, frame: Optional[object]) -> bool:
@@ -99,8 +710,81 @@ def _is_frame_valid(ok: bool, frame: Optional[object]) -> bool:
     return True
 
 
-def _camera_worker(token: str, rtsp_url: str, stop_event: threading.Event) -> None:
+def _read_frame(
+    cap: cv2.VideoCapture, buffer: Optional[np.ndarray]
+) -> Tuple[bool, Optional[np.ndarray]]:
+    """Read the next frame, decoding into ``buffer`` when one is available."""
+
+    if buffer is None:
+        return cap.read()
+    return cap.read(buffer)
+
+
+def _pixel_format(frame: np.ndarray) -> str:
+    """Single-channel frames only come from the I420 capture pipeline."""
+
+    return I420 if frame.ndim == 2 else BGR
+
+
+class _DecodeProfile:
+    """Worker-side half of a decode profile.
+
+    GStreamer applies profiles in its pipeline, but OpenCV's FFmpeg backend
+    does not forward decoder options such as ``skip_frame``.  There the
+    ``keyframe`` profile still demuxes and decodes every frame with ``grab()``
+    but only retrieves, converts and encodes one every
+    ``decode_keyframe_interval_sec``, and ``lowres`` downscales before
+    encoding.  Both are no-ops when the pipeline already did the work.
+    """
+
+    def __init__(self, name: str, settings, clock: Callable[[], float] = time.monotonic) -> None:
+        self.name = name
+        self._clock = clock
+        self._interval = settings.decode_keyframe_interval_sec if name == "keyframe" else 0.0
+        self._width = settings.decode_lowres_width if name == "lowres" else 0
+        self._next_due = 0.0
+
+    def skip_next(self) -> bool:
+        """Return True when the next frame should only be grabbed, not retrieved."""
+
+        return self._interval > 0 and self._clock() < self._next_due
+
+    def accept(self, frame: np.ndarray, pixel_format: str) -> Tuple[np.ndarray, str]:
+        """Record a stored frame and return it downscaled when the profile asks for it."""
+
+        if self._interval > 0:
+            self._next_due = self._clock() + self._interval
+        width, height = frame_size(frame, pixel_format)
+        if self._width <= 0 or width <= self._width:
+            return frame, pixel_format
+        target = (self._width, max(1, round(height * self._width / width)))
+        return cv2.resize(to_bgr(frame, pixel_format), target, interpolation=cv2.INTER_AREA), BGR
+
+
+def _replaced(token: str, stop_event: threading.Event) -> bool:
+    """True once this thread was replaced by the watchdog or left behind by ``stop_worker``."""
+
+    if STOP_EVENTS.get(token, stop_event) is not stop_event:
+        return True
+    return stop_event.is_set() and WATCHDOG.is_abandoned(threading.current_thread())
+
+
+def _camera_worker(
+    token: str,
+    rtsp_url: str,
+    stop_event: threading.Event,
+    heartbeat: Optional[Heartbeat] = None,
+) -> None:
+    """Read frames until ``stop_event`` is set.
+
+    ``heartbeat`` is marked while the thread is blocked in OpenCV so the
+    watchdog can replace it; a replaced (stopped) worker exits as soon as the
+    blocking call returns without touching the shared state again.
+    """
+
+    heartbeat = heartbeat or Heartbeat()
     settings = get_settings()
+    default_tuning = CameraProfile().resolve(settings)
     backend_flag = BACKEND_CHOICE.get(token)
     ensure_decoder_monitor_started()
     register_decoder_stream(token, rtsp_url)
@@ -109,15 +793,22 @@ def _camera_worker(token: str, rtsp_url: str, stop_event: threading.Event) -> No
         try:
             backend_flag = BACKEND_CHOICE.get(token)
             autodetect = BACKEND_AUTODETECT.get(token, False)
-
-            cap, note = open_stream(rtsp_url, backend_flag)
+            capture = CAPTURE_OPTIONS.get(token, CaptureOptions())
+            tuning = TUNING.get(token, default_tuning)
+
+            heartbeat.blocked_since = time.monotonic()
+            cap, note = open_stream(rtsp_url, backend_flag, capture)
+            heartbeat.blocked_since = None
+            if _replaced(token, stop_event):
+                if cap is not None:
+                    cap.release()
+                break
             if cap is None:
-                cache.set_status(token, "error", note)
-                update_status(token, "error")
+                _set_status(token, "error", note)
                 LOGGER.error("%s: failed to open stream (%s)", token, note)
                 if autodetect:
                     try:
-                        new_flag, backend_label = choose_backend(rtsp_url)
+                        new_flag, backend_label = choose_backend(rtsp_url, options=capture)
                     except ValueError as detect_exc:
                         LOGGER.debug(
                             "%s: backend autodetect still failing: %s",
@@ -133,22 +824,45 @@ def _camera_worker(token: str, rtsp_url: str, stop_event: threading.Event) -> No
                             backend_label,
                         )
                         continue
-                if stop_event.wait(settings.reconnect_delay_sec):
+                if stop_event.wait(tuning.reconnect_delay_sec):
                     break
                 continue
 
-            cache.set_status(token, "active")
-            update_status(token, "active")
+            _set_status(token, "active")
             LOGGER.info("%s: connected via %s", token, backend_name(backend_flag))
 
             consecutive_failures = 0
+            frame_pool = FrameBufferPool(FRAME_BUFFER_POOL_SIZE)
+            profile = _DecodeProfile(capture.decode_profile, settings)
+            reopen = False
             while not stop_event.is_set():
-                ok, frame = cap.read()
+                # Dict lookups only: profile updates are picked up without
+                # touching the settings object or the database.
+                tuning, eager = SHEDDER.apply(TUNING.get(token, default_tuning))
+                if CAPTURE_OPTIONS.get(token, capture) is not capture:
+                    LOGGER.info("%s: capture options changed, reconnecting", token)
+                    reopen = True
+                    break
+                frame_started = time.monotonic()
+                cpu_started = time.thread_time()
+                heartbeat.blocked_since = frame_started
+                if profile.skip_next():
+                    grabbed = cap.grab()
+                    heartbeat.blocked_since = None
+                    if grabbed and not _replaced(token, stop_event):
+                        consecutive_failures = 0
+                        continue
+                    ok, frame = False, None
+                else:
+                    buffer = frame_pool.acquire()
+                    ok, frame = _read_frame(cap, buffer)
+                    heartbeat.blocked_since = None
+                if _replaced(token, stop_event):
+                    break
                 if not _is_frame_valid(ok, frame):
                     consecutive_failures += 1
                     if consecutive_failures >= MAX_CONSECUTIVE_FRAME_FAILURES:
-                        cache.set_status(token, "connecting")
-                        update_status(token, "connecting")
+                        _set_status(token, "connecting")
                         LOGGER.warning(
                             "%s: too many invalid frames, reconnecting", token
                         )
@@ -159,38 +873,74 @@ def _camera_worker(token: str, rtsp_url: str, stop_event: threading.Event) -> No
                         consecutive_failures,
                         MAX_CONSECUTIVE_FRAME_FAILURES,
                     )
-                    if stop_event.wait(settings.read_throttle_sec):
+                    if stop_event.wait(tuning.read_throttle_sec):
                         break
                     continue
 
                 if decoder_warning_recent_for_token(
-                    token, settings.decoder_warning_window_sec
+                    token, tuning.decoder_warning_window_sec
                 ):
                     LOGGER.debug(
                         "%s: decoder reported corruption, skipping frame", token
                     )
-                    if stop_event.wait(settings.read_throttle_sec):
+                    if stop_event.wait(tuning.read_throttle_sec):
                         break
                     continue
 
                 consecutive_failures = 0
-                cache.store_frame(token, frame, settings.jpeg_quality)
-                if stop_event.wait(settings.read_throttle_sec):
+                frame_pool.adopt(frame, buffer)
+                if token in MAIN_LIVE:
+                    # Full-resolution frames come from the main stream meanwhile;
+                    # it reports the load, and both readers stay within the budget.
+                    budget_wait = SCHEDULER.min_interval(token) - (time.monotonic() - frame_started)
+                    if stop_event.wait(max(tuning.read_throttle_sec, budget_wait)):
+                        break
+                    continue
+                encode_started = time.monotonic()
+                frame, pixel_format = profile.accept(frame, _pixel_format(frame))
+                members = _members(token)
+                cache.store_frame(
+                    members[0],
+                    frame,
+                    tuning.jpeg_quality,
+                    pixel_format=pixel_format,
+                    eager=eager,
+                    aliases=members[1:],
+                    substream=token in SUBSTREAM_URLS,
+                )
+                stored = time.monotonic()
+                SHEDDER.observe(
+                    token,
+                    read_sec=encode_started - frame_started,
+                    encode_sec=stored - encode_started,
+                    cpu_sec=time.thread_time() - cpu_started,
+                )
+                # The decode budget may stretch the interval beyond the throttle.
+                budget_wait = SCHEDULER.min_interval(token) - (stored - frame_started)
+                if stop_event.wait(max(tuning.read_throttle_sec, budget_wait)):
                     break
 
             cap.release()
             if stop_event.is_set():
                 break
-            if stop_event.wait(settings.reconnect_delay_sec):
+            if reopen:
+                continue
+            if stop_event.wait(tuning.reconnect_delay_sec):
                 break
         except Exception as exc:  # pragma: no cover - defensive guard
-            cache.set_status(token, "error", str(exc))
-            update_status(token, "error")
+            heartbeat.blocked_since = None
+            if _replaced(token, stop_event):
+                break
+            _set_status(token, "error", str(exc))
             LOGGER.exception("%s: worker crashed", token, exc_info=exc)
-            if stop_event.wait(settings.reconnect_delay_sec):
+            if stop_event.wait(TUNING.get(token, default_tuning).reconnect_delay_sec):
                 break
 
-    cache.set_status(token, "inactive")
-    update_status(token, "inactive")
+    if _replaced(token, stop_event):
+        # The new reader owns the camera's status and decoder registration.
+        LOGGER.info("%s: abandoned worker exited", token)
+        return
+    # Whoever stopped the worker persists the final status (in bulk on shutdown).
+    _set_status(token, "inactive", persist=False)
     LOGGER.info("%s: worker stopped", token)
     unregister_decoder_stream(token)
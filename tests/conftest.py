@@ -0,0 +1,22 @@
+"""Shared fixtures for the test suite."""
+
+from __future__ import annotations
+
+import pytest
+
+from rtsp2jpg import worker
+
+
+@pytest.fixture
+def quiet_worker(monkeypatch):
+    """Stub the database, decoder-warning and cache hooks a capture worker calls.
+
+    Tests that inspect stored frames or decoder warnings patch those hooks again.
+    """
+
+    monkeypatch.setattr(worker, "update_status", lambda *args, **kwargs: None)
+    monkeypatch.setattr(worker, "ensure_decoder_monitor_started", lambda: None)
+    monkeypatch.setattr(worker, "register_decoder_stream", lambda *args, **kwargs: None)
+    monkeypatch.setattr(worker, "unregister_decoder_stream", lambda *args, **kwargs: None)
+    monkeypatch.setattr(worker, "decoder_warning_recent_for_token", lambda *args, **kwargs: False)
+    monkeypatch.setattr(worker.cache, "store_frame", lambda *args, **kwargs: None)
@@ -1,12 +1,23 @@
+import email
+import email.policy
+import asyncio
 import importlib
+import io
+import json
+import threading
+import time
+import tracemalloc
 from typing import List, Optional
 
+import cv2
+import numpy as np
 import pytest
 from fastapi.testclient import TestClient
 
-from rtsp2jpg import backends, cache, config, worker
+from rtsp2jpg import backends, cache, config, executor, scheduler, variants, worker
 from rtsp2jpg import db as db_module
-from rtsp2jpg.api import cameras, status as status_api
+from rtsp2jpg.api import cameras, snapshot as snapshot_api, status as status_api, stream as stream_api, views as views_api
+from rtsp2jpg.pipelines import CaptureOptions
 
 
 @pytest.fixture
@@ -27,7 +38,7 @@ def client(tmp_path, monkeypatch) -> TestClient:
 
 
 def test_register_and_status_flow(client: TestClient, monkeypatch):
-    monkeypatch.setattr(cameras, "choose_backend", lambda url, prefer=None: (None, "default"))
+    monkeypatch.setattr(cameras, "choose_backend", lambda url, prefer=None, **_kwargs: (None, "default"))
     response = client.post("/register", json={"rtsp_url": "rtsp://example"})
     assert response.status_code == 200
     token = response.json()["token"]
@@ -66,7 +77,7 @@ def test_register_invalid_preference(client: TestClient):
 
 
 def test_register_db_failure_returns_500(client: TestClient, monkeypatch):
-    monkeypatch.setattr(cameras, "choose_backend", lambda url, prefer=None: (None, "default"))
+    monkeypatch.setattr(cameras, "choose_backend", lambda url, prefer=None, **_kwargs: (None, "default"))
 
     def explode(*_args, **_kwargs):
         raise RuntimeError("db down")
@@ -78,13 +89,13 @@ def test_register_db_failure_returns_500(client: TestClient, monkeypatch):
 
 
 def test_snapshot_success(client: TestClient, monkeypatch):
-    monkeypatch.setattr(cameras, "choose_backend", lambda url, prefer=None: (None, "default"))
+    monkeypatch.setattr(cameras, "choose_backend", lambda url, prefer=None, **_kwargs: (None, "default"))
     response = client.post("/register", json={"rtsp_url": "rtsp://example"})
     token = response.json()["token"]
 
     qualities: List[Optional[int]] = []
 
-    def fake_get_jpeg(_token: str, quality: Optional[int] = None) -> Optional[bytes]:
+    def fake_get_jpeg(_token: str, quality: Optional[int] = None, **_size) -> Optional[bytes]:
         qualities.append(quality)
         return b"jpeg" if _token == token else None
 
@@ -94,17 +105,18 @@ def test_snapshot_success(client: TestClient, monkeypatch):
     assert snapshot.status_code == 200
     assert snapshot.content == b"jpeg"
     assert snapshot.headers["content-type"] == "image/jpeg"
-    assert qualities == [100]
+    # Without q the request resolves to the cached JPEG's quality (the default before the first frame).
+    assert qualities == [config.get_settings().jpeg_quality]
 
 
 def test_snapshot_allows_quality_override(client: TestClient, monkeypatch):
-    monkeypatch.setattr(cameras, "choose_backend", lambda url, prefer=None: (None, "default"))
+    monkeypatch.setattr(cameras, "choose_backend", lambda url, prefer=None, **_kwargs: (None, "default"))
     response = client.post("/register", json={"rtsp_url": "rtsp://example"})
     token = response.json()["token"]
 
     qualities: List[Optional[int]] = []
 
-    def fake_get_jpeg(_token: str, quality: Optional[int] = None) -> Optional[bytes]:
+    def fake_get_jpeg(_token: str, quality: Optional[int] = None, **_size) -> Optional[bytes]:
         qualities.append(quality)
         return b"jpeg" if _token == token else None
 
@@ -118,13 +130,13 @@ def test_snapshot_allows_quality_override(client: TestClient, monkeypatch):
 
 
 def test_snapshot_allows_requesting_full_quality(client: TestClient, monkeypatch):
-    monkeypatch.setattr(cameras, "choose_backend", lambda url, prefer=None: (None, "default"))
+    monkeypatch.setattr(cameras, "choose_backend", lambda url, prefer=None, **_kwargs: (None, "default"))
     response = client.post("/register", json={"rtsp_url": "rtsp://example"})
     token = response.json()["token"]
 
     qualities: List[Optional[int]] = []
 
-    def fake_get_jpeg(_token: str, quality: Optional[int] = None) -> Optional[bytes]:
+    def fake_get_jpeg(_token: str, quality: Optional[int] = None, **_size) -> Optional[bytes]:
         qualities.append(quality)
         return b"jpeg" if _token == token else None
 
@@ -137,8 +149,274 @@ def test_snapshot_allows_requesting_full_quality(client: TestClient, monkeypatch
     assert qualities == [100]
 
 
+def test_snapshot_accepts_size_and_preset(client: TestClient, monkeypatch):
+    calls: List[dict] = []
+
+    def fake_get_jpeg(_token: str, quality: Optional[int] = None, **size) -> Optional[bytes]:
+        calls.append({"quality": quality, **size})
+        return b"jpeg"
+
+    monkeypatch.setattr(cache, "get_jpeg", fake_get_jpeg)
+
+    sized = client.get("/snapshot/tok?width=320&fit=cover&height=180&q=60")
+    assert sized.status_code == 200
+    preset = client.get("/snapshot/tok?preset=thumb")
+    assert preset.status_code == 200
+    unknown = client.get("/snapshot/tok?preset=nope")
+    assert unknown.status_code == 400
+
+    assert calls == [
+        {"quality": 60, "width": 320, "height": 180, "fit": "cover"},
+        {"quality": 70, "width": 320, "height": None, "fit": "contain"},
+    ]
+
+
+def test_batch_snapshots_returns_multipart(client: TestClient):
+    frame = np.zeros((8, 8, 3), dtype=np.uint8)
+    cache.store_frame("cam-a", frame, 80)
+    cache.set_status("cam-a", "active")
+
+    response = client.post("/snapshots", json={"tokens": ["cam-a", "cam-missing"], "q": 80})
+    assert response.status_code == 200
+    content_type = response.headers["content-type"]
+    assert content_type.startswith("multipart/mixed; boundary=")
+
+    message = email.message_from_bytes(
+        b"Content-Type: " + content_type.encode() + b"\r\n\r\n" + response.content,
+        policy=email.policy.HTTP,
+    )
+    parts = list(message.iter_parts())
+    assert [part["X-Token"] for part in parts] == ["cam-a", "cam-missing"]
+    assert parts[0].get_content_type() == "image/jpeg"
+    assert parts[0].get_payload(decode=True) == cache.JPEG_CACHE["cam-a"]
+    assert parts[0]["X-Camera-Status"] == "active"
+    assert parts[0]["X-Frame-Seq"] == "1"
+    assert "X-Frame-Timestamp" in parts[0]
+    assert parts[1].get_content_type() == "text/plain"
+
+
+def test_batch_snapshots_serve_cached_jpeg_without_quality(client: TestClient, monkeypatch):
+    cache.store_frame("cam-a", np.zeros((8, 8, 3), dtype=np.uint8), 80)
+    encodes = []
+    monkeypatch.setattr(cache, "_encode", lambda frame, quality: encodes.append(quality))
+
+    response = client.post("/snapshots", json={"tokens": ["cam-a"]})
+    assert response.status_code == 200
+    assert cache.JPEG_CACHE["cam-a"] in response.content
+    assert encodes == []
+
+
+def test_batch_snapshots_validates_payload(client: TestClient):
+    assert client.post("/snapshots", json={"tokens": []}).status_code == 422
+    assert client.post("/snapshots", json={"tokens": ["a"], "preset": "nope"}).status_code == 400
+
+
+def test_mjpeg_stream_fans_out_latest_frames():
+    frame = np.zeros((8, 8, 3), dtype=np.uint8)
+    cache.store_frame("cam-stream", frame, 80)
+
+    async def scenario():
+        subscription = cache.FRAME_BROADCASTER.subscribe("cam-stream")
+        parts = stream_api._mjpeg_parts(
+            subscription, cache.latest_snapshot("cam-stream"), None, min_interval=0.0
+        )
+        first = await parts.__anext__()
+        for _ in range(3):
+            cache.store_frame("cam-stream", frame, 80)
+        second = await parts.__anext__()
+        await parts.aclose()
+        return first, second
+
+    first, second = asyncio.run(scenario())
+
+    assert first.startswith(b"--" + stream_api.MJPEG_BOUNDARY.encode())
+    assert b"X-Frame-Seq: 1\r\n" in first
+    # Intermediate frames are dropped rather than queued for the slow reader.
+    assert b"X-Frame-Seq: 4\r\n" in second
+    assert second.endswith(cache.JPEG_CACHE["cam-stream"] + b"\r\n")
+    assert cache.FRAME_BROADCASTER.subscriber_count("cam-stream") == 0
+    cache.clear("cam-stream")
+
+
+def test_snapshot_conditional_get(client: TestClient):
+    frame = np.zeros((8, 8, 3), dtype=np.uint8)
+    cache.store_frame("cam-etag", frame, 80)
+
+    first = client.get("/snapshot/cam-etag?q=80")
+    assert first.status_code == 200
+    etag = first.headers["etag"]
+    assert first.headers["x-frame-seq"] == "1"
+    assert "last-modified" in first.headers
+
+    cached = client.get("/snapshot/cam-etag?q=80", headers={"If-None-Match": etag})
+    assert cached.status_code == 304
+    assert cached.content == b""
+
+    other_variant = client.get("/snapshot/cam-etag?q=50", headers={"If-None-Match": etag})
+    assert other_variant.status_code == 200
+
+    cache.store_frame("cam-etag", frame, 80)
+    refreshed = client.get("/snapshot/cam-etag?q=80", headers={"If-None-Match": etag})
+    assert refreshed.status_code == 200
+    assert refreshed.headers["etag"] != etag
+
+
+def test_snapshot_long_poll_waits_for_next_frame(client: TestClient):
+    frame = np.zeros((8, 8, 3), dtype=np.uint8)
+    cache.store_frame("cam-poll", frame, 80)
+
+    publisher = threading.Timer(0.2, cache.store_frame, args=("cam-poll", frame, 80))
+    publisher.start()
+    response = client.get("/snapshot/cam-poll?q=80&after=1&timeout=5")
+    publisher.join()
+
+    assert response.status_code == 200
+    assert response.headers["x-frame-seq"] == "2"
+
+
+def test_snapshot_long_poll_times_out_with_304(client: TestClient):
+    frame = np.zeros((8, 8, 3), dtype=np.uint8)
+    cache.store_frame("cam-idle", frame, 80)
+
+    response = client.get("/snapshot/cam-idle?after=1&timeout=0.05")
+    assert response.status_code == 304
+
+    missing = client.get("/snapshot/cam-none?after=0&timeout=0.05")
+    assert missing.status_code == 503
+
+
+def test_snapshot_long_poll_answers_seq_from_earlier_run_at_once(client: TestClient):
+    frame = np.zeros((8, 8, 3), dtype=np.uint8)
+    cache.store_frame("cam-rerun", frame, 80)
+
+    # A seq ahead of the current frame was issued before a restart.
+    started = time.monotonic()
+    response = client.get("/snapshot/cam-rerun?after=500&timeout=5")
+    assert time.monotonic() - started < 1.0
+    assert response.status_code == 200
+    assert response.headers["x-frame-seq"] == "1"
+    cache.clear("cam-rerun")
+
+
+def test_snapshot_cache_hit_skips_encode_executor(client: TestClient, monkeypatch):
+    frame = np.zeros((8, 8, 3), dtype=np.uint8)
+    cache.store_frame("cam-hit", frame, 80)
+
+    def fail(*_args, **_kwargs):
+        raise AssertionError("cache hit must not reach the executor")
+
+    monkeypatch.setattr(executor, "get_encode_executor", fail)
+    monkeypatch.setattr(snapshot_api, "get_encode_executor", fail)
+
+    response = client.get("/snapshot/cam-hit?q=80")
+    assert response.status_code == 200
+    assert response.content == cache.JPEG_CACHE["cam-hit"]
+
+
+def test_quality_less_presets_hit_eager_renders(client: TestClient, monkeypatch):
+    monkeypatch.setenv("RTSP2JPG_SNAPSHOT_PRESETS", '{"tile": {"width": 4}}')
+    monkeypatch.setenv("RTSP2JPG_EAGER_PRESETS", '["tile"]')
+    config.get_settings.cache_clear()
+    frame = np.zeros((8, 8, 3), dtype=np.uint8)
+    # A camera with its own (or shed) quality, read recently so presets are pre-rendered.
+    cache.store_frame("cam-tile", frame, 60)
+    cache.get_jpeg("cam-tile")
+    cache.store_frame("cam-tile", frame, 60)
+    assert list(cache.VARIANT_CACHE["cam-tile"]) == [variants.Variant(60, 4)]
+
+    encodes = []
+    monkeypatch.setattr(cache, "_encode", lambda *args: encodes.append(args) or b"encoded")
+    assert client.get("/snapshot/cam-tile?preset=tile").status_code == 200
+    batch = client.post("/snapshots", json={"tokens": ["cam-tile"], "preset": "tile"})
+    assert batch.status_code == 200
+    request = stream_api._requested_variant(None, None, None, "contain", "tile")
+    assert request.resolve("cam-tile") == variants.Variant(60, 4)
+    assert encodes == []
+    cache.clear("cam-tile")
+
+
+def test_snapshot_hit_path_takes_no_locks(client: TestClient):
+    cache.store_frame("cam-free", np.zeros((8, 8, 3), dtype=np.uint8), 80)
+    result = {}
+
+    def fetch():
+        # A plain request and a long-poll both resolve to the cached q=80 JPEG.
+        result["plain"] = client.get("/snapshot/cam-free")
+        result["poll"] = client.get("/snapshot/cam-free?after=0&timeout=1")
+
+    fetcher = threading.Thread(target=fetch)
+    with cache.CACHE_LOCK, worker._LIFECYCLE_LOCK:
+        fetcher.start()
+        fetcher.join(timeout=5)
+        finished_while_locked = not fetcher.is_alive()
+    fetcher.join()
+
+    assert finished_while_locked
+    for response in result.values():
+        assert response.status_code == 200
+        assert response.content == cache.JPEG_CACHE["cam-free"]
+
+
+def test_batch_snapshots_encode_misses_on_executor(client: TestClient, monkeypatch):
+    frame = np.zeros((8, 8, 3), dtype=np.uint8)
+    cache.store_frame("cam-a", frame, 80)
+    cache.store_frame("cam-b", frame, 80)
+    jobs = []
+
+    class _RecordingExecutor:
+        async def run(self, fn, *args, **kwargs):
+            jobs.append(list(args[0]))
+            return fn(*args, **kwargs)
+
+    monkeypatch.setattr(snapshot_api, "get_encode_executor", lambda: _RecordingExecutor())
+    response = client.post("/snapshots", json={"tokens": ["cam-a", "cam-b", "cam-none"], "q": 40})
+    assert response.status_code == 200
+    assert jobs == [["cam-a", "cam-b"]]
+    assert cache.JPEG_CACHE["cam-a"] not in response.content
+
+    # Re-reading the same generation is served from the variant cache.
+    client.post("/snapshots", json={"tokens": ["cam-a", "cam-b"], "q": 40})
+    assert len(jobs) == 1
+
+    class _BusyExecutor:
+        async def run(self, *_args, **_kwargs):
+            raise executor.EncoderBusy("full")
+
+    monkeypatch.setattr(snapshot_api, "get_encode_executor", lambda: _BusyExecutor())
+    busy = client.post("/snapshots", json={"tokens": ["cam-a"], "q": 30})
+    assert busy.status_code == 503
+    assert busy.headers["retry-after"] == "1"
+
+
+def test_snapshot_encoder_overload_policy(client: TestClient, monkeypatch):
+    frame = np.zeros((8, 8, 3), dtype=np.uint8)
+    cache.store_frame("cam-busy", frame, 80)
+
+    class _BusyExecutor:
+        async def run(self, *_args, **_kwargs):
+            raise executor.EncoderBusy("full")
+
+    monkeypatch.setattr(snapshot_api, "get_encode_executor", lambda: _BusyExecutor())
+
+    rejected = client.get("/snapshot/cam-busy?q=30")
+    assert rejected.status_code == 503
+    assert rejected.headers["retry-after"] == "1"
+
+    monkeypatch.setenv("RTSP2JPG_ENCODE_OVERLOAD_POLICY", "serve_default")
+    config.get_settings.cache_clear()
+    degraded = client.get("/snapshot/cam-busy?q=30")
+    assert degraded.status_code == 200
+    assert degraded.content == cache.JPEG_CACHE["cam-busy"]
+
+
+def test_metrics_reports_encode_executor_and_threadpool(client: TestClient):
+    payload = client.get("/metrics").json()
+    assert "queue_wait_avg_ms" in payload["encode_executor"]
+    assert payload["threadpool"]["total_tokens"] > 0
+
+
 def test_status_reflects_cache_error(client: TestClient, monkeypatch):
-    monkeypatch.setattr(cameras, "choose_backend", lambda url, prefer=None: (None, "default"))
+    monkeypatch.setattr(cameras, "choose_backend", lambda url, prefer=None, **_kwargs: (None, "default"))
     response = client.post("/register", json={"rtsp_url": "rtsp://example"})
     token = response.json()["token"]
 
@@ -151,7 +429,7 @@ def test_status_reflects_cache_error(client: TestClient, monkeypatch):
 
 
 def test_status_defaults_to_unknown_when_cache_empty(client: TestClient, monkeypatch):
-    monkeypatch.setattr(cameras, "choose_backend", lambda url, prefer=None: (None, "default"))
+    monkeypatch.setattr(cameras, "choose_backend", lambda url, prefer=None, **_kwargs: (None, "default"))
     response = client.post("/register", json={"rtsp_url": "rtsp://example"})
     token = response.json()["token"]
 
@@ -185,7 +463,7 @@ def test_health_endpoint(client: TestClient):
 def test_register_with_preference_invokes_worker(client: TestClient, monkeypatch):
     start_calls: List[tuple] = []
 
-    def fake_start(token: str, url: str, backend_flag, *, autodetect: bool = False):
+    def fake_start(token: str, url: str, backend_flag, *, autodetect: bool = False, **_kwargs):
         start_calls.append((token, url, backend_flag, autodetect))
 
     monkeypatch.setattr(worker, "start_worker", fake_start)
@@ -193,7 +471,7 @@ def test_register_with_preference_invokes_worker(client: TestClient, monkeypatch
     monkeypatch.setattr(
         cameras,
         "choose_backend",
-        lambda url, prefer=None: (backends.cv2.CAP_FFMPEG, "ffmpeg"),
+        lambda url, prefer=None, **_kwargs: (backends.cv2.CAP_FFMPEG, "ffmpeg"),
     )
 
     response = client.post(
@@ -212,8 +490,61 @@ def test_register_with_preference_invokes_worker(client: TestClient, monkeypatch
     assert autodetect is False
 
 
+def test_register_validates_and_persists_capture_overrides(client: TestClient, monkeypatch):
+    probed = []
+    started = []
+    monkeypatch.setattr(
+        cameras,
+        "choose_backend",
+        lambda url, prefer=None, options=None: probed.append(options) or (backends.cv2.CAP_GSTREAMER, "gstreamer"),
+    )
+    monkeypatch.setattr(worker, "start_worker", lambda token, *_, capture=None, **__: started.append(capture))
+
+    rejected = client.post("/register", json={"rtsp_url": "rtsp://example", "decoder": 'avdec_h264 name="x"'})
+    assert rejected.status_code == 400
+    assert probed == []
+
+    response = client.post(
+        "/register",
+        json={"rtsp_url": "rtsp://example", "transport": "udp", "latency_ms": 120, "decoder": "avdec_h264"},
+    )
+
+    assert response.status_code == 200
+    expected = CaptureOptions("full", "udp", 120, "avdec_h264")
+    assert probed == [expected] and started == [expected]
+    assert db_module.get_camera(response.json()["token"]).capture_options == expected
+
+
+def test_profile_get_and_patch(client: TestClient, monkeypatch):
+    monkeypatch.setattr(cameras, "choose_backend", lambda url, prefer=None, **_kwargs: (None, "default"))
+    updates = []
+    monkeypatch.setattr(worker, "update_profile", lambda token, **kwargs: updates.append(kwargs))
+    token = client.post("/register", json={"rtsp_url": "rtsp://example"}).json()["token"]
+
+    initial = client.get(f"/profile/{token}").json()
+    assert initial["overrides"]["jpeg_quality"] is None
+    assert initial["effective"]["jpeg_quality"] == config.get_settings().jpeg_quality
+
+    response = client.patch(f"/profile/{token}", json={"jpeg_quality": 55, "read_throttle_sec": 1.0})
+    assert response.status_code == 200
+    assert response.json()["effective"]["jpeg_quality"] == 55
+    assert updates[-1]["profile"].jpeg_quality == 55
+    assert updates[-1]["capture"] is None
+
+    response = client.patch(f"/profile/{token}", json={"jpeg_quality": None, "decode_profile": "keyframe"})
+    body = response.json()
+    assert body["overrides"]["read_throttle_sec"] == 1.0
+    assert body["effective"]["jpeg_quality"] == config.get_settings().jpeg_quality
+    assert updates[-1]["capture"] == CaptureOptions("keyframe")
+    assert db_module.get_camera(token).capture_options.decode_profile == "keyframe"
+
+    assert client.patch(f"/profile/{token}", json={"decoder": 'x name="y"'}).status_code == 400
+    assert client.patch(f"/profile/{token}", json={"jpeg_quality": 0}).status_code == 422
+    assert client.patch("/profile/missing", json={}).status_code == 404
+
+
 def test_snapshot_unregistered_token_returns_503(client: TestClient, monkeypatch):
-    monkeypatch.setattr(cameras, "choose_backend", lambda url, prefer=None: (None, "default"))
+    monkeypatch.setattr(cameras, "choose_backend", lambda url, prefer=None, **_kwargs: (None, "default"))
     response = client.post("/register", json={"rtsp_url": "rtsp://example"})
     token = response.json()["token"]
 
@@ -228,11 +559,11 @@ def test_snapshot_unregistered_token_returns_503(client: TestClient, monkeypatch
 
 
 def test_unregister_stops_worker_and_clears_cache(client: TestClient, monkeypatch):
-    monkeypatch.setattr(cameras, "choose_backend", lambda url, prefer=None: (None, "default"))
+    monkeypatch.setattr(cameras, "choose_backend", lambda url, prefer=None, **_kwargs: (None, "default"))
     start_calls: List[str] = []
     stop_calls: List[str] = []
 
-    monkeypatch.setattr(worker, "start_worker", lambda token, *_: start_calls.append(token))
+    monkeypatch.setattr(worker, "start_worker", lambda token, *_, **__: start_calls.append(token))
     monkeypatch.setattr(worker, "stop_worker", lambda token: stop_calls.append(token))
 
     response = client.post("/register", json={"rtsp_url": "rtsp://example"})
@@ -255,7 +586,7 @@ def test_snapshot_unknown_token_returns_503(client: TestClient):
 
 
 def test_status_includes_backend_and_last_seen(client: TestClient, monkeypatch):
-    monkeypatch.setattr(cameras, "choose_backend", lambda url, prefer=None: (None, "default"))
+    monkeypatch.setattr(cameras, "choose_backend", lambda url, prefer=None, **_kwargs: (None, "default"))
     response = client.post("/register", json={"rtsp_url": "rtsp://example"})
     token = response.json()["token"]
 
@@ -309,3 +640,312 @@ def test_app_lifespan_triggers_cleanup(tmp_path, monkeypatch):
     assert init_called
 
     config.get_settings.cache_clear()
+
+
+def _decode_frame_message(message: bytes):
+    header_length = int.from_bytes(message[:4], "big")
+    header = json.loads(message[4 : 4 + header_length])
+    return header, message[4 + header_length :]
+
+
+def test_frame_socket_pushes_subscribed_frames(client: TestClient):
+    db_module.add_camera("cam-ws", "rtsp://example")
+    frame = np.zeros((8, 8, 3), dtype=np.uint8)
+    cache.store_frame("cam-ws", frame, 80)
+
+    with client.websocket_connect("/ws") as socket:
+        socket.send_text(json.dumps({"action": "subscribe", "token": "cam-ws", "fps": 50}))
+        assert socket.receive_json() == {"event": "subscribed", "token": "cam-ws"}
+
+        header, jpeg = _decode_frame_message(socket.receive_bytes())
+        assert header["token"] == "cam-ws" and header["seq"] == 1
+        assert jpeg == cache.JPEG_CACHE["cam-ws"]
+
+        cache.store_frame("cam-ws", frame, 80)
+        header, _ = _decode_frame_message(socket.receive_bytes())
+        assert header["seq"] == 2
+
+        socket.send_text(json.dumps({"action": "subscribe", "token": "cam-ws", "preset": "nope"}))
+        assert socket.receive_json()["event"] == "error"
+        socket.send_text(json.dumps({"action": "subscribe", "token": "cam-ws", "q": 500}))
+        assert socket.receive_json()["event"] == "error"
+
+        socket.send_text(json.dumps({"action": "unsubscribe", "token": "cam-ws"}))
+        assert socket.receive_json() == {"event": "unsubscribed", "token": "cam-ws"}
+
+
+def test_streams_reject_unregistered_tokens(client: TestClient):
+    assert client.get("/stream/cam-unknown").status_code == 404
+
+    db_module.add_camera("cam-known", "rtsp://known")
+    with client.websocket_connect("/ws") as socket:
+        socket.send_text(json.dumps({"action": "subscribe", "token": "cam-known"}))
+        assert socket.receive_json() == {"event": "subscribed", "token": "cam-known"}
+        socket.send_text(json.dumps({"action": "subscribe", "token": "cam-unknown"}))
+        assert socket.receive_json() == {"event": "error", "token": "cam-unknown", "detail": "Invalid token"}
+        assert cache.FRAME_BROADCASTER.subscriber_count("cam-unknown") == 0
+
+        # The other subscription on the socket keeps receiving frames.
+        cache.store_frame("cam-known", np.zeros((8, 8, 3), dtype=np.uint8), 80)
+        header, _ = _decode_frame_message(socket.receive_bytes())
+        assert header["token"] == "cam-known"
+    cache.clear("cam-known")
+
+
+def test_status_and_metrics_report_decode_grants(client: TestClient, monkeypatch):
+    monkeypatch.setattr(cameras, "choose_backend", lambda url, prefer=None, **_kwargs: (None, "default"))
+    token = client.post("/register", json={"rtsp_url": "rtsp://example"}).json()["token"]
+    monkeypatch.setattr(status_api, "SCHEDULER", scheduler.DecodeScheduler())
+    status_api.SCHEDULER.update(token, "background", 2.0)
+
+    payload = client.get(f"/status/{token}").json()
+    assert payload["priority_class"] == "background"
+    assert payload["requested_fps"] == 2.0
+    assert payload["granted_fps"] == 2.0
+
+    metrics = client.get("/metrics").json()["decode_scheduler"]
+    assert metrics["budget_fps"] == 0.0
+    assert metrics["cameras"][token]["granted_fps"] == 2.0
+
+
+def test_metrics_reports_load_shedding(client: TestClient):
+    payload = client.get("/metrics").json()["load_shedding"]
+    assert payload["level"] in ("normal", "throttle", "quality", "lazy")
+    assert "cpu_load" in payload and "cameras" in payload
+
+
+def test_metrics_reports_watchdog(client: TestClient):
+    payload = client.get("/metrics").json()["watchdog"]
+    assert {"stalls", "leaked_threads", "leaked_total"} <= set(payload)
+
+
+def test_register_dual_stream_probes_substream(client: TestClient, monkeypatch):
+    probed = []
+    started = {}
+    monkeypatch.setattr(
+        cameras, "choose_backend", lambda url, prefer=None, **_kwargs: probed.append(url) or (None, "default")
+    )
+    monkeypatch.setattr(worker, "start_worker", lambda token, url, flag, **kwargs: started.update(kwargs))
+
+    response = client.post(
+        "/register", json={"rtsp_url": "rtsp://cam/main", "substream_url": "rtsp://cam/sub"}
+    )
+    assert response.status_code == 200
+    token = response.json()["token"]
+    assert probed == ["rtsp://cam/sub"]
+    assert started["substream_url"] == "rtsp://cam/sub"
+    assert db_module.get_camera(token).substream_url == "rtsp://cam/sub"
+    assert client.get(f"/status/{token}").json()["main_stream"] == "idle"
+
+    # Full-size snapshots ask for the main stream; thumbnails do not.
+    requested = []
+    monkeypatch.setattr(worker, "request_full_resolution", lambda token_arg: requested.append(token_arg))
+    client.get(f"/snapshot/{token}?width=64")
+    client.get(f"/snapshot/{token}")
+    assert requested == [token]
+
+
+def test_status_events_stream_filters_and_resumes():
+    async def scenario():
+        resume = status_api._resume_point(None)
+        parts = status_api._status_event_stream({"cam-ev"}, *resume)
+        pending = asyncio.ensure_future(parts.__anext__())
+        await asyncio.sleep(0)
+        cache.set_status("other", "active")
+        cache.set_status("cam-ev", "active", backend="ffmpeg")
+        first = await pending
+        await parts.aclose()
+
+        # Reconnecting with the last id replays what was missed.
+        event_id = first.split(b"\n")[0][len(b"id: "):].decode()
+        cache.set_status("cam-ev", "error", "lost")
+        replay = status_api._status_event_stream(None, *status_api._resume_point(event_id))
+        missed = await replay.__anext__()
+        await replay.aclose()
+
+        stale = status_api._status_event_stream(None, *status_api._resume_point("0000-1"))
+        resync = await stale.__anext__()
+        await stale.aclose()
+        return first, missed, resync
+
+    first, missed, resync = asyncio.run(scenario())
+
+    assert first.startswith(f"id: {cache.INSTANCE_ID}-".encode())
+    assert b"event: status\n" in first
+    data = json.loads(first.split(b"data: ")[1])
+    assert (data["token"], data["status"], data["backend"]) == ("cam-ev", "active", "ffmpeg")
+    assert json.loads(missed.split(b"data: ")[1])["error"] == "lost"
+    assert resync.startswith(b"event: resync\n")
+    assert cache.STATUS_EVENTS.broadcaster.subscriber_count() == 0
+    for token in ("other", "cam-ev"):
+        cache.clear(token)
+
+
+def test_unregister_removes_exported_jpeg(client: TestClient, monkeypatch, tmp_path):
+    monkeypatch.setenv("RTSP2JPG_EXPORT_DIR", str(tmp_path / "export"))
+    config.get_settings.cache_clear()
+    monkeypatch.setattr(cameras, "choose_backend", lambda url, prefer=None, **_kwargs: (None, "default"))
+    token = client.post("/register", json={"rtsp_url": "rtsp://export"}).json()["token"]
+
+    cache.store_frame(token, np.zeros((8, 8, 3), dtype=np.uint8), 80)
+    exported = tmp_path / "export" / f"{token}.jpg"
+    assert exported.read_bytes() == cache.JPEG_CACHE[token]
+    assert client.get("/metrics").json()["export"]["written"] >= 1
+
+    assert client.post(f"/unregister/{token}").status_code == 200
+    assert not exported.exists()
+
+
+def test_restart_endpoint_passes_options(client: TestClient, monkeypatch):
+    calls = []
+    running = {"state": "running", "started_at": 1.0, "restarted": [], "stuck": [], "not_running": []}
+
+    def fake_start(tokens, batch_size, interval_sec):
+        calls.append((tokens, batch_size, interval_sec))
+        return None if len(calls) > 2 else running
+
+    monkeypatch.setattr(worker, "start_restart", fake_start)
+    monkeypatch.setattr(worker, "restart_status", lambda: dict(running, state="done", pending=0, restarted=["a"]))
+
+    response = client.post("/restart")
+    assert response.status_code == 202
+    assert response.json()["state"] == "running"
+    client.post("/restart", json={"tokens": ["a"], "batch_size": 5, "interval_sec": 0})
+    assert calls == [(None, None, None), (["a"], 5, 0.0)]
+    assert client.post("/restart").status_code == 409
+    assert client.post("/restart", json={"batch_size": 0}).status_code == 422
+    progress = client.get("/restart").json()
+    assert progress["state"] == "done" and progress["restarted"] == ["a"] and progress["pending"] == 0
+
+
+def test_raw_frame_endpoint_serves_arrays(client: TestClient):
+    frame = np.arange(4 * 6 * 3, dtype=np.uint8).reshape(4, 6, 3)
+    cache.store_frame("cam-raw", frame, 90)
+
+    response = client.get("/frame/cam-raw")
+    assert response.status_code == 200
+    assert response.headers["x-frame-shape"] == "4,6,3"
+    assert response.headers["x-frame-dtype"] == "|u1"
+    assert response.headers["x-frame-source"] == "frame"
+    assert np.array_equal(np.load(io.BytesIO(response.content)), frame)
+
+    raw = client.get("/frame/cam-raw?format=raw&crop=1,1,3,2")
+    assert raw.headers["x-frame-shape"] == "2,3,3"
+    assert np.array_equal(np.frombuffer(raw.content, dtype=np.uint8).reshape(2, 3, 3), frame[1:3, 1:4])
+
+    gray = client.get("/frame/cam-raw?format=raw&gray=true&width=3")
+    assert gray.headers["x-frame-shape"] == "2,3"
+    assert gray.headers["x-frame-pixel-format"] == "gray"
+
+    assert client.get("/frame/cam-raw?crop=10,10,2,2").status_code == 400
+    assert client.get("/frame/cam-raw?crop=nope").status_code == 400
+    assert client.get("/frame/missing").status_code == 503
+
+    # Without a retained frame the JPEG is decoded instead.
+    with cache.CACHE_LOCK:
+        cache._put_frame_locked("cam-raw", None)
+    decoded = client.get("/frame/cam-raw")
+    assert decoded.headers["x-frame-source"] == "jpeg"
+    assert decoded.headers["x-frame-shape"] == "4,6,3"
+    cache.clear("cam-raw")
+
+
+def test_raw_frame_bodies_are_bytes(client: TestClient, monkeypatch):
+    """The oldest supported Starlette (fastapi 0.111) calls ``.encode`` on non-bytes bodies."""
+
+    from starlette.responses import Response as StarletteResponse
+
+    def render_0_37(self, content):
+        if content is None:
+            return b""
+        if isinstance(content, bytes):
+            return content
+        return content.encode(self.charset)
+
+    monkeypatch.setattr(StarletteResponse, "render", render_0_37)
+    frame = np.arange(4 * 6 * 3, dtype=np.uint8).reshape(4, 6, 3)
+    cache.store_frame("cam-raw-bytes", frame, 90)
+
+    npy = client.get("/frame/cam-raw-bytes")
+    assert npy.status_code == 200
+    assert np.array_equal(np.load(io.BytesIO(npy.content)), frame)
+    raw = client.get("/frame/cam-raw-bytes?format=raw")
+    assert raw.status_code == 200 and raw.content == frame.tobytes()
+    cache.clear("cam-raw-bytes")
+
+
+def test_npy_frame_body_copies_the_array_once(client: TestClient):
+    from rtsp2jpg.api import frame as frame_api
+
+    frame = np.zeros((1000, 1000, 3), dtype=np.uint8)
+    cache.store_frame("cam-npy-copy", frame, 90)
+    tracemalloc.start()
+    try:
+        response = frame_api.frame("cam-npy-copy", format="npy", width=None, height=None, fit="contain", crop=None, gray=False)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    assert np.array_equal(np.load(io.BytesIO(response.body)), frame)
+    assert peak < 1.5 * frame.nbytes
+    cache.clear("cam-npy-copy")
+
+
+def test_named_views_are_managed_and_served(client: TestClient, monkeypatch):
+    monkeypatch.setattr(cameras, "choose_backend", lambda url, prefer=None, **_kwargs: (None, "default"))
+    token = client.post("/register", json={"rtsp_url": "rtsp://views"}).json()["token"]
+
+    response = client.put(f"/views/{token}/gate", json={"crop": [2, 2, 8, 4], "width": 4, "q": 70})
+    assert response.status_code == 200
+    assert response.json()["views"]["gate"]["crop"] == [2, 2, 8, 4]
+    assert client.get(f"/views/{token}").json()["views"].keys() == {"gate"}
+    assert db_module.get_camera(token).view_definitions["gate"]["q"] == 70
+
+    assert client.get(f"/snapshot/{token}/views/gate").status_code == 503
+    cache.store_frame(token, np.zeros((16, 16, 3), dtype=np.uint8), 80)
+    view = client.get(f"/snapshot/{token}/views/gate")
+    assert view.status_code == 200
+    assert cv2.imdecode(np.frombuffer(view.content, np.uint8), cv2.IMREAD_COLOR).shape == (2, 4, 3)
+    assert client.get(f"/snapshot/{token}/views/gate", headers={"If-None-Match": view.headers["etag"]}).status_code == 304
+    assert client.get(f"/snapshot/{token}/views/till").status_code == 404
+
+    assert client.put(f"/views/{token}/bad name", json={"crop": [0, 0, 1, 1]}).status_code == 422
+    assert client.put(f"/views/{token}/gate", json={"crop": [0, 0, 0, 1]}).status_code == 400
+    assert client.put(f"/views/{token}/far", json={"crop": [100, 100, 4, 4]}).status_code == 200
+    assert client.get(f"/snapshot/{token}/views/far").status_code == 409
+
+    assert client.delete(f"/views/{token}/gate").json()["views"].keys() == {"far"}
+    assert client.delete(f"/views/{token}/gate").status_code == 404
+    assert client.get(f"/snapshot/{token}/views/gate").status_code == 404
+    assert client.get("/views/unknown").status_code == 404
+
+
+def test_concurrent_view_edits_are_not_lost(client: TestClient, monkeypatch):
+    monkeypatch.setattr(cameras, "choose_backend", lambda url, prefer=None, **_kwargs: (None, "default"))
+    token = client.post("/register", json={"rtsp_url": "rtsp://views-race"}).json()["token"]
+    client.patch(f"/profile/{token}", json={"jpeg_quality": 40})
+
+    real_get_camera = db_module.get_camera
+
+    def slow_get_camera(lookup):
+        camera = real_get_camera(lookup)
+        time.sleep(0.02)  # widen the read-modify-write window
+        return camera
+
+    monkeypatch.setattr(db_module, "get_camera", slow_get_camera)
+    names = [f"view-{index}" for index in range(8)]
+    threads = [
+        threading.Thread(target=views_api.put_view, args=(token, name, views_api.ViewDefinition(crop=[0, 0, 2, 2])))
+        for name in names
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert set(real_get_camera(token).view_definitions) == set(names)
+    # Views without q use the camera's profile quality, and follow changes to it.
+    assert {variant.quality for variant in cache.VIEWS[token].values()} == {40}
+    client.patch(f"/profile/{token}", json={"jpeg_quality": 55})
+    assert {variant.quality for variant in cache.VIEWS[token].values()} == {55}
+    cache.clear(token)
@@ -1,5 +1,6 @@
 import importlib
 
+import numpy as np
 from fastapi.testclient import TestClient
 
 from rtsp2jpg import cache, config, db, worker
@@ -22,7 +23,7 @@ def test_lifespan_restores_registered_cameras(tmp_path, monkeypatch):
 
     start_calls = []
 
-    def fake_start(token_arg, url_arg, backend_flag, *, autodetect=False):
+    def fake_start(token_arg, url_arg, backend_flag, *, autodetect=False, **_kwargs):
         start_calls.append((token_arg, url_arg, backend_flag, autodetect))
 
     monkeypatch.setattr(worker, "start_worker", fake_start)
@@ -31,7 +32,7 @@ def test_lifespan_restores_registered_cameras(tmp_path, monkeypatch):
     monkeypatch.setattr(cache, "clear_all", lambda: None)
 
     app_module = _reload_app()
-    monkeypatch.setattr(app_module, "choose_backend", lambda url, prefer=None: (42, "ffmpeg"))
+    monkeypatch.setattr(app_module, "choose_backend", lambda url, prefer=None, **_kwargs: (42, "ffmpeg"))
 
     with TestClient(app_module.app, raise_server_exceptions=False):
         pass
@@ -55,7 +56,7 @@ def test_lifespan_marks_error_when_backend_unavailable(tmp_path, monkeypatch):
 
     start_calls = []
 
-    def fake_start(token_arg, url_arg, backend_flag, *, autodetect=False):
+    def fake_start(token_arg, url_arg, backend_flag, *, autodetect=False, **_kwargs):
         start_calls.append((token_arg, url_arg, backend_flag, autodetect))
 
     monkeypatch.setattr(worker, "start_worker", fake_start)
@@ -86,3 +87,39 @@ def test_lifespan_marks_error_when_backend_unavailable(tmp_path, monkeypatch):
     original_clear_all()
     cache.clear(token)
     config.get_settings.cache_clear()
+
+
+def test_lifespan_persists_and_restores_warm_frames(tmp_path, monkeypatch):
+    monkeypatch.setenv("RTSP2JPG_DB_PATH", str(tmp_path / "warm.db"))
+    monkeypatch.setenv("RTSP2JPG_WARM_START_PATH", str(tmp_path / "warm.bin"))
+    config.get_settings.cache_clear()
+    cache.clear_all()
+
+    db.init_db()
+    db.add_camera("warm1", "rtsp://example/warm", status="inactive")
+    monkeypatch.setattr(worker, "start_worker", lambda *args, **kwargs: None)
+    monkeypatch.setattr(worker, "stop_all_workers", lambda: None)
+
+    app_module = _reload_app()
+    monkeypatch.setattr(app_module, "choose_backend", lambda url, prefer=None, **_kwargs: (42, "ffmpeg"))
+
+    with TestClient(app_module.app, raise_server_exceptions=False):
+        cache.store_frame("warm1", np.zeros((8, 8, 3), dtype=np.uint8), 80)
+        cache.set_status("warm1", "active")
+        jpeg = cache.JPEG_CACHE["warm1"]
+
+    assert "warm1" not in cache.JPEG_CACHE
+
+    with TestClient(app_module.app, raise_server_exceptions=False) as client:
+        response = client.get("/snapshot/warm1?q=80")
+        assert response.content == jpeg
+        assert response.headers["x-frame-stale"] == "1"
+        assert response.headers["x-frame-seq"] == "0"
+        assert client.get("/status/warm1").json()["stale"] is True
+
+        cache.store_frame("warm1", np.zeros((8, 8, 3), dtype=np.uint8), 80)
+        assert "x-frame-stale" not in client.get("/snapshot/warm1?q=80").headers
+        assert client.get("/status/warm1").json()["stale"] is False
+
+    cache.clear_all()
+    config.get_settings.cache_clear()
@@ -37,7 +37,7 @@ def test_choose_backend_auto(monkeypatch):
 
     attempts = []
 
-    def fake_try(rtsp_url, backend_flag, quick):
+    def fake_try(rtsp_url, backend_flag, quick, **_kwargs):
         attempts.append(backend_flag)
         if backend_flag is None:
             return DummyCap()
@@ -50,3 +50,4 @@ def test_choose_backend_auto(monkeypatch):
     assert backend_flag is None
     assert backend_label == "default"
     assert attempts[-1] is None
+
@@ -0,0 +1,47 @@
+"""Tests for the latest-value broadcaster."""
+
+from __future__ import annotations
+
+import asyncio
+import threading
+
+from rtsp2jpg.broadcast import Broadcaster
+
+
+def test_slow_subscriber_only_sees_latest_item():
+    broadcaster = Broadcaster()
+
+    async def scenario():
+        with broadcaster.subscribe("cam") as subscription:
+            for item in range(5):
+                broadcaster.publish("cam", item)
+            first = await subscription.next(timeout=1)
+            timed_out = await subscription.next(timeout=0.01)
+            return first, timed_out
+
+    assert asyncio.run(scenario()) == (4, None)
+    assert broadcaster.subscriber_count() == 0
+
+
+def test_publish_from_worker_thread_reaches_every_subscriber():
+    broadcaster = Broadcaster()
+
+    async def scenario():
+        subscriptions = [broadcaster.subscribe("cam") for _ in range(3)]
+        other = broadcaster.subscribe("other")
+        assert broadcaster.subscriber_count("cam") == 3
+
+        thread = threading.Thread(target=broadcaster.publish, args=("cam", "frame"))
+        thread.start()
+        results = await asyncio.gather(*(sub.next(timeout=1) for sub in subscriptions))
+        thread.join()
+        missing = await other.next(timeout=0.01)
+
+        for subscription in subscriptions + [other]:
+            subscription.close()
+        return results, missing
+
+    results, missing = asyncio.run(scenario())
+    assert results == ["frame", "frame", "frame"]
+    assert missing is None
+    assert broadcaster.subscriber_count() == 0
@@ -0,0 +1,59 @@
+"""Tests for the capture loop frame buffer pool."""
+
+from __future__ import annotations
+
+import numpy as np
+
+from rtsp2jpg.buffers import FrameBufferPool
+
+
+def _read_into(buffer):
+    if buffer is None:
+        return np.zeros((4, 4, 3), dtype=np.uint8)
+    buffer[...] = 7
+    return buffer
+
+
+def test_pool_reuses_buffers_once_released():
+    pool = FrameBufferPool(size=2)
+
+    buffer = pool.acquire()
+    assert buffer is None
+    frame = _read_into(buffer)
+    pool.adopt(frame, buffer)
+    del frame
+
+    buffer = pool.acquire()
+    assert buffer is not None
+    frame = _read_into(buffer)
+    pool.adopt(frame, buffer)
+
+    assert pool.reuses == 1
+    assert pool.allocations == 1
+
+
+def test_pool_skips_buffers_still_referenced():
+    pool = FrameBufferPool(size=2)
+
+    published = _read_into(None)
+    pool.adopt(published, None)
+
+    # The published frame is still referenced, so it must not be handed out.
+    assert pool.acquire() is None
+    second = _read_into(None)
+    pool.adopt(second, None)
+    assert len(pool) == 2
+
+    del second
+    buffer = pool.acquire()
+    assert buffer is not None and buffer is not published
+
+
+def test_pool_resets_on_resolution_change():
+    pool = FrameBufferPool(size=3)
+    pool.adopt(np.zeros((4, 4, 3), dtype=np.uint8), None)
+    pool.adopt(np.zeros((8, 8, 3), dtype=np.uint8), None)
+
+    assert len(pool) == 1
+    buffer = pool.acquire()
+    assert buffer is not None and buffer.shape == (8, 8, 3)
@@ -0,0 +1,323 @@
+"""Tests for the in-memory frame/JPEG caches."""
+
+from __future__ import annotations
+
+import threading
+import time
+
+import cv2
+import numpy as np
+import pytest
+
+from rtsp2jpg import cache, config, variants
+
+
+@pytest.fixture(autouse=True)
+def _fresh_cache(monkeypatch):
+    config.get_settings.cache_clear()
+    cache.clear_all()
+    yield
+    cache.clear_all()
+    config.get_settings.cache_clear()
+
+
+def _frame(height: int = 48, width: int = 64) -> np.ndarray:
+    frame = np.zeros((height, width, 3), dtype=np.uint8)
+    frame[:, : width // 2] = 255
+    return frame
+
+
+def test_full_policy_keeps_raw_frame():
+    cache.store_frame("cam", _frame(), 80)
+
+    assert "cam" in cache.FRAME_CACHE
+    usage = cache.memory_usage()
+    assert usage["frames"] == 1
+    assert usage["frame_bytes"] == _frame().nbytes
+    assert usage["jpegs"] == 1
+    assert usage["jpeg_bytes"] == len(cache.JPEG_CACHE["cam"])
+
+
+def test_none_policy_reencodes_from_jpeg(monkeypatch):
+    monkeypatch.setenv("RTSP2JPG_FRAME_CACHE_POLICY", "none")
+    config.get_settings.cache_clear()
+
+    cache.store_frame("cam", _frame(), 95)
+
+    assert "cam" not in cache.FRAME_CACHE
+    assert cache.memory_usage()["frame_bytes"] == 0
+    jpeg = cache.get_jpeg("cam", quality=20)
+    assert jpeg is not None and jpeg != cache.JPEG_CACHE["cam"]
+    decoded = cv2.imdecode(np.frombuffer(jpeg, dtype=np.uint8), cv2.IMREAD_COLOR)
+    assert decoded.shape == _frame().shape
+
+
+def test_recent_policy_only_keeps_requested_cameras(monkeypatch):
+    monkeypatch.setenv("RTSP2JPG_FRAME_CACHE_POLICY", "recent")
+    config.get_settings.cache_clear()
+
+    cache.store_frame("cam", _frame(), 80)
+    assert "cam" not in cache.FRAME_CACHE
+
+    assert cache.get_jpeg("cam") is not None
+    cache.store_frame("cam", _frame(), 80)
+    assert "cam" in cache.FRAME_CACHE
+
+
+def test_downscale_policy_keeps_smaller_copy(monkeypatch):
+    monkeypatch.setenv("RTSP2JPG_FRAME_CACHE_POLICY", "downscale")
+    monkeypatch.setenv("RTSP2JPG_FRAME_CACHE_DOWNSCALE_WIDTH", "32")
+    config.get_settings.cache_clear()
+
+    cache.store_frame("cam", _frame(48, 64), 80)
+
+    assert cache.FRAME_CACHE["cam"].shape == (24, 32, 3)
+
+
+def test_budget_evicts_least_recently_requested(monkeypatch):
+    frame_bytes = _frame().nbytes
+    monkeypatch.setenv("RTSP2JPG_FRAME_CACHE_MAX_MB", str(2.5 * frame_bytes / (1024 * 1024)))
+    config.get_settings.cache_clear()
+
+    cache.store_frame("a", _frame(), 80)
+    cache.store_frame("b", _frame(), 80)
+    cache.get_jpeg("a")
+    cache.store_frame("c", _frame(), 80)
+
+    assert set(cache.FRAME_CACHE) == {"a", "c"}
+    usage = cache.memory_usage()
+    assert usage["frame_bytes"] == 2 * frame_bytes
+    assert usage["frames_evicted"] >= 1
+
+    cache.clear("a")
+    assert cache.memory_usage()["frame_bytes"] == frame_bytes
+
+    cache.clear_all()
+    assert cache.memory_usage()["frames_evicted"] == 0
+
+
+def test_resized_variants_are_cached_per_generation(monkeypatch):
+    encodes = []
+    original_encode = cache._encode
+
+    def counting_encode(frame, quality):
+        encodes.append(frame.shape)
+        return original_encode(frame, quality)
+
+    monkeypatch.setattr(cache, "_encode", counting_encode)
+
+    cache.store_frame("cam", _frame(48, 64), 80)
+    first = cache.get_jpeg("cam", quality=70, width=32)
+    second = cache.get_jpeg("cam", quality=70, width=32)
+
+    assert first is second
+    assert encodes == [(48, 64, 3), (24, 32, 3)]
+    decoded = cv2.imdecode(np.frombuffer(first, dtype=np.uint8), cv2.IMREAD_COLOR)
+    assert decoded.shape == (24, 32, 3)
+
+    cache.store_frame("cam", _frame(48, 64), 80)
+    assert cache.VARIANT_CACHE["cam"] == {}
+
+
+def test_eager_presets_render_for_hot_cameras(monkeypatch):
+    monkeypatch.setenv("RTSP2JPG_EAGER_PRESETS", '["thumb"]')
+    config.get_settings.cache_clear()
+
+    cache.store_frame("cam", _frame(48, 64), 80)
+    assert cache.VARIANT_CACHE["cam"] == {}
+
+    cache.get_jpeg("cam")
+    cache.store_frame("cam", _frame(48, 64), 80)
+    assert list(cache.VARIANT_CACHE["cam"]) == [variants.preset_variant("thumb", 80)]
+
+
+def test_get_jpegs_uses_single_lock_acquisition(monkeypatch):
+    cache.store_frame("a", _frame(), 80)
+    cache.store_frame("b", _frame(), 80)
+    cache.set_status("a", "active")
+
+    acquisitions = []
+    real_lock = cache.CACHE_LOCK
+
+    class _CountingLock:
+        def __enter__(self):
+            acquisitions.append(True)
+            return real_lock.__enter__()
+
+        def __exit__(self, *exc):
+            return real_lock.__exit__(*exc)
+
+    monkeypatch.setattr(cache, "CACHE_LOCK", _CountingLock())
+
+    items = cache.get_jpegs(["a", "b", "missing"])
+
+    assert len(acquisitions) == 1
+    assert [item.token for item in items] == ["a", "b", "missing"]
+    assert items[0].jpeg == cache.JPEG_CACHE["a"]
+    assert items[0].status == "active" and items[0].seq == 1
+    assert items[2].jpeg is None and items[2].status == "unknown"
+
+
+def test_concurrent_reencodes_share_one_encode(monkeypatch):
+    cache.store_frame("cam", _frame(), 80)
+
+    encodes = []
+    original_encode = cache._encode
+
+    def slow_encode(frame, quality):
+        encodes.append(quality)
+        time.sleep(0.1)
+        return original_encode(frame, quality)
+
+    monkeypatch.setattr(cache, "_encode", slow_encode)
+
+    workers = 50
+    barrier = threading.Barrier(workers)
+    results = []
+
+    def request():
+        barrier.wait()
+        results.append(cache.get_jpeg("cam", quality=70))
+
+    threads = [threading.Thread(target=request) for _ in range(workers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert encodes == [70]
+    assert len(results) == workers
+    assert all(result is results[0] for result in results)
+    assert cache._IN_FLIGHT == {}
+
+
+def test_i420_frames_are_encoded_from_planes_and_converted_lazily(monkeypatch):
+    bgr_encodes = []
+    original_encode = cache._encode
+
+    def counting_encode(frame, quality):
+        bgr_encodes.append(frame.shape)
+        return original_encode(frame, quality)
+
+    monkeypatch.setattr(cache, "_encode", counting_encode)
+    i420 = cv2.cvtColor(_frame(), cv2.COLOR_BGR2YUV_I420)
+
+    cache.store_frame("cam", i420, 80, pixel_format="i420")
+
+    assert cache.FRAME_SIZE["cam"] == (64, 48)
+    assert cache.FRAME_FORMAT["cam"] == "i420"
+    assert cache.memory_usage()["frame_bytes"] == i420.nbytes
+    assert cache.get_jpeg("cam", quality=50) is not None
+    assert bgr_encodes == [] and "cam" not in cache.BGR_CACHE
+
+    resized = cache.get_jpeg("cam", width=32)
+    decoded = cv2.imdecode(np.frombuffer(resized, dtype=np.uint8), cv2.IMREAD_COLOR)
+    assert decoded.shape == (24, 32, 3)
+    assert bgr_encodes == [(24, 32, 3)]
+    assert cache.BGR_CACHE["cam"].shape == (48, 64, 3)
+
+
+def test_aliases_share_one_encode(monkeypatch):
+    calls = []
+    original = cache._encode
+    monkeypatch.setattr(cache, "_encode", lambda frame, quality: calls.append(quality) or original(frame, quality))
+
+    cache.store_frame("cam-a", _frame(), 80, aliases=("cam-b",))
+
+    assert calls == [80]
+    assert cache.JPEG_CACHE["cam-a"] is cache.JPEG_CACHE["cam-b"]
+    assert cache.FRAME_CACHE["cam-a"] is cache.FRAME_CACHE["cam-b"]
+    assert cache.FRAME_SEQ == {"cam-a": 1, "cam-b": 1}
+
+
+def test_shared_frame_bytes_are_counted_once(monkeypatch):
+    frame_bytes = _frame().nbytes
+    cache.store_frame("cam-a", _frame(), 80, aliases=("cam-b", "cam-c"))
+
+    usage = cache.memory_usage()
+    assert usage["frames"] == 1
+    assert usage["frame_bytes"] == frame_bytes
+
+    cache.store_frame("cam-a", _frame(), 80, aliases=("cam-b", "cam-c"))
+    assert cache.memory_usage()["frame_bytes"] == frame_bytes
+    cache.clear("cam-c")
+    assert cache.memory_usage()["frame_bytes"] == frame_bytes
+
+    # A budget of 1.5 frames holds the shared frame; a hotter camera evicts it for every alias.
+    monkeypatch.setenv("RTSP2JPG_FRAME_CACHE_MAX_MB", str(1.5 * frame_bytes / (1024 * 1024)))
+    config.get_settings.cache_clear()
+    cache.store_frame("cam-a", _frame(), 80, aliases=("cam-b", "cam-c"))
+    assert set(cache.FRAME_CACHE) == {"cam-a", "cam-b", "cam-c"}
+    cache.LAST_REQUESTED_TS["cam-d"] = time.time()
+    cache.store_frame("cam-d", _frame(), 80)
+    assert set(cache.FRAME_CACHE) == {"cam-d"}
+    usage = cache.memory_usage()
+    assert usage["frame_bytes"] == frame_bytes
+    assert usage["frames_evicted"] == 1
+
+
+def test_raw_frame_returns_retained_array_and_i420_gray():
+    frame = np.full((4, 4, 3), 120, dtype=np.uint8)
+    cache.store_frame("raw-bgr", frame, 80)
+    result = cache.raw_frame("raw-bgr")
+    # The untransformed frame is served without a copy.
+    assert result.array is cache.FRAME_CACHE["raw-bgr"]
+    assert not result.decoded
+
+    i420 = np.full((6, 4), 235, dtype=np.uint8)
+    cache.store_frame("raw-i420", i420, 80, pixel_format=cache.I420)
+    gray = cache.raw_frame("raw-i420", gray=True)
+    assert gray.array.shape == (4, 4)
+    assert int(gray.array[0, 0]) == 255
+    assert cache.raw_frame("raw-i420").array.shape == (4, 4, 3)
+    for token in ("raw-bgr", "raw-i420"):
+        cache.clear(token)
+
+
+def test_views_render_per_generation_only_while_read():
+    frame = np.zeros((8, 8, 3), dtype=np.uint8)
+    gate = variants.Variant(80, crop=(2, 2, 4, 4))
+    cache.set_views("cam-views", {"gate": gate})
+
+    cache.store_frame("cam-views", frame, 80)
+    assert gate not in cache.VARIANT_CACHE["cam-views"]
+
+    jpeg = cache.get_view("cam-views", "gate")
+    assert cv2.imdecode(np.frombuffer(jpeg, np.uint8), cv2.IMREAD_COLOR).shape == (4, 4, 3)
+    with pytest.raises(KeyError):
+        cache.get_view("cam-views", "till")
+
+    # A recently read view is rendered with every new frame.
+    cache.store_frame("cam-views", frame, 80)
+    assert gate in cache.VARIANT_CACHE["cam-views"]
+
+    cache.VIEW_REQUESTED_TS["cam-views"]["gate"] = 0.0
+    cache.store_frame("cam-views", frame, 80)
+    assert gate not in cache.VARIANT_CACHE["cam-views"]
+
+    cache.set_views("cam-views", {"far": variants.Variant(80, crop=(100, 100, 4, 4))})
+    with pytest.raises(ValueError):
+        cache.get_view("cam-views", "far")
+    cache.clear("cam-views")
+    assert "cam-views" not in cache.VIEWS
+
+
+def test_view_crops_are_scaled_onto_substream_frames():
+    gate = variants.Variant(95, crop=(8, 0, 8, 8))
+    cache.set_views("cam-dual-views", {"gate": gate})
+    substream = np.zeros((8, 8, 3), dtype=np.uint8)
+    substream[:4, 4:] = 255  # the gate's region at half resolution
+
+    # Crops are defined on main-stream frames; without one they cannot be placed.
+    cache.store_frame("cam-dual-views", substream, 95, substream=True)
+    with pytest.raises(ValueError):
+        cache.get_view("cam-dual-views", "gate")
+
+    cache.store_frame("cam-dual-views", np.zeros((16, 16, 3), dtype=np.uint8), 95)
+    cache.store_frame("cam-dual-views", substream, 95, substream=True)
+    jpeg = cache.get_view("cam-dual-views", "gate")
+    decoded = cv2.imdecode(np.frombuffer(jpeg, np.uint8), cv2.IMREAD_COLOR)
+    assert decoded.shape == (4, 4, 3)
+    assert decoded.min() > 200
+    cache.clear("cam-dual-views")
+    assert "cam-dual-views" not in cache.FULL_SIZE
@@ -1,4 +1,9 @@
+import sqlite3
+
+import pytest
+
 from rtsp2jpg import config, db
+from rtsp2jpg.pipelines import CaptureOptions
 
 
 def test_db_crud(tmp_path, monkeypatch):
@@ -23,8 +28,58 @@ def test_db_crud(tmp_path, monkeypatch):
     camera = db.get_camera(token)
     assert camera.status == "inactive"
 
+    db.add_camera("tok456", rtsp_url, status="active")
+    db.update_statuses([token, "tok456"], "error")
+    assert [camera.status for camera in db.list_cameras()] == ["error", "error"]
+    db.delete_camera("tok456")
+
     db.delete_camera(token)
     assert db.get_camera(token) is None
     assert db.list_cameras() == []
 
     config.get_settings.cache_clear()
+
+
+def test_init_db_adds_capture_columns_to_old_databases(tmp_path, monkeypatch):
+    db_file = tmp_path / "old.db"
+    monkeypatch.setenv("RTSP2JPG_DB_PATH", str(db_file))
+    config.get_settings.cache_clear()
+    conn = sqlite3.connect(db_file)
+    conn.execute("CREATE TABLE cameras (token TEXT PRIMARY KEY, rtsp_url TEXT NOT NULL, status TEXT)")
+    conn.execute("INSERT INTO cameras VALUES ('old', 'rtsp://example/old', 'inactive')")
+    conn.commit()
+    conn.close()
+
+    db.init_db()
+    options = CaptureOptions("keyframe", transport="udp", latency_ms=200, decoder="avdec_h264")
+    db.add_camera("new", "rtsp://example/new", options=options)
+
+    assert db.get_camera("old").capture_options == CaptureOptions()
+    assert db.get_camera("new").capture_options == options
+
+    config.get_settings.cache_clear()
+
+
+def test_update_camera_profile_columns(tmp_path, monkeypatch):
+    monkeypatch.setenv("RTSP2JPG_DB_PATH", str(tmp_path / "profile.db"))
+    config.get_settings.cache_clear()
+    db.init_db()
+    db.add_camera("cam", "rtsp://example/cam")
+
+    db.update_camera("cam", {"jpeg_quality": 60, "read_throttle_sec": 0.5, "transport": "udp"})
+    camera = db.get_camera("cam")
+    assert camera.profile.jpeg_quality == 60
+    assert camera.profile.read_throttle_sec == 0.5
+    assert camera.capture_options.transport == "udp"
+
+    db.update_camera("cam", {"jpeg_quality": None})
+    assert db.get_camera("cam").profile.jpeg_quality is None
+
+    assert db.get_camera("cam").view_definitions == {}
+    db.update_camera("cam", {"views": '{"gate": {"crop": [0, 0, 10, 10]}}'})
+    assert db.get_camera("cam").view_definitions == {"gate": {"crop": [0, 0, 10, 10]}}
+
+    with pytest.raises(ValueError):
+        db.update_camera("cam", {"rtsp_url": "rtsp://elsewhere"})
+
+    config.get_settings.cache_clear()
@@ -0,0 +1,72 @@
+"""Tests for the JPEG encoder backends."""
+
+from __future__ import annotations
+
+import cv2
+import numpy as np
+import pytest
+
+from rtsp2jpg import config, encoders
+
+
+@pytest.fixture(autouse=True)
+def _fresh_settings():
+    config.get_settings.cache_clear()
+    encoders._INSTANCES.clear()
+    yield
+    config.get_settings.cache_clear()
+    encoders._INSTANCES.clear()
+
+
+def _frame() -> np.ndarray:
+    ramp = np.linspace(0, 255, 64, dtype=np.uint8)
+    return np.dstack([np.tile(ramp, (48, 1))] * 3)
+
+
+@pytest.mark.parametrize("name", encoders.available_encoders())
+def test_available_encoders_produce_decodable_jpeg(name):
+    encoder = encoders.create_encoder(name, encoders.EncoderOptions())
+
+    jpeg = encoder.encode(_frame(), 80)
+
+    assert jpeg[:2] == b"\xff\xd8"
+    decoded = cv2.imdecode(np.frombuffer(jpeg, dtype=np.uint8), cv2.IMREAD_COLOR)
+    assert decoded.shape == _frame().shape
+
+
+def test_opencv_encoder_honours_options():
+    plain = encoders.OpenCVEncoder(encoders.EncoderOptions()).encode(_frame(), 80)
+    progressive = encoders.OpenCVEncoder(
+        encoders.EncoderOptions(progressive=True, restart_interval=1)
+    ).encode(_frame(), 80)
+
+    assert b"\xff\xc2" in progressive  # progressive SOF marker
+    assert b"\xff\xdd" in progressive  # restart interval marker
+    assert b"\xff\xc2" not in plain
+
+
+def test_get_encoder_follows_settings_and_falls_back(monkeypatch):
+    assert encoders.get_encoder().name == "opencv"
+
+    def unavailable(_options):
+        raise encoders.EncoderUnavailable("missing")
+
+    monkeypatch.setitem(encoders.ENCODERS, "turbojpeg", unavailable)
+    monkeypatch.setenv("RTSP2JPG_JPEG_ENCODER", "turbojpeg")
+    config.get_settings.cache_clear()
+
+    assert encoders.get_encoder().name == "opencv"
+    assert encoders.get_encoder() is encoders.get_encoder()
+
+
+@pytest.mark.parametrize("name", encoders.available_encoders())
+def test_available_encoders_encode_i420_planes(name):
+    encoder = encoders.create_encoder(name, encoders.EncoderOptions())
+    bgr = _frame()
+    i420 = cv2.cvtColor(bgr, cv2.COLOR_BGR2YUV_I420)
+
+    jpeg = encoder.encode_i420(i420, 90)
+
+    decoded = cv2.imdecode(np.frombuffer(jpeg, dtype=np.uint8), cv2.IMREAD_COLOR)
+    assert decoded.shape == bgr.shape
+    assert np.abs(decoded.astype(int) - bgr.astype(int)).mean() < 8
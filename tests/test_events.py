@@ -0,0 +1,51 @@
+"""Tests for the status event log."""
+
+from __future__ import annotations
+
+from rtsp2jpg import cache, config
+from rtsp2jpg.events import StatusEventLog
+
+
+def test_events_are_numbered_and_replayed_after_an_id():
+    log = StatusEventLog()
+    first = log.record("a", "connecting", None, None, "ffmpeg")
+    second = log.record("a", "active", "connecting", None, "ffmpeg")
+
+    assert (first.id, second.id) == (1, 2)
+    assert log.since(0) == ([first, second], False)
+    assert log.since(1) == ([second], False)
+    assert log.since(2) == ([], False)
+
+
+def test_trimmed_buffer_reports_a_gap(monkeypatch):
+    monkeypatch.setenv("RTSP2JPG_STATUS_EVENT_BUFFER", "2")
+    config.get_settings.cache_clear()
+    try:
+        log = StatusEventLog()
+        for status in ("connecting", "error", "connecting", "active"):
+            log.record("a", status, None, None, None)
+    finally:
+        config.get_settings.cache_clear()
+
+    events, lost = log.since(1)
+    assert [event.id for event in events] == [3, 4]
+    assert lost
+    assert log.since(2) == (events, False)
+    # An id the log never issued (e.g. from before a restart) replays everything.
+    assert log.since(10) == (events, True)
+
+
+def test_set_status_publishes_only_transitions():
+    start = cache.STATUS_EVENTS.last_id
+    cache.set_status("evt", "connecting", backend="ffmpeg")
+    cache.set_status("evt", "connecting", backend="ffmpeg")
+    cache.set_status("evt", "error", "timeout", backend="ffmpeg")
+    cache.set_status("evt", "error", "timeout", backend="ffmpeg")
+
+    events, _ = cache.STATUS_EVENTS.since(start)
+    assert [(event.status, event.previous, event.error) for event in events] == [
+        ("connecting", None, None),
+        ("error", "connecting", "timeout"),
+    ]
+    assert events[0].backend == "ffmpeg"
+    cache.clear("evt")
@@ -0,0 +1,34 @@
+"""Tests for the dedicated encode executor."""
+
+from __future__ import annotations
+
+import asyncio
+import threading
+
+import pytest
+
+from rtsp2jpg.executor import EncodeExecutor, EncoderBusy
+
+
+def test_executor_sheds_load_beyond_capacity():
+    executor = EncodeExecutor(workers=1, max_queue=1)
+    release = threading.Event()
+
+    async def scenario():
+        running = asyncio.ensure_future(executor.run(release.wait, 5))
+        queued = asyncio.ensure_future(executor.run(lambda: "queued"))
+        await asyncio.sleep(0.05)
+        with pytest.raises(EncoderBusy):
+            await executor.run(lambda: "rejected")
+        stats = executor.stats()
+        release.set()
+        return stats, await running, await queued
+
+    stats, running_result, queued_result = asyncio.run(scenario())
+    executor.shutdown()
+
+    assert stats["running"] == 1 and stats["queued"] == 1 and stats["rejected"] == 1
+    assert running_result is True and queued_result == "queued"
+    final = executor.stats()
+    assert final["completed"] == 2
+    assert final["queue_wait_max_ms"] > 0
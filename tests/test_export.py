@@ -0,0 +1,75 @@
+"""Tests for the atomic JPEG export."""
+
+from __future__ import annotations
+
+import os
+
+import pytest
+
+from rtsp2jpg import config
+from rtsp2jpg.export import MANIFEST_NAME, TEMP_PREFIX, JpegExporter
+
+
+@pytest.fixture
+def export_dir(tmp_path, monkeypatch):
+    directory = tmp_path / "export"
+    monkeypatch.setenv("RTSP2JPG_EXPORT_DIR", str(directory))
+    monkeypatch.setenv("RTSP2JPG_EXPORT_INTERVAL_SEC", "1.0")
+    config.get_settings.cache_clear()
+    yield directory
+    config.get_settings.cache_clear()
+
+
+def test_export_is_disabled_without_a_directory():
+    config.get_settings.cache_clear()
+    assert not JpegExporter().maybe_write("cam", b"jpeg")
+
+
+def test_export_replaces_file_and_rate_limits(export_dir):
+    now = [100.0]
+    exporter = JpegExporter(clock=lambda: now[0])
+
+    assert exporter.maybe_write("cam", b"first")
+    assert not exporter.maybe_write("cam", b"second")
+    now[0] += 1.0
+    assert exporter.maybe_write("cam", b"third")
+
+    path = export_dir / "cam.jpg"
+    assert path.read_bytes() == b"third"
+    assert os.stat(path).st_mode & 0o777 == 0o644
+    # Only the final file and the manifest remain; temp files are renamed into place.
+    assert sorted(os.listdir(export_dir)) == [MANIFEST_NAME, "cam.jpg"]
+    assert exporter.stats()["written"] == 2
+    assert exporter.stats()["skipped"] == 1
+
+
+def test_export_rejects_path_tokens(export_dir):
+    exporter = JpegExporter()
+    assert not exporter.maybe_write("../escape", b"jpeg")
+    assert not exporter.maybe_write(".hidden", b"jpeg")
+
+
+def test_remove_and_prune_delete_stale_files(export_dir):
+    exporter = JpegExporter()
+    for token in ("keep", "gone", "old"):
+        exporter.maybe_write(token, b"jpeg")
+    (export_dir / f"{TEMP_PREFIX}keep.abc.tmp").write_bytes(b"partial")
+    (export_dir / "notes.txt").write_text("unrelated")
+
+    exporter.remove("gone")
+    exporter.remove("never-exported")
+    assert exporter.prune(["keep"]) == 2
+    assert sorted(os.listdir(export_dir)) == [MANIFEST_NAME, "keep.jpg", "notes.txt"]
+
+
+def test_prune_leaves_files_the_exporter_did_not_create(export_dir):
+    export_dir.mkdir()
+    for name in ("logo.jpg", ".other.abc.tmp", "never-exported.jpg"):
+        (export_dir / name).write_bytes(b"foreign")
+    exporter = JpegExporter()
+    exporter.maybe_write("cam", b"jpeg")
+
+    exporter.remove("never-exported")
+    # A restarted process prunes from the manifest left on disk.
+    assert JpegExporter().prune([]) == 1
+    assert sorted(os.listdir(export_dir)) == [".other.abc.tmp", MANIFEST_NAME, "logo.jpg", "never-exported.jpg"]
@@ -0,0 +1,69 @@
+"""Tests for the global decode budget scheduler."""
+
+from __future__ import annotations
+
+import pytest
+
+from rtsp2jpg import config
+from rtsp2jpg.scheduler import DecodeScheduler, allocate, requested_fps
+
+
+@pytest.fixture
+def budget(monkeypatch):
+    def _set(fps: float, floor: float = 0.5) -> None:
+        monkeypatch.setenv("RTSP2JPG_DECODE_BUDGET_FPS", str(fps))
+        monkeypatch.setenv("RTSP2JPG_DECODE_MIN_FPS", str(floor))
+        config.get_settings.cache_clear()
+
+    yield _set
+    config.get_settings.cache_clear()
+
+
+def test_allocate_grants_everything_under_budget():
+    grants = allocate({"a": ("normal", 5.0), "b": ("background", 5.0)}, 20.0, 1.0)
+    assert grants == {"a": 5.0, "b": 5.0}
+
+
+def test_allocate_demotes_background_before_normal():
+    requests = {"cam": ("critical", 10.0), "lobby": ("normal", 10.0), "yard": ("background", 10.0)}
+    grants = allocate(requests, 22.0, 1.0)
+    assert grants["cam"] == 10.0
+    assert grants["lobby"] == 10.0
+    assert grants["yard"] == pytest.approx(2.0)
+
+
+def test_allocate_scales_a_class_that_does_not_fit_and_keeps_floors():
+    requests = {"a": ("normal", 10.0), "b": ("normal", 30.0), "c": ("background", 10.0)}
+    grants = allocate(requests, 21.0, 1.0)
+    assert grants["c"] == 1.0
+    assert grants["a"] == pytest.approx(1.0 + 9.0 * 18.0 / 38.0)
+    assert grants["b"] == pytest.approx(1.0 + 29.0 * 18.0 / 38.0)
+    assert sum(grants.values()) == pytest.approx(21.0)
+
+
+def test_allocate_without_budget_is_unlimited():
+    assert allocate({"a": ("background", 30.0)}, 0.0, 1.0) == {"a": 30.0}
+
+
+def test_requested_fps_from_throttle():
+    assert requested_fps(0.5) == 2.0
+    assert requested_fps(0.0) == 30.0
+
+
+def test_scheduler_recovers_when_load_falls(budget):
+    budget(10.0)
+    scheduler = DecodeScheduler()
+    scheduler.update("front", "critical", 8.0)
+    scheduler.update("yard", "background", 8.0)
+
+    demoted = scheduler.grant("yard")
+    assert demoted.granted_fps == pytest.approx(2.0)
+    assert scheduler.min_interval("yard") == pytest.approx(0.5)
+    stats = scheduler.stats()
+    assert stats["demoted"] == 1
+    assert stats["granted_fps"] == pytest.approx(10.0)
+
+    scheduler.remove("front")
+    assert scheduler.grant("yard").granted_fps == 8.0
+    assert scheduler.stats()["demoted"] == 0
+    assert scheduler.grant("front") is None
@@ -0,0 +1,119 @@
+"""Tests for the adaptive load shedding controller."""
+
+from __future__ import annotations
+
+import pytest
+
+from rtsp2jpg import config, shedding
+from rtsp2jpg.profiles import Tuning
+from rtsp2jpg.shedding import LAZY, NORMAL, QUALITY, THROTTLE, LoadShedder
+
+
+class _Clock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class _Executor:
+    queued = 0
+
+    def stats(self):
+        return {"capacity": 12, "workers": 4, "queued": self.queued}
+
+
+@pytest.fixture
+def shedder(monkeypatch):
+    monkeypatch.setenv("RTSP2JPG_SHED_HOLD_SEC", "3")
+    config.get_settings.cache_clear()
+    executor = _Executor()
+    monkeypatch.setattr(shedding, "get_encode_executor", lambda: executor)
+    clock = _Clock()
+    yield LoadShedder(clock=clock, cpus=1), clock, executor
+    config.get_settings.cache_clear()
+
+
+def _run(shedder: LoadShedder, clock: _Clock, seconds: int, cpu_share: float) -> None:
+    """Feed one camera at 10 fps whose frames cost ``cpu_share`` of a core."""
+
+    for _ in range(seconds * 10):
+        clock.now += 0.1
+        shedder.observe("cam", read_sec=0.01, encode_sec=0.01, cpu_sec=0.1 * cpu_share)
+
+
+def test_shedder_escalates_only_after_hold_time(shedder):
+    controller, clock, _ = shedder
+    _run(controller, clock, 2, 0.95)
+    assert controller.level == NORMAL
+    _run(controller, clock, 3, 0.95)
+    assert controller.level == THROTTLE
+    _run(controller, clock, 10, 0.95)
+    assert controller.level == LAZY
+    assert controller.stats()["transitions"] == 3
+
+
+def test_shedder_recovers_with_hysteresis(shedder):
+    controller, clock, _ = shedder
+    _run(controller, clock, 6, 0.95)
+    assert controller.level == THROTTLE
+
+    # Below the high watermark but leaving the throttle would overload again.
+    _run(controller, clock, 10, 0.5)
+    assert controller.level == THROTTLE
+    _run(controller, clock, 10, 0.25)
+    assert controller.level == NORMAL
+    assert controller.stats()["level"] == "normal"
+
+
+def test_shedder_reacts_to_encode_queue(shedder):
+    controller, clock, executor = shedder
+    executor.queued = 8
+    _run(controller, clock, 6, 0.1)
+    assert controller.level == THROTTLE
+    assert controller.stats()["encode_queue_fill"] == 1.0
+
+
+def test_shedder_disabled_stays_normal(shedder, monkeypatch):
+    monkeypatch.setenv("RTSP2JPG_LOAD_SHEDDING", "false")
+    config.get_settings.cache_clear()
+    controller, clock, _ = shedder
+    _run(controller, clock, 10, 1.0)
+    assert controller.level == NORMAL
+
+
+def test_apply_maps_levels_to_tuning(shedder):
+    controller, _, _ = shedder
+    tuning = Tuning(0.1, 85, 2.0, 0.2, "normal")
+    assert controller.apply(tuning) == (tuning, True)
+
+    controller.level = THROTTLE
+    shed, eager = controller.apply(tuning)
+    assert shed.read_throttle_sec == pytest.approx(0.2) and shed.jpeg_quality == 85 and eager
+
+    controller.level = QUALITY
+    assert controller.apply(tuning)[0].jpeg_quality == 60
+
+    controller.level = LAZY
+    assert controller.apply(tuning)[1] is False
+    critical = tuning._replace(priority_class="critical")
+    assert controller.apply(critical) == (critical, True)
+
+
+def test_apply_reads_settings_once_per_level(shedder, monkeypatch):
+    controller, clock, _ = shedder
+    reads = []
+    real_get_settings = shedding.get_settings
+    monkeypatch.setattr(shedding, "get_settings", lambda: reads.append(True) or real_get_settings())
+    tuning = Tuning(0.1, 85, 2.0, 0.2, "normal")
+
+    controller.level = QUALITY
+    for _ in range(100):
+        assert controller.apply(tuning)[0].jpeg_quality == 60
+    assert len(reads) == 1
+
+    # A level change picks up the current settings again.
+    controller._set_level_locked(THROTTLE, clock(), "test")
+    controller.apply(tuning)
+    assert len(reads) == 2
@@ -0,0 +1,40 @@
+"""Tests for snapshot variant sizing."""
+
+from __future__ import annotations
+
+import numpy as np
+import pytest
+
+from rtsp2jpg import config, variants
+
+
+def test_target_size_contain_keeps_aspect_and_never_upscales():
+    assert variants.target_size(1920, 1080, 320, None, "contain") == (320, 180)
+    assert variants.target_size(1920, 1080, 320, 320, "contain") == (320, 180)
+    assert variants.target_size(640, 360, 1280, None, "contain") == (640, 360)
+
+
+def test_target_size_cover_and_fill_use_exact_box():
+    assert variants.target_size(1920, 1080, 200, 200, "cover") == (200, 200)
+    assert variants.target_size(1920, 1080, 200, 200, "fill") == (200, 200)
+
+
+def test_resize_cover_crops_centre():
+    frame = np.zeros((100, 200, 3), dtype=np.uint8)
+    frame[:, 50:150] = 255
+
+    resized = variants.resize_frame(frame, 50, 50, "cover")
+
+    assert resized.shape == (50, 50, 3)
+    assert resized.min() == 255
+
+
+def test_preset_variant_uses_settings(monkeypatch):
+    monkeypatch.setenv("RTSP2JPG_SNAPSHOT_PRESETS", '{"tile": {"width": 320, "fit": "cover", "height": 180}}')
+    config.get_settings.cache_clear()
+
+    assert variants.preset_variant("tile", 60) == variants.Variant(60, 320, 180, "cover")
+    with pytest.raises(KeyError):
+        variants.preset_variant("missing", 60)
+
+    config.get_settings.cache_clear()
@@ -0,0 +1,44 @@
+"""Tests for the warm-start frame store."""
+
+from __future__ import annotations
+
+import time
+
+from rtsp2jpg import warmstart
+from rtsp2jpg.cache import WarmFrame
+
+
+def _frame(token: str, last_seen: float = 1000.0) -> WarmFrame:
+    return WarmFrame(token, f"jpeg-{token}".encode() * 10, 85, last_seen, "active", None)
+
+
+def test_round_trip_filters_tokens_and_age(tmp_path):
+    path = str(tmp_path / "warm.bin")
+    frames = [_frame("a"), _frame("b", last_seen=100.0), _frame("c")]
+    assert warmstart.save(path, frames) == 3
+
+    assert warmstart.load(path) == frames
+    loaded = warmstart.load(path, tokens=["a", "b"], max_age_sec=60.0, now=1030.0)
+    assert loaded == [frames[0]]
+
+
+def test_missing_or_damaged_file_starts_cold(tmp_path):
+    assert warmstart.load(str(tmp_path / "absent.bin")) == []
+
+    path = tmp_path / "warm.bin"
+    warmstart.save(str(path), [_frame("a")])
+    path.write_bytes(path.read_bytes()[:-5])
+    assert warmstart.load(str(path)) == []
+    path.write_bytes(b"garbage")
+    assert warmstart.load(str(path)) == []
+
+
+def test_thousands_of_cameras_load_quickly(tmp_path):
+    path = str(tmp_path / "warm.bin")
+    jpeg = bytes(20_000)
+    warmstart.save(path, [WarmFrame(f"cam{i}", jpeg, 85, 1000.0, "active", None) for i in range(5000)])
+
+    started = time.perf_counter()
+    frames = warmstart.load(path)
+    assert len(frames) == 5000
+    assert time.perf_counter() - started < 1.0
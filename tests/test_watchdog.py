@@ -0,0 +1,170 @@
+"""Tests for the capture watchdog and stalled worker replacement."""
+
+from __future__ import annotations
+
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from rtsp2jpg import cache, config, worker
+from rtsp2jpg.watchdog import Watchdog
+
+
+class _Clock:
+    def __init__(self) -> None:
+        self.now = 100.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def stall_timeout(monkeypatch):
+    monkeypatch.setenv("RTSP2JPG_READ_STALL_TIMEOUT_SEC", "10")
+    config.get_settings.cache_clear()
+    yield
+    config.get_settings.cache_clear()
+
+
+def _wait_for(predicate, timeout: float = 2.0) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.01)
+    return predicate()
+
+
+def test_check_reports_each_stall_once(stall_timeout):
+    clock = _Clock()
+    watchdog = Watchdog(clock=clock)
+    busy = watchdog.attach("cam-a")
+    idle = watchdog.attach("cam-b")
+    busy.blocked_since = 95.0
+    idle.blocked_since = None
+
+    assert watchdog.check() == []
+    clock.now = 106.0
+    assert watchdog.check() == [("cam-a", 11.0)]
+    assert watchdog.check() == []
+    assert watchdog.stats()["stalls"] == 1
+
+
+def test_abandoned_threads_count_until_they_exit(stall_timeout):
+    watchdog = Watchdog()
+    release = threading.Event()
+    thread = threading.Thread(target=release.wait, daemon=True)
+    thread.start()
+
+    watchdog.abandon("cam", thread)
+    assert watchdog.is_abandoned(thread)
+    assert watchdog.stats()["leaked_threads"] == 1
+    assert watchdog.stats()["leaked_tokens"] == ["cam"]
+
+    release.set()
+    thread.join()
+    stats = watchdog.stats()
+    assert stats["leaked_threads"] == 0 and stats["leaked_total"] == 1
+
+
+class _HungCapture:
+    def __init__(self, release: threading.Event) -> None:
+        self._release = release
+
+    def read(self, image=None):
+        self._release.wait()
+        return True, np.zeros((2, 2, 3), dtype=np.uint8)
+
+    def release(self) -> None:
+        return None
+
+
+class _LiveCapture:
+    def read(self, image=None):
+        time.sleep(0.01)
+        return True, np.ones((2, 2, 3), dtype=np.uint8)
+
+    def release(self) -> None:
+        return None
+
+
+def test_stalled_worker_is_replaced(stall_timeout, monkeypatch, quiet_worker):
+    token = "cam-hung"
+    cache.clear(token)
+    watchdog = Watchdog()
+    monkeypatch.setattr(watchdog, "ensure_started", lambda on_stall: None)
+    monkeypatch.setattr(worker, "WATCHDOG", watchdog)
+
+    release = threading.Event()
+    captures = iter([_HungCapture(release), _LiveCapture()])
+    monkeypatch.setattr(worker, "open_stream", lambda url, flag, options=None: (next(captures), "ok"))
+    statuses = []
+    monkeypatch.setattr(
+        worker.cache, "set_status", lambda token_arg, status, error=None, backend=None: statuses.append(status)
+    )
+    stored = []
+    monkeypatch.setattr(
+        worker.cache, "store_frame", lambda token_arg, frame, quality, **_kwargs: stored.append(frame.max())
+    )
+
+    worker.start_worker(token, "rtsp://example", None)
+    hung = worker.WORKERS[token]
+    assert _wait_for(lambda: watchdog._heartbeats[token].blocked_since is not None)
+
+    # Not reported by the watchdog yet: the reader keeps its heartbeat.
+    worker._replace_stalled_worker(token, 12.0)
+    assert worker.WORKERS[token] is hung
+
+    watchdog._heartbeats[token].blocked_since -= 12.0
+    (stalled,) = watchdog.check()
+    worker._replace_stalled_worker(*stalled)
+    assert "stalled" in statuses
+    assert worker.WORKERS[token] is not hung
+    assert _wait_for(lambda: len(stored) >= 2)
+    assert watchdog.stats()["leaked_threads"] == 1
+
+    # The abandoned reader returns a frame, drops it and exits.
+    release.set()
+    hung.join(timeout=2.0)
+    assert not hung.is_alive()
+    assert 0 not in stored
+    assert watchdog.stats()["leaked_threads"] == 0
+
+    worker.stop_worker(token)
+    assert token not in worker.WORKERS
+
+
+def test_stall_after_unregister_does_not_respawn(stall_timeout, monkeypatch, quiet_worker):
+    token = "cam-gone"
+    watchdog = Watchdog()
+    monkeypatch.setattr(watchdog, "ensure_started", lambda on_stall: None)
+    monkeypatch.setattr(worker, "WATCHDOG", watchdog)
+    monkeypatch.setattr(worker.cache, "set_status", lambda *args, **kwargs: None)
+
+    release = threading.Event()
+    opened = []
+    monkeypatch.setattr(
+        worker, "open_stream", lambda url, flag, options=None: (opened.append(url) or _HungCapture(release), "ok")
+    )
+
+    worker.start_worker(token, "rtsp://example", None)
+    hung = worker.WORKERS[token]
+    assert _wait_for(lambda: watchdog._heartbeats[token].blocked_since is not None)
+    watchdog._heartbeats[token].blocked_since -= 12.0
+    stalled = watchdog.check()
+
+    # The stall is handled while stop_worker is still waiting for the reader.
+    stopper = threading.Thread(target=worker.stop_worker, args=(token,), kwargs={"join_timeout": 0.5})
+    stopper.start()
+    assert _wait_for(lambda: worker.STOP_EVENTS[token].is_set())
+    for token_arg, blocked_for in stalled:
+        worker._replace_stalled_worker(token_arg, blocked_for)
+    stopper.join()
+
+    assert token not in worker.WORKERS and token not in worker.STOP_EVENTS
+    assert opened == ["rtsp://example"]
+    release.set()
+    hung.join(timeout=2.0)
+    assert not hung.is_alive()
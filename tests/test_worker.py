@@ -3,11 +3,13 @@
 from __future__ import annotations
 
 import threading
+import time
 from typing import List, Tuple
 
 import numpy as np
 
-from rtsp2jpg import cache, worker
+from rtsp2jpg import cache, config, worker
+from rtsp2jpg.watchdog import Watchdog
 
 
 class _DummySettings:
@@ -15,6 +17,9 @@ class _DummySettings:
     reconnect_delay_sec = 0.0
     jpeg_quality = 75
     decoder_warning_window_sec = 0.2
+    decode_keyframe_interval_sec = 2.0
+    decode_lowres_width = 640
+    priority_class = "normal"
 
 
 class _FakeCapture:
@@ -22,7 +27,7 @@ class _FakeCapture:
         self._frames = list(frames)
         self._stop_event = stop_event
 
-    def read(self) -> Tuple[bool, object]:  # pragma: no cover - signature match
+    def read(self, image=None) -> Tuple[bool, object]:  # pragma: no cover - signature match
         if not self._frames:
             self._stop_event.set()
             return False, None
@@ -32,7 +37,7 @@ class _FakeCapture:
         return None
 
 
-def test_worker_skips_invalid_frames_before_caching(monkeypatch):
+def test_worker_skips_invalid_frames_before_caching(monkeypatch, quiet_worker):
     token = "cam-skip"
     cache.clear(token)
 
@@ -40,29 +45,22 @@ def test_worker_skips_invalid_frames_before_caching(monkeypatch):
     valid_frame = np.zeros((2, 2, 3), dtype=np.uint8)
     fake_capture = _FakeCapture([(False, None), (True, valid_frame)], stop_event)
 
-    monkeypatch.setattr(worker, "open_stream", lambda url, flag: (fake_capture, "ok"))
+    monkeypatch.setattr(worker, "open_stream", lambda url, flag, options=None: (fake_capture, "ok"))
     monkeypatch.setattr(worker, "get_settings", lambda: _DummySettings())
-    monkeypatch.setattr(worker, "update_status", lambda *args, **kwargs: None)
-    monkeypatch.setattr(worker, "ensure_decoder_monitor_started", lambda: None)
-    monkeypatch.setattr(worker, "register_decoder_stream", lambda *args, **kwargs: None)
-    monkeypatch.setattr(worker, "unregister_decoder_stream", lambda *args, **kwargs: None)
-    monkeypatch.setattr(
-        worker, "decoder_warning_recent_for_token", lambda *args, **kwargs: False
-    )
     monkeypatch.setattr(worker, "MAX_CONSECUTIVE_FRAME_FAILURES", 2, raising=False)
 
     statuses = []
     original_set_status = worker.cache.set_status
 
-    def tracked_set_status(token_arg, status, error=None):
+    def tracked_set_status(token_arg, status, error=None, backend=None):
         statuses.append(status)
-        original_set_status(token_arg, status, error)
+        original_set_status(token_arg, status, error, backend)
 
     monkeypatch.setattr(worker.cache, "set_status", tracked_set_status)
 
     stored_frames = []
 
-    def tracked_store_frame(token_arg, frame, quality):
+    def tracked_store_frame(token_arg, frame, quality, **_kwargs):
         stored_frames.append(frame.copy())
         stop_event.set()
 
@@ -79,7 +77,7 @@ class _AlwaysBadCapture:
         self._stop_event = stop_event
         self._count = 0
 
-    def read(self) -> Tuple[bool, object]:  # pragma: no cover - signature match
+    def read(self, image=None) -> Tuple[bool, object]:  # pragma: no cover - signature match
         self._count += 1
         if self._count >= 2:
             self._stop_event.set()
@@ -89,30 +87,23 @@ class _AlwaysBadCapture:
         return None
 
 
-def test_worker_reconnects_after_excessive_invalid_frames(monkeypatch):
+def test_worker_reconnects_after_excessive_invalid_frames(monkeypatch, quiet_worker):
     token = "cam-reconnect"
     cache.clear(token)
 
     stop_event = threading.Event()
     fake_capture = _AlwaysBadCapture(stop_event)
 
-    monkeypatch.setattr(worker, "open_stream", lambda url, flag: (fake_capture, "ok"))
+    monkeypatch.setattr(worker, "open_stream", lambda url, flag, options=None: (fake_capture, "ok"))
     monkeypatch.setattr(worker, "get_settings", lambda: _DummySettings())
-    monkeypatch.setattr(worker, "update_status", lambda *args, **kwargs: None)
-    monkeypatch.setattr(worker, "ensure_decoder_monitor_started", lambda: None)
-    monkeypatch.setattr(worker, "register_decoder_stream", lambda *args, **kwargs: None)
-    monkeypatch.setattr(worker, "unregister_decoder_stream", lambda *args, **kwargs: None)
-    monkeypatch.setattr(
-        worker, "decoder_warning_recent_for_token", lambda *args, **kwargs: False
-    )
     monkeypatch.setattr(worker, "MAX_CONSECUTIVE_FRAME_FAILURES", 2, raising=False)
 
     statuses = []
     original_set_status = worker.cache.set_status
 
-    def tracked_set_status(token_arg, status, error=None):
+    def tracked_set_status(token_arg, status, error=None, backend=None):
         statuses.append(status)
-        original_set_status(token_arg, status, error)
+        original_set_status(token_arg, status, error, backend)
 
     monkeypatch.setattr(worker.cache, "set_status", tracked_set_status)
 
@@ -125,7 +116,7 @@ def test_worker_reconnects_after_excessive_invalid_frames(monkeypatch):
     assert stored_frames == []
 
 
-def test_worker_skips_frames_when_decoder_reports_warning(monkeypatch):
+def test_worker_skips_frames_when_decoder_reports_warning(monkeypatch, quiet_worker):
     token = "cam-warn"
     cache.clear(token)
 
@@ -133,12 +124,8 @@ def test_worker_skips_frames_when_decoder_reports_warning(monkeypatch):
     valid_frame = np.ones((3, 3, 3), dtype=np.uint8)
     fake_capture = _FakeCapture([(True, valid_frame), (True, valid_frame * 2)], stop_event)
 
-    monkeypatch.setattr(worker, "open_stream", lambda url, flag: (fake_capture, "ok"))
+    monkeypatch.setattr(worker, "open_stream", lambda url, flag, options=None: (fake_capture, "ok"))
     monkeypatch.setattr(worker, "get_settings", lambda: _DummySettings())
-    monkeypatch.setattr(worker, "update_status", lambda *args, **kwargs: None)
-    monkeypatch.setattr(worker, "ensure_decoder_monitor_started", lambda: None)
-    monkeypatch.setattr(worker, "register_decoder_stream", lambda *args, **kwargs: None)
-    monkeypatch.setattr(worker, "unregister_decoder_stream", lambda *args, **kwargs: None)
 
     skip_next = iter([True, False])
 
@@ -149,7 +136,7 @@ def test_worker_skips_frames_when_decoder_reports_warning(monkeypatch):
 
     stored_frames = []
 
-    def tracked_store_frame(token_arg, frame, quality):
+    def tracked_store_frame(token_arg, frame, quality, **_kwargs):
         stored_frames.append(frame.copy())
         stop_event.set()
 
@@ -159,3 +146,504 @@ def test_worker_skips_frames_when_decoder_reports_warning(monkeypatch):
 
     assert len(stored_frames) == 1
     np.testing.assert_array_equal(stored_frames[0], valid_frame * 2)
+
+
+class _BufferedCapture:
+    def __init__(self, count: int, stop_event: threading.Event):
+        self._remaining = count
+        self._stop_event = stop_event
+        self.provided: List[bool] = []
+
+    def read(self, image=None) -> Tuple[bool, object]:
+        if self._remaining == 0:
+            self._stop_event.set()
+            return False, None
+        self._remaining -= 1
+        self.provided.append(image is not None)
+        if image is None:
+            image = np.empty((2, 2, 3), dtype=np.uint8)
+        image[...] = self._remaining
+        return True, image
+
+    def release(self) -> None:
+        return None
+
+
+def test_worker_reads_into_reused_buffers(monkeypatch, quiet_worker):
+    token = "cam-buffers"
+    cache.clear(token)
+
+    stop_event = threading.Event()
+    fake_capture = _BufferedCapture(6, stop_event)
+
+    monkeypatch.setattr(worker, "open_stream", lambda url, flag, options=None: (fake_capture, "ok"))
+    monkeypatch.setattr(worker, "get_settings", lambda: _DummySettings())
+
+    stored_ids = []
+    monkeypatch.setattr(
+        worker.cache, "store_frame", lambda token_arg, frame, quality, **_kwargs: stored_ids.append(id(frame))
+    )
+
+    worker._camera_worker(token, "rtsp://example", stop_event)
+
+    assert len(stored_ids) == 6
+    assert any(fake_capture.provided)
+    assert len(set(stored_ids)) < len(stored_ids)
+
+
+class _GrabbingCapture(_FakeCapture):
+    def __init__(self, frames, stop_event):
+        super().__init__(frames, stop_event)
+        self.grabs = 0
+
+    def grab(self) -> bool:
+        if not self._frames:
+            self._stop_event.set()
+            return False
+        self._frames.pop(0)
+        self.grabs += 1
+        return True
+
+
+def test_keyframe_profile_grabs_between_stored_frames(monkeypatch, quiet_worker):
+    token = "cam-keyframe"
+    cache.clear(token)
+
+    stop_event = threading.Event()
+    frame = np.zeros((2, 2, 3), dtype=np.uint8)
+    fake_capture = _GrabbingCapture([(True, frame)] * 5, stop_event)
+
+    monkeypatch.setattr(worker, "open_stream", lambda url, flag, options=None: (fake_capture, "ok"))
+    monkeypatch.setattr(worker, "get_settings", lambda: _DummySettings())
+    monkeypatch.setitem(worker.CAPTURE_OPTIONS, token, worker.CaptureOptions("keyframe"))
+
+    stored = []
+    monkeypatch.setattr(
+        worker.cache, "store_frame", lambda token_arg, frame, quality, **_kwargs: stored.append(frame)
+    )
+
+    worker._camera_worker(token, "rtsp://example", stop_event)
+
+    assert len(stored) == 1
+    assert fake_capture.grabs == 4
+
+
+def test_lowres_profile_downscales_bgr_and_i420_frames():
+    profile = worker._DecodeProfile("lowres", _DummySettings())
+    bgr = np.zeros((720, 1280, 3), dtype=np.uint8)
+    i420 = np.zeros((1080, 1280), dtype=np.uint8)
+
+    small, pixel_format = profile.accept(bgr, "bgr")
+    assert small.shape == (360, 640, 3) and pixel_format == "bgr"
+    small, pixel_format = profile.accept(i420, "i420")
+    assert small.shape == (360, 640, 3) and pixel_format == "bgr"
+    assert profile.accept(small, "bgr")[0] is small
+    assert not profile.skip_next()
+
+
+def test_keyframe_profile_gates_on_interval():
+    now = [100.0]
+    profile = worker._DecodeProfile("keyframe", _DummySettings(), clock=lambda: now[0])
+
+    assert not profile.skip_next()
+    profile.accept(np.zeros((2, 2, 3), dtype=np.uint8), "bgr")
+    assert profile.skip_next()
+    now[0] += 2.0
+    assert not profile.skip_next()
+
+
+def test_worker_applies_profile_updates_without_restart(monkeypatch, quiet_worker):
+    token = "cam-profile"
+    cache.clear(token)
+
+    stop_event = threading.Event()
+    frame = np.zeros((2, 2, 3), dtype=np.uint8)
+    captures = [_FakeCapture([(True, frame)] * 3, stop_event), _FakeCapture([(True, frame)], stop_event)]
+    opened = []
+
+    def fake_open(url, flag, options=None):
+        opened.append(options)
+        return captures[len(opened) - 1], "ok"
+
+    monkeypatch.setattr(worker, "open_stream", fake_open)
+    monkeypatch.setattr(worker, "get_settings", lambda: _DummySettings())
+    monkeypatch.setitem(worker.STOP_EVENTS, token, stop_event)
+    monkeypatch.setitem(worker.CAPTURE_OPTIONS, token, worker.CaptureOptions())
+    monkeypatch.setitem(worker.TUNING, token, worker.CameraProfile().resolve(_DummySettings()))
+
+    qualities = []
+
+    def tracked_store_frame(token_arg, frame, quality, **_kwargs):
+        qualities.append(quality)
+        if len(qualities) == 1:
+            worker.update_profile(token, profile=worker.CameraProfile(jpeg_quality=40))
+        elif len(qualities) == 2:
+            worker.update_profile(token, capture=worker.CaptureOptions("lowres"))
+
+    monkeypatch.setattr(worker.cache, "store_frame", tracked_store_frame)
+
+    worker._camera_worker(token, "rtsp://example", stop_event)
+
+    assert qualities == [75, 40, 40]
+    assert opened == [worker.CaptureOptions(), worker.CaptureOptions("lowres")]
+
+
+class _LoopingCapture:
+    def read(self, image=None) -> Tuple[bool, object]:
+        time.sleep(0.005)
+        return True, np.ones((2, 2, 3), dtype=np.uint8)
+
+    def release(self) -> None:
+        return None
+
+
+def _wait_for(predicate, timeout: float = 2.0) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.01)
+    return predicate()
+
+
+def test_duplicate_urls_share_one_capture(monkeypatch, quiet_worker):
+    opened = []
+
+    def fake_open(url, flag, options=None):
+        opened.append(url)
+        return _LoopingCapture(), "ok"
+
+    monkeypatch.setattr(worker, "open_stream", fake_open)
+    stored = []
+    monkeypatch.setattr(
+        worker.cache,
+        "store_frame",
+        lambda token_arg, frame, quality, aliases=(), **_kwargs: stored.append((token_arg, *aliases)),
+    )
+
+    worker.start_worker("cam-a", "rtsp://Cam:554/live", None)
+    worker.start_worker("cam-b", "rtsp://cam/live/", None)
+    worker.start_worker("cam-c", "rtsp://cam/live", None, profile=worker.CameraProfile(jpeg_quality=50))
+    try:
+        assert worker.find_shared_capture("rtsp://CAM/live") == "cam-a"
+        assert worker.capture_group("cam-b") == "cam-a"
+        assert set(worker.WORKERS) == {"cam-a", "cam-c"}
+        assert worker.capture_stats() == {"captures": 2, "tokens": 3, "shared_sessions_saved": 1}
+        assert _wait_for(lambda: ("cam-a", "cam-b") in stored)
+
+        # The capture outlives the token that started it.
+        worker.stop_worker("cam-a")
+        assert worker.WORKERS["cam-a"].is_alive()
+        stored.clear()
+        assert _wait_for(lambda: ("cam-b",) in stored)
+
+        # Diverging profiles split a token off into its own capture.
+        worker.start_worker("cam-d", "rtsp://cam/live", None)
+        worker.update_profile("cam-d", profile=worker.CameraProfile(read_throttle_sec=1.0))
+        assert worker.capture_group("cam-d") == "cam-d"
+        assert worker.MEMBERS["cam-a"] == ("cam-b",)
+    finally:
+        for token in ("cam-b", "cam-c", "cam-d"):
+            worker.stop_worker(token)
+
+    assert worker.WORKERS == {} and worker.MEMBERS == {} and worker.SHARED_CAPTURES == {}
+    assert len(opened) == 3
+
+
+def test_leader_profile_change_keeps_group_running(monkeypatch, quiet_worker):
+    monkeypatch.setattr(worker, "open_stream", lambda url, flag, options=None: (_LoopingCapture(), "ok"))
+    stored = []
+    monkeypatch.setattr(
+        worker.cache,
+        "store_frame",
+        lambda token_arg, frame, quality, aliases=(), **_kwargs: stored.append((token_arg, *aliases)),
+    )
+
+    worker.start_worker("cam-a", "rtsp://cam/live", None)
+    worker.start_worker("cam-b", "rtsp://cam/live", None)
+    try:
+        shared = worker.WORKERS["cam-a"]
+        worker.update_profile("cam-a", profile=worker.CameraProfile(jpeg_quality=40))
+
+        assert worker.MEMBERS["cam-a"] == ("cam-b",)
+        assert worker.capture_group("cam-b") == "cam-a"
+        own = worker.capture_group("cam-a")
+        assert own != "cam-a" and worker.MEMBERS[own] == ("cam-a",)
+        assert worker.WORKERS["cam-a"] is shared and shared.is_alive()
+        stored.clear()
+        assert _wait_for(lambda: ("cam-b",) in stored and ("cam-a",) in stored)
+    finally:
+        worker.stop_worker("cam-a")
+        worker.stop_worker("cam-b")
+
+    assert worker.WORKERS == {} and worker.MEMBERS == {} and worker.GROUP_OF == {}
+
+
+class _SizedCapture:
+    def __init__(self, width: int) -> None:
+        self.width = width
+        self.released = False
+
+    def read(self, image=None) -> Tuple[bool, object]:
+        time.sleep(0.005)
+        return True, np.zeros((2, self.width, 3), dtype=np.uint8)
+
+    def release(self) -> None:
+        self.released = True
+
+
+def test_main_stream_opens_on_demand_and_closes_when_idle(monkeypatch, quiet_worker):
+    monkeypatch.setenv("RTSP2JPG_MAIN_STREAM_IDLE_SEC", "0.5")
+    config.get_settings.cache_clear()
+    captures = {}
+
+    def fake_open(url, flag, options=None):
+        captures[url] = _SizedCapture(8 if url.endswith("main") else 4)
+        return captures[url], "ok"
+
+    monkeypatch.setattr(worker, "open_stream", fake_open)
+    widths = []
+    monkeypatch.setattr(
+        worker.cache, "store_frame", lambda token_arg, frame, quality, **_kwargs: widths.append(frame.shape[1])
+    )
+
+    token = "cam-dual"
+    worker.start_worker(token, "rtsp://cam/main", None, substream_url="rtsp://cam/sub")
+    try:
+        assert _wait_for(lambda: 4 in widths)
+        assert "rtsp://cam/main" not in captures
+
+        assert worker.request_full_resolution(token) is False
+        assert _wait_for(lambda: worker.main_stream_live(token))
+        time.sleep(0.05)
+        widths.clear()
+        assert _wait_for(lambda: worker.request_full_resolution(token) and len(widths) >= 3)
+        # While the main stream delivers, substream frames are not stored.
+        assert set(widths) == {8}
+
+        # Without further requests the main stream closes again.
+        assert _wait_for(lambda: not worker.main_stream_live(token))
+        assert captures["rtsp://cam/main"].released
+        widths.clear()
+        assert _wait_for(lambda: 4 in widths)
+        assert worker.request_full_resolution("cam-single") is None
+    finally:
+        worker.stop_worker(token)
+        config.get_settings.cache_clear()
+    assert worker.MAIN_READERS == {} and worker.SUBSTREAM_URLS == {}
+
+
+class _RecordingShedder:
+    def __init__(self) -> None:
+        self.observed = []
+
+    def apply(self, tuning):
+        return tuning._replace(jpeg_quality=30), False
+
+    def observe(self, token, **_costs) -> None:
+        self.observed.append(token)
+
+    def forget(self, token) -> None:
+        return None
+
+
+def test_main_stream_frames_are_shed_and_budgeted(monkeypatch, quiet_worker):
+    shedder = _RecordingShedder()
+    monkeypatch.setattr(worker, "SHEDDER", shedder)
+    monkeypatch.setattr(worker.SCHEDULER, "min_interval", lambda token: 0.3)
+    monkeypatch.setattr(
+        worker,
+        "open_stream",
+        lambda url, flag, options=None: (_SizedCapture(8 if url.endswith("main") else 4), "ok"),
+    )
+    stored = []
+    monkeypatch.setattr(
+        worker.cache,
+        "store_frame",
+        lambda token_arg, frame, quality, eager=True, **_kwargs: stored.append((frame.shape[1], quality, eager)),
+    )
+
+    token = "cam-main-shed"
+    worker.start_worker(token, "rtsp://cam/main", None, substream_url="rtsp://cam/sub")
+    try:
+        worker.request_full_resolution(token)
+        assert _wait_for(lambda: worker.main_stream_live(token))
+        stored.clear()
+        shedder.observed.clear()
+        time.sleep(0.5)
+        worker.request_full_resolution(token)
+        main = [item for item in stored if item[0] == 8]
+        # Paced by the 0.3 s decode budget rather than the unthrottled read rate.
+        assert 1 <= len(main) <= 3
+        assert set(main) == {(8, 30, False)}
+        assert token in shedder.observed
+    finally:
+        worker.stop_worker(token)
+
+
+class _StallingCapture:
+    """Delivers one frame, then blocks in ``read`` until released."""
+
+    def __init__(self, width: int, release: threading.Event) -> None:
+        self.width = width
+        self._release = release
+        self._reads = 0
+
+    def read(self, image=None) -> Tuple[bool, object]:
+        self._reads += 1
+        if self._reads > 1:
+            self._release.wait()
+        return True, np.zeros((2, self.width, 3), dtype=np.uint8)
+
+    def release(self) -> None:
+        return None
+
+
+def test_stalled_main_stream_falls_back_to_substream(monkeypatch, quiet_worker):
+    monkeypatch.setenv("RTSP2JPG_READ_STALL_TIMEOUT_SEC", "10")
+    config.get_settings.cache_clear()
+    watchdog = Watchdog()
+    monkeypatch.setattr(watchdog, "ensure_started", lambda on_stall: None)
+    monkeypatch.setattr(worker, "WATCHDOG", watchdog)
+    release = threading.Event()
+    monkeypatch.setattr(
+        worker,
+        "open_stream",
+        lambda url, flag, options=None: (
+            _StallingCapture(8, release) if url.endswith("main") else _SizedCapture(4),
+            "ok",
+        ),
+    )
+    widths = []
+    monkeypatch.setattr(
+        worker.cache, "store_frame", lambda token_arg, frame, quality, **_kwargs: widths.append(frame.shape[1])
+    )
+
+    token = "cam-main-hung"
+    worker.start_worker(token, "rtsp://cam/main", None, substream_url="rtsp://cam/sub")
+    try:
+        worker.request_full_resolution(token)
+        assert _wait_for(lambda: worker.main_stream_live(token))
+        key = token + worker.MAIN_READER_SUFFIX
+        assert _wait_for(lambda: watchdog._heartbeats[key].blocked_since is not None)
+        reader = worker.MAIN_READERS[token][0]
+
+        watchdog._heartbeats[key].blocked_since -= 12.0
+        (stalled,) = watchdog.check()
+        worker._replace_stalled_worker(*stalled)
+
+        assert not worker.main_stream_live(token)
+        assert watchdog.stats()["leaked_tokens"] == [key]
+        widths.clear()
+        assert _wait_for(lambda: 4 in widths)
+    finally:
+        release.set()
+        worker.stop_worker(token)
+        config.get_settings.cache_clear()
+    reader.join(timeout=2.0)
+    assert not reader.is_alive()
+
+
+class _BlockedCapture:
+    def __init__(self, release: threading.Event) -> None:
+        self._release = release
+
+    def read(self, image=None) -> Tuple[bool, object]:
+        self._release.wait()
+        return True, np.ones((2, 2, 3), dtype=np.uint8)
+
+    def release(self) -> None:
+        return None
+
+
+def test_stop_all_workers_shares_one_deadline_and_reports_stuck(monkeypatch, quiet_worker):
+    release = threading.Event()
+    monkeypatch.setattr(
+        worker,
+        "open_stream",
+        lambda url, flag, options=None: (_BlockedCapture(release) if "hung" in url else _LoopingCapture(), "ok"),
+    )
+    bulk_updates = []
+    monkeypatch.setattr(worker, "update_statuses", lambda tokens, status: bulk_updates.append((list(tokens), status)))
+
+    for index in range(5):
+        worker.start_worker(f"cam-{index}", f"rtsp://cam/{index}", None)
+    worker.start_worker("cam-hung", "rtsp://cam/hung", None)
+    worker.start_worker("cam-alias", "rtsp://cam/0", None)
+    hung_thread = worker.WORKERS["cam-hung"]
+    assert _wait_for(lambda: worker.WATCHDOG._heartbeats["cam-hung"].blocked_since is not None)
+
+    started = time.monotonic()
+    try:
+        stuck = worker.stop_all_workers(timeout=0.3)
+        elapsed = time.monotonic() - started
+    finally:
+        release.set()
+
+    assert stuck == ["cam-hung"]
+    assert elapsed < 1.0
+    assert len(bulk_updates) == 1
+    assert sorted(bulk_updates[0][0]) == ["cam-0", "cam-1", "cam-2", "cam-3", "cam-4", "cam-alias", "cam-hung"]
+    assert bulk_updates[0][1] == "inactive"
+    assert cache.get_status("cam-alias")["status"] == "inactive"
+    assert worker.WORKERS == {} and worker.GROUP_OF == {} and worker.MEMBERS == {}
+    hung_thread.join(timeout=1.0)
+    assert not hung_thread.is_alive()
+    for index in range(5):
+        cache.clear(f"cam-{index}")
+    for token in ("cam-hung", "cam-alias"):
+        cache.clear(token)
+
+
+def test_restart_workers_reconnects_in_batches(monkeypatch, quiet_worker):
+    opened = []
+
+    def fake_open(url, flag, options=None):
+        opened.append(url)
+        return _LoopingCapture(), "ok"
+
+    monkeypatch.setattr(worker, "open_stream", fake_open)
+
+    worker.start_worker("rs-a", "rtsp://cam/a", None)
+    worker.start_worker("rs-b", "rtsp://cam/b", None)
+    worker.start_worker("rs-alias", "rtsp://cam/a", None)
+    try:
+        assert _wait_for(lambda: len(opened) == 2)
+        old_threads = dict(worker.WORKERS)
+
+        report = worker.restart_workers(["rs-alias", "rs-b", "rs-missing"], batch_size=1, interval_sec=0.0)
+
+        assert report == {"restarted": ["rs-a", "rs-b"], "stuck": [], "not_running": ["rs-missing"]}
+        assert _wait_for(lambda: len(opened) == 4)
+        for group, thread in old_threads.items():
+            assert not thread.is_alive()
+            assert worker.WORKERS[group] is not thread
+        assert worker.capture_group("rs-alias") == "rs-a"
+    finally:
+        for token in ("rs-a", "rs-b", "rs-alias"):
+            worker.stop_worker(token)
+            cache.clear(token)
+
+
+def test_start_restart_runs_in_background_and_reports_progress(monkeypatch, quiet_worker):
+    monkeypatch.setattr(worker, "open_stream", lambda url, flag, options=None: (_LoopingCapture(), "ok"))
+
+    worker.start_worker("bg-a", "rtsp://cam/bg-a", None)
+    worker.start_worker("bg-b", "rtsp://cam/bg-b", None)
+    try:
+        # The first batch restarts at once; the second waits out the interval.
+        progress = worker.start_restart(["bg-a", "bg-b"], batch_size=1, interval_sec=10.0)
+        assert progress is not None and progress["state"] == "running"
+        assert _wait_for(lambda: worker.restart_status()["restarted"] == ["bg-a"])
+        assert worker.restart_status()["pending"] == 1
+        assert worker.start_restart() is None
+
+        # Shutdown cancels the remaining batches instead of respawning them.
+        worker.stop_all_workers(timeout=1.0)
+        assert _wait_for(lambda: worker.restart_status()["state"] == "cancelled")
+        assert worker.restart_status()["finished_at"] is not None
+        assert "bg-b" not in worker.WORKERS
+    finally:
+        worker.stop_all_workers(timeout=1.0)
+        for token in ("bg-a", "bg-b"):
+            cache.clear(token)